@@ -0,0 +1,129 @@
+"""
+Contenção no memory.db: N processos gravando runs ao mesmo tempo (jobs de CI paralelos).
+
+    python benchmarks/bench_contention.py --procs 8 --writes 200 --threads 4
+
+Modos:
+- legacy: um commit para o run e outro para o state, transação DEFERRED, sem busy timeout
+  (o comportamento antigo do MemoryStore);
+- store: MemoryStore.record_run(..., state=...) — uma transação IMMEDIATE por run,
+  busy timeout + retry com backoff, e group commit entre as threads do processo.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from noxis.storage.memory import MemoryStore
+from noxis.storage.retention import RetentionPolicy
+
+PAYLOAD = {
+    "results": [
+        {"severity": "warn", "message": f"finding {i}", "location": f"src/mod_{i}.py"}
+        for i in range(20)
+    ]
+}
+
+
+def _legacy_worker(db_path: str, writes: int, threads: int, out) -> None:
+    local = threading.local()
+    payload_json = json.dumps(PAYLOAD)
+
+    def one(i: int) -> float | None:
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            conn = local.conn = sqlite3.connect(db_path, timeout=0)
+        t0 = time.perf_counter()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO runs (command, payload_json) VALUES (?, ?)",
+                    ("doctor", payload_json),
+                )
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO project_state (key, value_json) VALUES (?, ?)",
+                    ("last_doctor", payload_json),
+                )
+        except sqlite3.OperationalError:
+            return None
+        return (time.perf_counter() - t0) * 1000
+
+    with ThreadPoolExecutor(threads) as pool:
+        out.put(list(pool.map(one, range(writes))))
+
+
+def _store_worker(db_path: str, writes: int, threads: int, out) -> None:
+    store = MemoryStore(Path(db_path), retention=RetentionPolicy(None, None, None, 0))
+    store.initialize()
+
+    def one(i: int) -> float | None:
+        t0 = time.perf_counter()
+        try:
+            store.record_run("doctor", PAYLOAD, state={"last_doctor": PAYLOAD})
+        except sqlite3.OperationalError:
+            return None
+        return (time.perf_counter() - t0) * 1000
+
+    with ThreadPoolExecutor(threads) as pool:
+        out.put(list(pool.map(one, range(writes))))
+    store.close()
+
+
+def bench(mode: str, procs: int, writes: int, threads: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "memory.db"
+        # schema atual para os dois modos; o legacy só usa colunas antigas
+        MemoryStore(db_path, retention=RetentionPolicy(None, None, None, 0)).initialize()
+
+        ctx = mp.get_context("spawn")
+        out = ctx.Queue()
+        target = _legacy_worker if mode == "legacy" else _store_worker
+        workers = [
+            ctx.Process(target=target, args=(str(db_path), writes, threads, out))
+            for _ in range(procs)
+        ]
+        t0 = time.perf_counter()
+        for w in workers:
+            w.start()
+        samples: list[float | None] = []
+        for _ in workers:
+            samples.extend(out.get())
+        for w in workers:
+            w.join()
+        wall = time.perf_counter() - t0
+
+    ok = sorted(s for s in samples if s is not None)
+    failed = len(samples) - len(ok)
+    p50 = statistics.median(ok) if ok else float("nan")
+    p99 = ok[min(len(ok) - 1, int(len(ok) * 0.99))] if ok else float("nan")
+    print(
+        f"{mode:<7} procs={procs:<3} threads={threads:<3} "
+        f"ok={len(ok):<6} failed={failed:<6} {len(ok) / wall:8.0f} runs/s  "
+        f"p50 {p50:7.2f} ms  p99 {p99:7.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--procs", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--writes", type=int, default=200, help="Runs por processo.")
+    parser.add_argument("--threads", type=int, default=4, help="Threads por processo.")
+    parser.add_argument("--modes", nargs="+", default=["legacy", "store"])
+    args = parser.parse_args()
+
+    for procs in args.procs:
+        for mode in args.modes:
+            bench(mode, procs, args.writes, args.threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Latência das consultas de histórico no memory.db com e sem os índices da migration 2.
+
+    python benchmarks/bench_history_queries.py --rows 1000000
+
+Monta dois bancos iguais no schema atual, um deles sem os índices de histórico
+(as consultas do MemoryStore dependem das tabelas das migrations seguintes);
+mede `get_recent_runs` e `get_ai_explanation` em ambos.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from noxis.storage.memory import MemoryStore
+from noxis.storage.migrations import migrate
+
+COMMANDS = ["scan", "doctor", "watch", "ai-explain", "ai-tests"]
+# índices de histórico (migrations 2 e 11)
+HISTORY_INDEXES = (
+    "idx_runs_command_id",
+    "idx_runs_local_command_id",
+    "idx_ai_explanations_prompt_hash",
+)
+
+
+def populate(db_path: Path, rows: int, indexes: bool, seed: int = 0) -> None:
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    migrate(conn)
+    if not indexes:
+        for name in HISTORY_INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+    payload = json.dumps({"repo_type": "single", "languages_detected": ["python"]})
+
+    batch = 50_000
+    with conn:
+        # "init" só roda no começo: sem índice, ORDER BY id DESC varre a tabela inteira
+        conn.executemany(
+            "INSERT INTO runs (command, payload_json) VALUES (?, ?)", [("init", payload)] * 5
+        )
+        for start in range(0, rows, batch):
+            n = min(batch, rows - start)
+            conn.executemany(
+                "INSERT INTO runs (command, payload_json) VALUES (?, ?)",
+                (
+                    (rnd.choices(COMMANDS, weights=[40, 40, 15, 4, 1])[0], payload)
+                    for _ in range(n)
+                ),
+            )
+            conn.executemany(
+                "INSERT INTO ai_explanations (prompt_hash, response) VALUES (?, ?)",
+                (
+                    (hashlib.sha256(str(start + i).encode()).hexdigest(), "ok")
+                    for i in range(n)
+                ),
+            )
+    conn.close()
+
+
+def measure(fn, repeat: int) -> tuple[float, float]:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def bench(rows: int, repeat: int) -> None:
+    lookups = [hashlib.sha256(str(i).encode()).hexdigest() for i in (0, rows // 2, rows - 1)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, indexes in (("sem índices", False), ("com índices", True)):
+            db_path = Path(tmp) / f"{label.replace(' ', '_')}.db"
+            t0 = time.perf_counter()
+            populate(db_path, rows, indexes)
+            fill_s = time.perf_counter() - t0
+
+            store = MemoryStore(db_path)
+            # não chama initialize(): o banco sem índices precisa continuar assim
+            print(f"\n== {label}: {rows:,} runs + {rows:,} explanations ({fill_s:.1f}s)")
+            for command in ("scan", "ai-tests", "init"):
+                p50, p99 = measure(
+                    lambda store=store, command=command: store.get_recent_runs(command, limit=5),
+                    repeat,
+                )
+                print(f"get_recent_runs({command!r:<11}) p50 {p50:8.3f} ms  p99 {p99:8.3f} ms")
+            for h in lookups:
+                p50, p99 = measure(lambda store=store, h=h: store.get_ai_explanation(h), repeat)
+                print(f"get_ai_explanation({h[:8]})  p50 {p50:8.3f} ms  p99 {p99:8.3f} ms")
+            store.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    bench(args.rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Latência, throughput e ganho do cache do AIProvider contra o servidor stand-in.
+
+    python benchmarks/bench_provider.py --requests 100 --jobs 1 4 8 --ttft-ms 50
+
+Cenários, para `explain` e `generate_tests`:
+- latency: chamadas em série, p50/p99 do total e do TTFT (modo stream);
+- throughput: `--requests` chamadas com N em voo pelo executor do provider (req/s);
+- cache: os mesmos prompts com o ResponseCache frio e depois quente.
+
+O servidor (benchmarks/standin_server.py) sobe numa thread deste processo; latência,
+taxa de tokens e falhas injetadas vêm das opções abaixo. Erros contam à parte:
+no explain, a resposta de fallback "Local model unavailable" (stream cortado no meio
+devolve o texto parcial e conta como resposta); no generate_tests, exceção.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+from standin_server import TESTS_MARKER, StandinConfig, StandinServer
+
+from noxis.ai.provider import AIProvider, LocalHTTPConfig
+from noxis.storage.cache import CachePolicy, ResponseCache
+from noxis.storage.memory import MemoryStore
+
+OPERATIONS = ("explain", "generate_tests")
+ENDPOINTS = {"ollama": "/api/generate", "openai": "/v1/completions"}
+
+
+def make_prompt(op: str, i: int) -> str:
+    # prompts distintos: sem cache, cada chamada vai ao servidor
+    if op == "generate_tests":
+        return f"Generate pytest tests for module_{i}.\nReturn ONLY a {TESTS_MARKER}."
+    return f"Explain the latest scan #{i} in a few sentences."
+
+
+def call(provider: AIProvider, op: str, prompt: str, stream: bool) -> bool:
+    # True quando a chamada deu certo
+    if op == "explain":
+        on_token = (lambda _t: None) if stream else None
+        return not provider.explain(prompt, on_token=on_token).startswith(
+            "Local model unavailable"
+        )
+    try:
+        if stream:
+            provider.generate_tests_stream(prompt, lambda _n, _c: None)
+        else:
+            provider.generate_tests(prompt, fallback=False)
+    except Exception:  # noqa: BLE001
+        return False
+    return True
+
+
+def percentiles(samples: list[float]) -> tuple[float, float]:
+    if not samples:
+        return float("nan"), float("nan")
+    ordered = sorted(samples)
+    return statistics.median(ordered), ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+
+def timed(fn: Callable[[], bool]) -> tuple[float, bool]:
+    t0 = time.perf_counter()
+    ok = fn()
+    return (time.perf_counter() - t0) * 1000, ok
+
+
+def bench_latency(provider: AIProvider, op: str, requests: int, stream: bool) -> None:
+    totals: list[float] = []
+    ttfts: list[float] = []
+    errors = 0
+    for i in range(requests):
+        ms, ok = timed(lambda i=i: call(provider, op, make_prompt(op, i), stream))
+        if not ok:
+            errors += 1
+            continue
+        totals.append(ms)
+        metrics = provider.last.metrics
+        if metrics is not None and metrics.ttft_ms is not None:
+            ttfts.append(metrics.ttft_ms)
+
+    p50, p99 = percentiles(totals)
+    line = f"{op:<15} latency    stream={stream!s:<5} p50 {p50:8.1f} ms  p99 {p99:8.1f} ms"
+    if ttfts:
+        t50, t99 = percentiles(ttfts)
+        line += f"  ttft p50 {t50:7.1f} ms  p99 {t99:7.1f} ms"
+    print(f"{line}  errors={errors}")
+
+
+def bench_throughput(
+    config: LocalHTTPConfig, op: str, requests: int, jobs: int, server: StandinServer
+) -> None:
+    # pool do tamanho do paralelismo: cada worker com sua conexão keep-alive
+    provider = AIProvider(
+        LocalHTTPConfig(
+            base_url=config.base_url,
+            endpoint=config.endpoint,
+            model=config.model,
+            timeout_seconds=config.timeout_seconds,
+            stream=config.stream,
+            max_connections=jobs,
+        )
+    )
+    server.reset_stats()
+    latencies: list[float] = []
+    errors = 0
+
+    def one(i: int) -> tuple[float, bool]:
+        return timed(lambda: call(provider, op, make_prompt(op, i), config.stream))
+
+    t0 = time.perf_counter()
+    for _i, future in provider.executor(jobs).run(one, range(requests)):
+        ms, ok = future.result()
+        if ok:
+            latencies.append(ms)
+        else:
+            errors += 1
+    wall = time.perf_counter() - t0
+
+    p50, p99 = percentiles(latencies)
+    stats = server.stats.as_dict()
+    print(
+        f"{op:<15} throughput jobs={jobs:<3} {len(latencies) / wall:8.1f} req/s  "
+        f"p50 {p50:8.1f} ms  p99 {p99:8.1f} ms  "
+        f"new_connections={stats['connections']} errors={errors}"
+    )
+
+
+def bench_cache(config: LocalHTTPConfig, op: str, requests: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MemoryStore(Path(tmp) / "memory.db")
+        store.initialize()
+        provider = AIProvider(config, cache=ResponseCache(store, CachePolicy()))
+        samples: dict[str, list[float]] = {"cold": [], "warm": []}
+        for phase in ("cold", "warm"):
+            for i in range(requests):
+                ms, ok = timed(
+                    lambda i=i: call(provider, op, make_prompt(op, i), config.stream)
+                )
+                if ok:
+                    samples[phase].append(ms)
+            if phase == "cold":
+                store.flush()  # as gravações do cache vão pelo writer em background
+        store.close()
+
+    cold50, cold99 = percentiles(samples["cold"])
+    warm50, warm99 = percentiles(samples["warm"])
+    print(
+        f"{op:<15} cache      cold p50 {cold50:8.1f} ms  p99 {cold99:8.1f} ms  "
+        f"warm p50 {warm50:8.3f} ms  p99 {warm99:8.3f} ms  "
+        f"speedup {cold50 / warm50 if warm50 else float('inf'):8.0f}x"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--ops", nargs="+", choices=OPERATIONS, default=list(OPERATIONS))
+    parser.add_argument("--format", choices=sorted(ENDPOINTS), default="ollama")
+    parser.add_argument("--no-stream", action="store_true")
+    parser.add_argument("--ttft-ms", type=float, default=50.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=400.0)
+    parser.add_argument("--tokens", type=int, default=64)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    standin = StandinConfig(
+        ttft_ms=args.ttft_ms,
+        tokens_per_sec=args.tokens_per_sec,
+        tokens=args.tokens,
+        jitter=args.jitter,
+        fail_rate=args.fail_rate,
+        drop_rate=args.drop_rate,
+        seed=args.seed,
+    )
+    with StandinServer(standin) as server:
+        config = LocalHTTPConfig(
+            base_url=server.base_url,
+            endpoint=ENDPOINTS[args.format],
+            model="standin",
+            timeout_seconds=30,
+            stream=not args.no_stream,
+        )
+        print(
+            f"== {args.format} {config.endpoint} stream={config.stream} "
+            f"ttft {args.ttft_ms:.0f} ms, {args.tokens} tokens @ {args.tokens_per_sec:.0f}/s"
+        )
+        for op in args.ops:
+            bench_latency(AIProvider(config), op, args.requests, config.stream)
+            for jobs in args.jobs:
+                bench_throughput(config, op, args.requests, jobs, server)
+            bench_cache(config, op, args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Compara project.yml (YAML) com o snapshot binário para inventários grandes.
+
+    python benchmarks/bench_snapshot.py --sizes 10000 100000 1000000
+
+O YAML aqui inclui o inventário completo (o custo que teríamos se ele fosse
+serializado no project.yml); o snapshot mede a carga (zero-copy) e uma iteração completa.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+from noxis.context.inventory import FileEntry, FileInventory
+from noxis.context.model import ProjectModel
+from noxis.context.snapshot import read_snapshot, write_snapshot
+
+EXTENSIONS = [".py", ".js", ".ts", ".md", ".json", ".toml", ".txt", ""]
+
+
+def make_inventory(n: int, seed: int = 0) -> FileInventory:
+    rnd = random.Random(seed)
+    entries = []
+    for i in range(n):
+        depth = rnd.randint(1, 6)
+        dirs = "/".join(f"d{rnd.randint(0, 40)}" for _ in range(depth))
+        ext = rnd.choice(EXTENSIONS)
+        entries.append(
+            FileEntry(
+                path=f"{dirs}/file_{i}{ext}",
+                size=rnd.randint(0, 1 << 20),
+                mtime=1.7e9 + rnd.random() * 1e7,
+                extension=ext,
+            )
+        )
+    return FileInventory(entries)
+
+
+def timed(fn) -> tuple[float, object]:
+    t0 = time.perf_counter()
+    out = fn()
+    return (time.perf_counter() - t0) * 1000, out
+
+
+def bench(n: int, skip_yaml: bool) -> None:
+    inventory = make_inventory(n)
+    model = ProjectModel(
+        root_path="/bench",
+        repo_type="single",
+        languages_detected=["python"],
+        signals={"python": ["pyproject.toml"]},
+        inventory=inventory,
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        project_file = Path(tmp) / "project.yml"
+        project_file.write_text(model.to_yaml(), encoding="utf-8")
+
+        w_ms, _ = timed(lambda: write_snapshot(project_file, model))
+        lazy_ms, loaded = timed(lambda: read_snapshot(project_file))
+        full_ms, _ = timed(lambda: sum(1 for _ in loaded.inventory))
+        snap_size = project_file.with_suffix(".snap").stat().st_size
+
+        print(f"\n== {n:,} entries")
+        print(f"snapshot write:        {w_ms:10.1f} ms  ({snap_size / 1e6:.1f} MB)")
+        print(f"snapshot load:         {lazy_ms:10.1f} ms")
+        print(f"snapshot iterate all:  {full_ms:10.1f} ms")
+
+        if skip_yaml:
+            print("yaml: skipped")
+            return
+
+        payload = model.to_dict()
+        payload["inventory"] = [[e.path, e.size, e.mtime, e.extension] for e in inventory]
+        yaml_file = Path(tmp) / "inventory.yml"
+        dump_ms, _ = timed(
+            lambda: yaml_file.write_text(
+                yaml.safe_dump(payload, sort_keys=False), encoding="utf-8"
+            )
+        )
+        load_ms, _ = timed(lambda: yaml.safe_load(yaml_file.read_text(encoding="utf-8")))
+        yaml_mb = yaml_file.stat().st_size / 1e6
+        print(f"yaml dump:             {dump_ms:10.1f} ms  ({yaml_mb:.1f} MB)")
+        print(f"yaml load:             {load_ms:10.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument(
+        "--yaml-max",
+        type=int,
+        default=100_000,
+        help="Pula o YAML acima deste tamanho (safe_load em 1M entradas leva minutos).",
+    )
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        bench(n, skip_yaml=n > args.yaml_max)
+
+
+if __name__ == "__main__":
+    main()
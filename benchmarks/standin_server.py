@@ -0,0 +1,367 @@
+"""
+Servidor local que imita um modelo para medir o AIProvider sem Ollama nem GPU.
+
+    python benchmarks/standin_server.py --port 11434 --ttft-ms 200 --tokens-per-sec 40
+
+Formatos (os que o AIProvider entende):
+- POST /api/generate (Ollama): JSON {"response", "eval_count", "eval_duration",
+  "prompt_eval_count", "prompt_eval_duration", "context"} ou, com "stream": true,
+  NDJSON com um pedaço por linha e esses campos na última ("done");
+- POST /v1/completions (OpenAI): JSON {"choices": [{"text"}]} ou, em stream, SSE
+  "data: {...}" terminando em "data: [DONE]".
+- GET /stats: contadores (requests, conexões abertas, falhas injetadas).
+
+Prompts com "JSON object" (o pedido do ai-tests) recebem um mapping
+{"test_*.py": "..."} válido; os demais, texto. Latência = ttft + prefill dos tokens
+novos do prompt (`--prefill-ms-per-1k`; o "context" recebido não conta, como no
+Ollama) + tokens / taxa, com jitter opcional; falhas injetadas: HTTP 500 (`--fail-rate`) e conexão
+cortada no meio da resposta (`--drop-rate`).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import socket
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator, Self
+
+TESTS_MARKER = "JSON object"
+
+
+@dataclass
+class StandinConfig:
+    ttft_ms: float = 50.0  # prefill: espera antes do primeiro token
+    tokens_per_sec: float = 200.0
+    tokens: int = 64  # pedaços por resposta
+    jitter: float = 0.0  # variação relativa (0.2 = ±20%) de ttft e taxa
+    fail_rate: float = 0.0  # fração de requests respondidos com HTTP 500
+    drop_rate: float = 0.0  # fração de respostas cortadas na metade
+    seed: int | None = None
+    prefill_ms_per_1k: float = 0.0  # prefill por 1000 tokens (~4 caracteres) de prompt
+
+
+@dataclass
+class StandinStats:
+    requests: int = 0
+    connections: int = 0
+    streamed: int = 0
+    failures: int = 0
+    drops: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def bump(self, name: str) -> None:
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def as_dict(self) -> dict[str, int]:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "connections": self.connections,
+                "streamed": self.streamed,
+                "failures": self.failures,
+                "drops": self.drops,
+            }
+
+
+def text_reply(prompt: str, tokens: int) -> str:
+    return " ".join(f"token{i}" for i in range(tokens))
+
+
+def tests_reply(prompt: str, tokens: int) -> str:
+    # asserts suficientes para o JSON ter ~4 caracteres por pedaço
+    lines = ["def test_standin():"]
+    lines += [f"    assert {i} + 1 == {i + 1}" for i in range(max(1, tokens // 6))]
+    mapping = {
+        "test_standin.py": "\n".join(lines) + "\n",
+        "test_standin_smoke.py": "def test_smoke():\n    assert True\n",
+    }
+    return json.dumps(mapping)
+
+
+def prompt_tokens(prompt: str) -> int:
+    return (len(prompt) + 3) // 4
+
+
+def split_tokens(text: str, tokens: int) -> list[str]:
+    size = max(1, -(-len(text) // max(1, tokens)))
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive: o pool do Transport reaproveita a conexão
+    server: "StandinServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def handle(self) -> None:
+        self.server.stats.bump("connections")
+        # cabeçalho e corpo saem em writes separados: sem isso, Nagle + delayed ACK
+        # somam ~40 ms a cada resposta não-stream
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        super().handle()
+
+    def do_GET(self) -> None:
+        if self.path != "/stats":
+            self._send_json(404, {"error": "not found"})
+            return
+        self._send_json(200, self.server.stats.as_dict())
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "invalid JSON"})
+            return
+
+        if self.path == "/api/generate":
+            style = "ollama"
+        elif self.path == "/v1/completions":
+            style = "openai"
+        else:
+            self._send_json(404, {"error": f"unknown endpoint {self.path}"})
+            return
+
+        server = self.server
+        server.stats.bump("requests")
+        ttft_s, rate, fail, drop = server.draw()
+        if fail:
+            server.stats.bump("failures")
+            self._send_json(500, {"error": "injected failure"})
+            return
+
+        prompt = str(request.get("prompt", ""))
+        cfg = server.config
+        # o "context" recebido já foi processado: só o prompt novo paga prefill
+        prefill_s = prompt_tokens(prompt) * cfg.prefill_ms_per_1k / 1e6
+        ttft_s += prefill_s
+        reply = tests_reply if TESTS_MARKER in prompt else text_reply
+        pieces = split_tokens(reply(prompt, cfg.tokens), cfg.tokens)
+
+        if request.get("stream"):
+            server.stats.bump("streamed")
+            self._stream(style, request, pieces, ttft_s, rate, drop, prefill_s)
+        else:
+            self._complete(style, request, pieces, ttft_s, rate, drop, prefill_s)
+
+    def _complete(
+        self,
+        style: str,
+        request: dict[str, Any],
+        pieces: list[str],
+        ttft_s: float,
+        rate: float,
+        drop: bool,
+        prefill_s: float,
+    ) -> None:
+        time.sleep(ttft_s + len(pieces) / rate)
+        if drop:
+            self._drop()
+            return
+        text = "".join(pieces)
+        if style == "ollama":
+            body = {
+                "model": request.get("model"),
+                "response": text,
+                **self._ollama_counts(request, pieces, rate, prefill_s),
+            }
+        else:
+            body = {"choices": [{"index": 0, "text": text, "finish_reason": "stop"}]}
+        self._send_json(200, body)
+
+    def _stream(
+        self,
+        style: str,
+        request: dict[str, Any],
+        pieces: list[str],
+        ttft_s: float,
+        rate: float,
+        drop: bool,
+        prefill_s: float,
+    ) -> None:
+        self.send_response(200)
+        content_type = "application/x-ndjson" if style == "ollama" else "text/event-stream"
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        cut = len(pieces) // 2 if drop else None
+        first = time.perf_counter() + ttft_s
+        events = self._events(style, request, pieces, rate, prefill_s)
+        for i, event in enumerate(events):
+            if i == cut:
+                self._drop()
+                return
+            # agenda absoluta: o atraso do sleep não se acumula entre tokens
+            delay = first + min(i, len(pieces)) / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self._chunk(event)
+        self._chunk(b"")
+
+    def _events(
+        self,
+        style: str,
+        request: dict[str, Any],
+        pieces: list[str],
+        rate: float,
+        prefill_s: float,
+    ) -> Iterator[bytes]:
+        for piece in pieces:
+            if style == "ollama":
+                obj = {"model": request.get("model"), "response": piece, "done": False}
+                yield json.dumps(obj).encode("utf-8") + b"\n"
+            else:
+                obj = {"choices": [{"index": 0, "text": piece, "finish_reason": None}]}
+                yield b"data: " + json.dumps(obj).encode("utf-8") + b"\n\n"
+        if style == "ollama":
+            final = {
+                "model": request.get("model"),
+                "response": "",
+                **self._ollama_counts(request, pieces, rate, prefill_s),
+            }
+            yield json.dumps(final).encode("utf-8") + b"\n"
+        else:
+            yield b"data: [DONE]\n\n"
+
+    def _ollama_counts(
+        self, request: dict[str, Any], pieces: list[str], rate: float, prefill_s: float
+    ) -> dict[str, Any]:
+        # como no Ollama: eval_* só a geração; prompt_eval_* o prefill do prompt novo;
+        # context = tokens da conversa (ids fictícios), para continuar no próximo request
+        prompt_count = prompt_tokens(str(request.get("prompt", "")))
+        previous = request.get("context")
+        context = list(previous) if isinstance(previous, list) else []
+        context += range(len(context), len(context) + prompt_count + len(pieces))
+        return {
+            "done": True,
+            "eval_count": len(pieces),
+            "eval_duration": int(len(pieces) / rate * 1e9),
+            "prompt_eval_count": prompt_count,
+            "prompt_eval_duration": int(prefill_s * 1e9),
+            "context": context,
+        }
+
+    def _chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _drop(self) -> None:
+        self.server.stats.bump("drops")
+        self.close_connection = True
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _send_json(self, status: int, obj: Any) -> None:
+        data = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StandinServer(ThreadingHTTPServer):
+    """
+    Servidor stand-in em thread própria; `config` pode ser trocada entre cenários.
+
+        with StandinServer(StandinConfig(ttft_ms=100)) as server:
+            provider = AIProvider(LocalHTTPConfig(server.base_url, "/api/generate", "m"))
+    """
+
+    daemon_threads = True
+
+    def __init__(self, config: StandinConfig | None = None, port: int = 0) -> None:
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.config = config or StandinConfig()
+        self.stats = StandinStats()
+        self._rnd = random.Random(self.config.seed)
+        self._rnd_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def draw(self) -> tuple[float, float, bool, bool]:
+        # (ttft em s, tokens/s, falhar?, cortar?) do próximo request
+        cfg = self.config
+        with self._rnd_lock:
+            spread = [1 + self._rnd.uniform(-cfg.jitter, cfg.jitter) for _ in range(2)]
+            fail = self._rnd.random() < cfg.fail_rate
+            drop = self._rnd.random() < cfg.drop_rate
+        ttft_s = max(0.0, cfg.ttft_ms * spread[0] / 1000)
+        rate = max(1e-3, cfg.tokens_per_sec * spread[1])
+        return ttft_s, rate, fail, drop
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        # cliente que desistiu no meio (timeout, perdedor de um hedge) não é erro aqui
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def reset_stats(self) -> None:
+        self.stats = StandinStats()
+
+    def start(self) -> "StandinServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> Self:
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--ttft-ms", type=float, default=50.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0)
+    parser.add_argument("--tokens", type=int, default=64, help="Pedaços por resposta.")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = StandinConfig(
+        ttft_ms=args.ttft_ms,
+        tokens_per_sec=args.tokens_per_sec,
+        tokens=args.tokens,
+        jitter=args.jitter,
+        fail_rate=args.fail_rate,
+        drop_rate=args.drop_rate,
+        seed=args.seed,
+        prefill_ms_per_1k=args.prefill_ms_per_1k,
+    )
+    server = StandinServer(config, port=args.port)
+    print(f"stand-in model on {server.base_url} (Ctrl+C para sair)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import re
 from typing import Iterable
 
 from typing import Any
@@ -9,12 +10,13 @@ from noxis.context.model import ProjectModel
 from noxis.ai.history import summarize_scan_changes, summarize_doctor_changes
 
 
-def build_ai_context(scan_state, doctor_state, scan_history, doctor_history) -> str:
+def build_ai_context(scan_state, doctor_state, scan_changes, doctor_changes) -> str:
     """
     Constrói um contexto enxuto e factual para IA.
 
     scan_state: dict salvo em project_state['last_scan']
     doctor_state: dict salvo em project_state['last_soctor']
+    scan_changes / doctor_changes: diffs do histórico (MemoryStore.signal_changes/finding_changes)
     """
 
     lines: list[str] = []
@@ -72,11 +74,80 @@ def build_ai_context(scan_state, doctor_state, scan_history, doctor_history) ->
 
     lines.append("Change summary (most recent vs previous):")
     lines.append("Scan changes:")
-    lines.append(summarize_scan_changes(scan_history))
+    lines.append(summarize_scan_changes(scan_changes))
     lines.append("")
     lines.append("Doctor changes:")
-    lines.append(summarize_doctor_changes(doctor_history))
+    lines.append(summarize_doctor_changes(doctor_changes))
     lines.append("")
 
     lines.append("Now explain the situation and recommend next steps.")
     return "\n".join(lines)
+
+
+# resumo da explicação anterior no prompt incremental (~200 tokens)
+PREVIOUS_SUMMARY_CHARS = 800
+
+_LIST_ITEM = re.compile(r"^(#+\s|[-*•]\s|\d+[.)]\s)")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def summarize_explanation(text: str, max_chars: int = PREVIOUS_SUMMARY_CHARS) -> str:
+    """
+    Resumo extrativo de uma explicação: títulos e itens de lista inteiros, só a
+    primeira frase de cada parágrafo, na ordem original, até `max_chars`.
+    """
+    picked: list[str] = []
+    size = 0
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        if not _LIST_ITEM.match(line):
+            line = _SENTENCE_END.split(line, maxsplit=1)[0]
+        if size + len(line) + 1 > max_chars:
+            room = max_chars - size - 2
+            if room > 40:
+                picked.append(line[:room].rsplit(" ", 1)[0] + " …")
+            break
+        picked.append(line)
+        size += len(line) + 1
+    return "\n".join(picked)
+
+
+def build_incremental_context(scan_changes, doctor_changes, previous_summary=None) -> str:
+    """
+    Contexto só com o que mudou desde a última explicação gravada.
+
+    scan_changes / doctor_changes: diffs entre os runs que a explicação cobriu e os
+    últimos (None: o comando ainda não rodou).
+    previous_summary: resumo da resposta anterior; None quando o servidor continua
+    a conversa (`context` do Ollama) e a resposta anterior já está no contexto dele.
+    """
+
+    lines: list[str] = []
+
+    if previous_summary is not None:
+        lines.append("You are an expert Python software engineer.")
+        lines.append("Summary of your previous explanation of this project:")
+        lines.append(previous_summary or "(empty)")
+        lines.append("")
+
+    lines.append("Changes since that explanation:")
+    lines.append("Scan changes:")
+    if scan_changes is None:
+        lines.append("- No scan results yet.")
+    else:
+        lines.append(summarize_scan_changes(scan_changes))
+    lines.append("")
+    lines.append("Doctor changes:")
+    if doctor_changes is None:
+        lines.append("- No doctor results yet.")
+    else:
+        lines.append(summarize_doctor_changes(doctor_changes))
+    lines.append("")
+
+    lines.append(
+        "Now explain the current situation: keep what still holds, correct what changed, "
+        "and recommend next steps."
+    )
+    return "\n".join(lines)
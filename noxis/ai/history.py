@@ -1,26 +1,28 @@
 from __future__ import annotations
 
-from typing import Any
+from noxis.storage.history import (
+    KIND_LANGUAGE,
+    KIND_REPO_TYPE,
+    KIND_SIGNAL,
+    Finding,
+    FindingChanges,
+    SignalChanges,
+)
 
 
-def summarize_scan_changes(recent_scans: list[dict[str, Any]]) -> str:
+def summarize_scan_changes(changes: SignalChanges | None) -> str:
     """
-    Compara scan mais recente com o anterior e descreve mudanças relevantes.
-    Espera lista com scans mais recentes primeiro.
+    Descreve o que mudou entre o scan mais recente e o anterior.
+    `changes` vem de MemoryStore.signal_changes() (diff feito em SQL).
     """
 
-    if len(recent_scans) < 2:
+    if changes is None:
         return "No previous scan to compare."
 
-    cur = recent_scans[0]["payload"]
-    prev = recent_scans[1]["payload"]
-
     lines: list[str] = []
 
-    cur_langs = set(cur.get("languages_detected") or [])
-    prev_langs = set(prev.get("languages_detected") or [])
-    added_langs = sorted(cur_langs - prev_langs)
-    removed_langs = sorted(prev_langs - cur_langs)
+    added_langs = [s.value for s in changes.added if s.kind == KIND_LANGUAGE]
+    removed_langs = [s.value for s in changes.removed if s.kind == KIND_LANGUAGE]
     if added_langs or removed_langs:
         if added_langs:
             lines.append(f"- Languages added: {', '.join(added_langs)}")
@@ -28,24 +30,23 @@ def summarize_scan_changes(recent_scans: list[dict[str, Any]]) -> str:
             lines.append(f"- Languages removed: {', '.join(removed_langs)}")
     else:
         lines.append("- Languages: no change")
-    cur_signals = cur.get("signals") or {}
-    prev_signals = prev.get("signals") or {}
-    if cur_signals != prev_signals:
+
+    added_signals = [s for s in changes.added if s.kind == KIND_SIGNAL]
+    removed_signals = [s for s in changes.removed if s.kind == KIND_SIGNAL]
+    if added_signals or removed_signals:
         lines.append("- Signals changed:")
-        for key in sorted(set(cur_signals) | set(prev_signals)):
-            a = set(cur_signals.get(key) or [])
-            b = set(prev_signals.get(key) or [])
-            add = sorted(a - b)
-            rem = sorted(b - a)
-            if add or rem:
-                if add:
-                    lines.append(f"  - {key}: added {', '.join(add)}")
-                if rem:
-                    lines.append(f"  - {key}: removed {', '.join(rem)}")
+        for key in sorted({s.group for s in added_signals + removed_signals}):
+            add = [s.value for s in added_signals if s.group == key]
+            rem = [s.value for s in removed_signals if s.group == key]
+            if add:
+                lines.append(f"  - {key}: added {', '.join(add)}")
+            if rem:
+                lines.append(f"  - {key}: removed {', '.join(rem)}")
     else:
         lines.append("- Signals: no change")
-    cur_repo = cur.get("repo_type")
-    prev_repo = prev.get("repo_type")
+
+    cur_repo = next((s.value for s in changes.added if s.kind == KIND_REPO_TYPE), None)
+    prev_repo = next((s.value for s in changes.removed if s.kind == KIND_REPO_TYPE), None)
     if cur_repo != prev_repo:
         lines.append(f"- Repo type changed: {prev_repo} -> {cur_repo}")
     else:
@@ -53,22 +54,16 @@ def summarize_scan_changes(recent_scans: list[dict[str, Any]]) -> str:
     return "\n".join(lines)
 
 
-def summarize_doctor_changes(recent_doctors: list[dict[str, Any]]) -> str:
+def summarize_doctor_changes(changes: FindingChanges | None) -> str:
     """
-    Compara doctor mais recente com o anterior e descreve mudanças relevantes.
-    Espera lista com doctors mais recentes primeiro.
+    Descreve findings novos e resolvidos entre o doctor mais recente e o anterior.
+    `changes` vem de MemoryStore.finding_changes() (diff feito em SQL).
     """
-    if len(recent_doctors) < 2:
+    if changes is None:
         return "No previous doctor to compare."
 
-    cur = recent_doctors[0]["payload"]
-    prev = recent_doctors[1]["payload"]
-
-    cur_msgs = set(_doctor_keyset(cur))
-    prev_msgs = set(_doctor_keyset(prev))
-
-    added = sorted(cur_msgs - prev_msgs)
-    removed = sorted(prev_msgs - cur_msgs)
+    added = _labels(changes.added)
+    removed = _labels(changes.resolved)
 
     lines: list[str] = []
     if not added and not removed:
@@ -91,10 +86,6 @@ def summarize_doctor_changes(recent_doctors: list[dict[str, Any]]) -> str:
     return "\n".join(lines)
 
 
-def _doctor_keyset(payload: dict[str, Any]) -> list[str]:
-    out: list[str] = []
-    for r in payload.get("results") or []:
-        sev = (r.get("severity") or "info").upper()
-        msg = r.get("message") or ""
-        out.append(f"[{sev}] {msg}")
-    return out
+def _labels(findings: list[Finding]) -> list[str]:
+    # o mesmo finding em locations diferentes aparece uma vez só no resumo
+    return sorted({f.label() for f in findings})
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import json
+
+# Parser incremental de um objeto JSON {"nome": "conteúdo", ...} vindo em pedaços
+# (tokens do modelo). Cada par sai assim que o valor fecha, sem esperar o "}".
+# Texto antes do objeto (prosa, ```json) é ignorado; se um "{" da prosa não
+# abrir um objeto válido, a busca recomeça no "{" seguinte.
+
+_SEEK, _KEY_OR_END, _KEY, _COLON, _VALUE, _STRING, _RAW, _COMMA_OR_END, _DONE = range(9)
+_WHITESPACE = " \t\r\n"
+
+
+class JSONMappingParser:
+    def __init__(self) -> None:
+        self._state = _SEEK
+        self._buf: list[str] = []  # string (crua, com escapes) ou valor não-string
+        self._escape = False
+        self._key = ""
+        self._depth = 0  # aninhamento dentro de um valor não-string
+        self._raw_in_string = False
+        self.pairs = 0
+
+    @property
+    def done(self) -> bool:
+        return self._state == _DONE
+
+    def feed(self, text: str) -> list[tuple[str, str]]:
+        out: list[tuple[str, str]] = []
+        for ch in text:
+            if self._state == _DONE:
+                break
+            self._step(ch, out)
+        return out
+
+    def close(self) -> None:
+        if self._state != _DONE:
+            raise ValueError("Incomplete JSON object in model output")
+
+    def _restart(self, ch: str, out: list[tuple[str, str]]) -> None:
+        if self.pairs:
+            raise ValueError("Invalid JSON object in model output")
+        self._state = _SEEK
+        self._buf = []
+        self._escape = False
+        # o caractere que derrubou a tentativa pode ser o "{" do objeto de verdade
+        self._step(ch, out)
+
+    def _step(self, ch: str, out: list[tuple[str, str]]) -> None:
+        state = self._state
+
+        if state in (_KEY, _STRING):
+            if self._escape:
+                self._escape = False
+                self._buf.append(ch)
+            elif ch == "\\":
+                self._escape = True
+                self._buf.append(ch)
+            elif ch == '"':
+                try:
+                    value = json.loads('"' + "".join(self._buf) + '"')
+                except ValueError:
+                    self._restart(ch, out)
+                    return
+                self._buf = []
+                if state == _KEY:
+                    self._key = value
+                    self._state = _COLON
+                else:
+                    self.pairs += 1
+                    out.append((self._key, value))
+                    self._state = _COMMA_OR_END
+            else:
+                self._buf.append(ch)
+            return
+
+        if state == _RAW:
+            self._raw_step(ch, out)
+            return
+
+        if ch in _WHITESPACE:
+            return
+
+        if state == _SEEK:
+            if ch == "{":
+                self._state = _KEY_OR_END
+        elif state == _KEY_OR_END:
+            if ch == '"':
+                self._state = _KEY
+            elif ch == "}" and not self.pairs:
+                self._state = _DONE
+            else:
+                self._restart(ch, out)
+        elif state == _COLON:
+            if ch == ":":
+                self._state = _VALUE
+            else:
+                self._restart(ch, out)
+        elif state == _VALUE:
+            if ch == '"':
+                self._state = _STRING
+            else:
+                # número, objeto, lista...: guarda cru e converte com str() no fim
+                self._state = _RAW
+                self._depth = 0
+                self._raw_in_string = False
+                self._raw_step(ch, out)
+        elif state == _COMMA_OR_END:
+            if ch == ",":
+                self._state = _KEY_OR_END
+            elif ch == "}":
+                self._state = _DONE
+            else:
+                self._restart(ch, out)
+
+    def _raw_step(self, ch: str, out: list[tuple[str, str]]) -> None:
+        if self._raw_in_string:
+            self._buf.append(ch)
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._raw_in_string = False
+            return
+
+        if self._depth == 0 and (ch in ",}" or ch in _WHITESPACE):
+            try:
+                value = json.loads("".join(self._buf))
+            except ValueError:
+                self._restart(ch, out)
+                return
+            self._buf = []
+            self.pairs += 1
+            out.append((self._key, value if isinstance(value, str) else str(value)))
+            self._state = _COMMA_OR_END
+            if ch not in _WHITESPACE:
+                self._step(ch, out)
+            return
+
+        self._buf.append(ch)
+        if ch == '"':
+            self._raw_in_string = True
+        elif ch in "[{":
+            self._depth += 1
+        elif ch in "]}":
+            self._depth -= 1
+
+
+def parse_json_mapping(text: str) -> dict[str, str]:
+    """
+    Primeiro objeto JSON do texto como {str: str}, aceitando prosa e cercas ``` em volta.
+    """
+    parser = JSONMappingParser()
+    mapping = dict(parser.feed(text))
+    parser.close()
+    return mapping
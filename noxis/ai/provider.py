@@ -1,11 +1,30 @@
 from __future__ import annotations
 from pathlib import Path
 import json
-import re
-import urllib.request
-from dataclasses import dataclass
-from typing import Any
-import yaml
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING, Any, Callable
+
+from noxis.ai.json_stream import JSONMappingParser, parse_json_mapping
+from noxis.ai.resilience import ResiliencePolicy
+from noxis.ai.router import ModelRouter, ModelSpec
+from noxis.ai.streaming import StreamMetrics, TokenCallback, read_stream, server_context
+from noxis.ai.transport import (
+    HedgedTransport,
+    RequestExecutor,
+    Transport,
+    all_health,
+    get_transport,
+)
+from noxis.storage.cache import ResponseCache
+
+if TYPE_CHECKING:
+    from noxis.storage.memory import MemoryStore
+
+# estado de resiliência por servidor no project_state (lido pelo doctor)
+TRANSPORT_STATE_KEY = "ai_transport"
+TRANSPORT_STATE_MAX_AGE = 7 * 24 * 3600
 
 
 @dataclass(frozen=True)
@@ -13,63 +32,364 @@ class LocalHTTPConfig:
     base_url: str
     endpoint: str
     model: str
-    timeout_seconds: int = 120
+    timeout_seconds: int = 120  # leitura; a conexão tem connect_timeout_seconds
+    stream: bool = True
+    max_connections: int = 4
+    # ai.local_http.models: roteamento por tarefa; vazio usa só `model`
+    models: tuple[ModelSpec, ...] = ()
+    resilience: ResiliencePolicy = field(default_factory=ResiliencePolicy)
+
+
+@dataclass(frozen=True)
+class ServerContext:
+    """
+    Continuação de uma resposta anterior no servidor: o Ollama (/api/generate)
+    devolve `context` (tokens do prompt + resposta); mandado de volta com `prompt`
+    (só a parte nova), o prefill do que já foi processado é reaproveitado.
+    """
+
+    model: str
+    tokens: tuple[int, ...]
+    prompt: str
+
+
+class LastCall(threading.local):
+    """
+    Estado da última chamada ao modelo, por thread: o ai-tests chama o mesmo provider
+    de vários workers, e cada um lê só o que a própria chamada deixou.
+    """
+
+    def __init__(self, model: str) -> None:
+        self.model = model
+        self.reset()
+
+    def reset(self) -> None:
+        # métricas da chamada ao modelo (None: cache ou fallback)
+        self.metrics: StreamMetrics | None = None
+        self.streamed = False
+        # tamanho do prompt enviado e `context` devolvido pelo servidor
+        self.prompt_chars: int | None = None
+        self.context: list[int] | None = None
+        # explain: resposta completa (não fallback nem stream cortado)? usou `resume`?
+        self.complete = False
+        self.resumed = False
 
 
 class AIProvider:
     """
     MVP: Provider local via HTTP (sem dependências externas).
     - Mantém fallback determinístico para não quebrar o fluxo
+    - Com `cache`, respostas válidas são reaproveitadas por (model, endpoint, prompt)
+    - Com vários modelos configurados, `router` escolhe o modelo de cada chamada
     """
 
-    def __init__(self, config: LocalHTTPConfig | None = None) -> None:
+    def __init__(
+        self, config: LocalHTTPConfig | None = None, cache: ResponseCache | None = None
+    ) -> None:
         self.config = config or self._load_local_http_config()
-
-    def explain(self, prompt: str) -> str:
-        # MVP: pode usar o mesmo backend local no futuro.
-        # Por enquanto, mantém o comportamento simples.
-        return (
-            "Local provider configured.\n\n"
-            "Explain is not implemented with the model yet.\n\n"
-            "Prompt received:\n"
-            "----------------\n"
-            f"{prompt}"
+        self.cache = cache
+        # o que a última chamada desta thread deixou (modelo, métricas, contexto)
+        self.last = LastCall(self.config.model)
+        self.router = ModelRouter(
+            self.config.models or (ModelSpec(self.config.model),), self._url()
         )
+        self.store: "MemoryStore | None" = None
+        self._transport_state: dict[str, Any] = {}
 
-    def generate_tests(self, prompt: str) -> dict[str, str]:
+    def load_state(self, store: "MemoryStore") -> None:
         """
-        Returns {filename: content}
+        Medições por modelo (router) e estado dos servidores (circuit breaker,
+        latências) do memory.db; as chamadas seguintes atualizam os dois.
         """
+        self.router.load_stats(store)
+        try:
+            self._transport_state = store.get_state(TRANSPORT_STATE_KEY) or {}
+        except Exception:
+            self._transport_state = {}
+        for transport in self._transports():
+            saved = self._transport_state.get(transport.base_url)
+            if isinstance(saved, dict):
+                transport.health.restore(saved)
+        self.store = store
+
+    def _save_state(self) -> None:
+        if self.store is None:
+            return
+        # servidores sem uso há uma semana (base_url antigo) saem do estado
+        cutoff = time.time() - TRANSPORT_STATE_MAX_AGE
+        state = {
+            url: saved
+            for url, saved in self._transport_state.items()
+            if isinstance(saved, dict) and (saved.get("updated_at") or 0) >= cutoff
+        }
+        # todos os servidores usados no processo, não só os deste provider
+        for health in all_health():
+            state[health.base_url] = health.to_dict()
+        try:
+            self.store.set_state(TRANSPORT_STATE_KEY, state, wait=False)
+        except Exception:
+            pass
+
+    @property
+    def supports_server_context(self) -> bool:
+        # só o /api/generate do Ollama aceita e devolve `context`
+        return self.config.endpoint.rstrip("/").endswith("/api/generate")
+
+    def explain(
+        self,
+        prompt: str,
+        on_token: TokenCallback | None = None,
+        resume: ServerContext | None = None,
+    ) -> str:
+        """
+        Com `on_token` (e `stream` ligado na config), o texto chega em pedaços
+        conforme o modelo gera; o retorno é sempre a resposta completa.
+        Com `resume`, o modelo dele recebe só `resume.prompt` sobre o contexto
+        guardado no servidor; os demais modelos recebem `prompt` inteiro.
+        """
+        self.last.reset()
+        models = self.router.candidates("explain", prompt)
+        cached = self._cached(prompt, models)
+        if cached is not None:
+            if on_token is not None:
+                on_token(cached)
+            self.last.complete = True
+            return cached
+
+        streamed: list[str] = []
+
+        def collect(token: str) -> None:
+            streamed.append(token)
+            on_token(token)
+
+        def attempt(spec: ModelSpec) -> str:
+            cfg = self._config_for(spec)
+            sent, context = prompt, None
+            if resume is not None and resume.model == spec.name and self.supports_server_context:
+                sent, context = resume.prompt, resume.tokens
+            self.last.resumed = context is not None
+            if on_token is not None and cfg.stream:
+                return self._stream_local_model(sent, collect, cfg, context)
+            return self._call_local_model(sent, cfg, context)
 
         try:
-            raw = self._call_local_model(prompt)
+            # outro modelo só se nada foi exibido ainda
+            response = self.router.call(
+                "explain", models, attempt, fallback_on=lambda _exc: not streamed
+            )
+        except Exception:
+            if streamed:
+                # conexão caiu no meio: fica o que já foi exibido, sem cache
+                return "".join(streamed)
+            return (
+                "Local model unavailable.\n\n"
+                "Prompt received:\n"
+                "----------------\n"
+                f"{prompt}"
+            )
+        self._remember(prompt, self.last.model, response)
+        self.last.complete = True
+        return response
+
+    def generate_tests(self, prompt: str, fallback: bool = True) -> dict[str, str]:
+        """
+        Returns {filename: content}
+        `fallback=False` propaga o erro em vez de devolver o teste smoke (modo batch).
+        """
+
+        models = self.router.candidates("tests", prompt)
+
+        def attempt(spec: ModelSpec) -> dict[str, str]:
+            raw = self._call_local_model(prompt, self._config_for(spec))
             payload = self._parse_json_mapping(raw)
             self._validate_tests_mapping(payload)
+            # só guarda saídas que passaram na validação
+            self._remember(prompt, spec.name, raw)
             return payload
+
+        try:
+            cached = self._cached(prompt, models)
+            if cached is not None:
+                payload = self._parse_json_mapping(cached)
+                self._validate_tests_mapping(payload)
+            else:
+                payload = self.router.call("tests", models, attempt)
         except Exception:
+            if not fallback:
+                raise
             return self._fallback_tests()
+        return payload
+
+    def generate_tests_stream(
+        self, prompt: str, on_file: Callable[[str, str], None]
+    ) -> dict[str, str]:
+        """
+        Como generate_tests(fallback=False), mas chama `on_file(nome, conteúdo)` para
+        cada arquivo assim que o par JSON fecha no stream, antes do fim da geração.
+        """
+        files: dict[str, str] = {}
+
+        def parse(raw_source: Callable[[TokenCallback], str]) -> str:
+            parser = JSONMappingParser()
+
+            def handle(text: str) -> None:
+                for name, content in parser.feed(text):
+                    self._validate_tests_mapping({name: content})
+                    files[name] = content
+                    on_file(name, content)
+
+            raw = raw_source(handle)
+            if not files:
+                parser.close()
+                raise ValueError("Empty tests mapping")
+            return raw
+
+        models = self.router.candidates("tests", prompt)
+        cached = self._cached(prompt, models)
+        if cached is not None:
+
+            def replay(handle: TokenCallback) -> str:
+                handle(cached)
+                return cached
+
+            parse(replay)
+            return files
+
+        def attempt(spec: ModelSpec) -> dict[str, str]:
+            cfg = self._config_for(spec)
+
+            def source(handle: TokenCallback) -> str:
+                if cfg.stream:
+                    return self._stream_local_model(prompt, handle, cfg)
+                raw = self._call_local_model(prompt, cfg)
+                handle(raw)
+                return raw
+
+            self._remember(prompt, spec.name, parse(source))
+            return files
+
+        # outro modelo só se nenhum arquivo saiu ainda
+        return self.router.call("tests", models, attempt, fallback_on=lambda _exc: not files)
+
+    def _config_for(self, spec: ModelSpec) -> LocalHTTPConfig:
+        return replace(
+            self.config,
+            model=spec.name,
+            timeout_seconds=spec.timeout_seconds or self.config.timeout_seconds,
+        )
+
+    def _cached(self, prompt: str, models: list[ModelSpec]) -> str | None:
+        # resposta de qualquer modelo elegível serve, na ordem do roteamento
+        if self.cache is None:
+            return None
+        for spec in models:
+            try:
+                cached = self.cache.get(spec.name, self._url(), prompt)
+            except Exception:
+                # cache é otimização: falha nele cai na chamada ao modelo
+                return None
+            if cached is not None:
+                self.last.model = spec.name
+                return cached
+        return None
 
-    def _call_local_model(self, prompt: str) -> str:
+    def _remember(self, prompt: str, model: str, response: str) -> None:
+        if self.cache is None:
+            return
+        try:
+            self.cache.put(model, self._url(), prompt, response)
+        except Exception:
+            pass
+
+    def _url(self) -> str:
+        return self.config.base_url.rstrip("/") + self.config.endpoint
+
+    @property
+    def transport(self) -> Transport | HedgedTransport:
+        primary, *hedge = self._transports()
+        return HedgedTransport(primary, hedge[0]) if hedge else primary
+
+    def _transports(self) -> list[Transport]:
         cfg = self.config
-        url = cfg.base_url.rstrip("/") + cfg.endpoint
+        policy = cfg.resilience
+        urls = [cfg.base_url] + ([policy.hedge_url] if policy.hedge_url else [])
+        return [
+            get_transport(url, cfg.max_connections, cfg.timeout_seconds, policy) for url in urls
+        ]
+
+    def executor(self, jobs: int | None = None) -> RequestExecutor:
+        """
+        Várias chamadas em voo contra o servidor local; por padrão tantas quanto o pool.
+        """
+        return RequestExecutor(jobs or self.config.max_connections)
 
+    def _payload(
+        self, prompt: str, stream: bool, model: str, context: tuple[int, ...] | None = None
+    ) -> dict[str, Any]:
         # Payload genérico: funciona bem com vários servidores locais.
-        # Ajuste depois conforme seu servidos (ex.: "stream": false etc.).
-        request_payload: dict[str, Any] = {
-            "model": cfg.model,
+        payload: dict[str, Any] = {
+            "model": model,
             "prompt": prompt,
-            "stream": False,
+            "stream": stream,
         }
+        if context:
+            payload["context"] = list(context)
+        return payload
 
-        req = urllib.request.Request(
-            url=url,
-            data=json.dumps(request_payload).encode("utf-8"),
-            headers={"Content-Type": "application/json"},
-            method="POST",
-        )
+    def _keep_context(self, context: list[int]) -> None:
+        self.last.context = context
 
-        with urllib.request.urlopen(req, timeout=cfg.timeout_seconds) as resp:
-            body = resp.read().decode("utf-8", errors="replace")
+    def _stream_local_model(
+        self,
+        prompt: str,
+        on_token: TokenCallback,
+        cfg: LocalHTTPConfig | None = None,
+        context: tuple[int, ...] | None = None,
+    ) -> str:
+        started = time.perf_counter()
+        cfg = cfg or self.config
+        self.last.model = cfg.model
+        self.last.prompt_chars = len(prompt)
+        payload = self._payload(prompt, True, cfg.model, context)
+        try:
+            with self.transport.stream_json(
+                cfg.endpoint, payload, timeout=cfg.timeout_seconds
+            ) as resp:
+                text, metrics = read_stream(
+                    resp,
+                    resp.headers.get("Content-Type", ""),
+                    on_token,
+                    started,
+                    on_context=self._keep_context,
+                )
+                resp.read()  # resto do corpo (chunk final): libera a conexão para o pool
+        finally:
+            self._save_state()
+        self.last.metrics = metrics
+        self.last.streamed = True
+        return text
+
+    def _call_local_model(
+        self,
+        prompt: str,
+        cfg: LocalHTTPConfig | None = None,
+        context: tuple[int, ...] | None = None,
+    ) -> str:
+        started = time.perf_counter()
+        cfg = cfg or self.config
+        self.last.model = cfg.model
+        self.last.prompt_chars = len(prompt)
+        payload = self._payload(prompt, False, cfg.model, context)
+        try:
+            resp = self.transport.post_json(cfg.endpoint, payload, timeout=cfg.timeout_seconds)
+        finally:
+            self._save_state()
+        body = resp.body.decode("utf-8", errors="replace")
+        total_ms = (time.perf_counter() - started) * 1000
+        self.last.metrics = StreamMetrics(
+            ttft_ms=None, total_ms=total_ms, tokens=0, tokens_per_sec=None
+        )
+        self.last.streamed = False
 
         # Muitos servidores retornam JSON com campo "response" ou "text"
         # mas alguns retornam direto texto. Vamos tratar ambos.
@@ -77,6 +397,8 @@ class AIProvider:
         try:
             as_json = json.loads(body)
             if isinstance(as_json, dict):
+                self._record_server_counts(as_json, total_ms)
+                self.last.context = server_context(as_json)
                 # chaves comuns
                 for key in ("response", "text", "output", "message", "content"):
                     v = as_json.get(key)
@@ -93,6 +415,24 @@ class AIProvider:
         except Exception:
             return body
 
+    def _record_server_counts(self, body: dict[str, Any], total_ms: float) -> None:
+        # ollama informa tokens gerados, tempo de geração e de prefill (ns) na resposta
+        count = body.get("eval_count")
+        duration = body.get("eval_duration")
+        if not isinstance(count, int):
+            return
+        rate = count / (duration / 1e9) if isinstance(duration, int) and duration else None
+        prompt_count = body.get("prompt_eval_count")
+        prefill = body.get("prompt_eval_duration")
+        self.last.metrics = StreamMetrics(
+            ttft_ms=None,
+            total_ms=total_ms,
+            tokens=count,
+            tokens_per_sec=rate,
+            prompt_tokens=prompt_count if isinstance(prompt_count, int) else None,
+            prefill_ms=prefill / 1e6 if isinstance(prefill, int) else None,
+        )
+
     def _parse_json_mapping(self, raw: str) -> dict[str, str]:
         """
         Espera um JSON objeto: {"test_x.py": "...", ...}
@@ -108,32 +448,8 @@ class AIProvider:
         except Exception:
             pass
 
-        # 2) extrair bloco JSON dentro do texto (inclusive em ```json ... ```)
-        candidate = self._extract_first_json_object(raw)
-        parsed = json.loads(candidate)
-        if not isinstance(parsed, dict):
-            raise ValueError("Model output JSON is not an object mapping filename->content")
-        return {str(k): str(v) for k, v in parsed.items()}
-
-    def _extract_first_json_object(self, text: str) -> str:
-        # tenta pegar dentro de ```json ... ```
-        fence = re.search(r"```(?:json)?\s*({.*?})\s*```", text, flags=re.DOTALL)
-        if fence:
-            return fence.group(1)
-
-        start = text.find("{")
-        if start == -1:
-            raise ValueError("No JSON object found in model output")
-
-        depth = 0
-        for i in range(start, len(text)):
-            if text[i] == "{":
-                depth += 1
-            elif text[i] == "}":
-                depth -= 1
-                if depth == 0:
-                    return text[start : i + 1]
-        raise ValueError("Unbalanced JSON braces in model output")
+        # 2) objeto embutido em texto/cercas ```json (parser respeita strings e escapes)
+        return parse_json_mapping(raw)
 
     def _validate_tests_mapping(self, mapping: dict[str, str]) -> None:
         if not mapping:
@@ -159,15 +475,10 @@ class AIProvider:
             """
 
     def _load_local_http_config(self) -> LocalHTTPConfig:
-        # 1) tentar .noxis/policies.yml
-        policies_path = Path(".noxis/policies.yml")
-        if policies_path.exists():
-            data = yaml.safe_load(policies_path.read_text(encoding="utf-8"))
-        else:
-            # 2) fallback: defaults.yml do pacote
-            from noxis.policies.loader import load_default_policies_yaml
+        # .noxis/policies.yml do diretório atual sobre os defaults do pacote
+        from noxis.policies.loader import load_policies
 
-            data = yaml.safe_load(load_default_policies_yaml())
+        data = load_policies(Path(".noxis/policies.yml"))
 
         ai_cfg = (data or {}).get("ai", {})
         local = ai_cfg.get("local_http", {})
@@ -176,9 +487,24 @@ class AIProvider:
         endpoint = local.get("endpoint", "/api/generate")
         model = local.get("model", "qwen2.5-coder:7b")
         timeout = int(local.get("timeout_seconds", 120))
+        stream = bool(local.get("stream", True))
+        max_connections = max(1, int(local.get("max_connections", 4)))
+        models: list[ModelSpec] = []
+        for item in local.get("models") or []:
+            try:
+                models.append(ModelSpec.from_policy(item))
+            except (TypeError, ValueError):
+                continue  # entrada inválida não derruba o comando
 
         return LocalHTTPConfig(
-            base_url=base_url, endpoint=endpoint, model=model, timeout_seconds=timeout
+            base_url=base_url,
+            endpoint=endpoint,
+            model=model,
+            timeout_seconds=timeout,
+            stream=stream,
+            max_connections=max_connections,
+            models=tuple(models),
+            resilience=ResiliencePolicy.from_policy(local),
         )
 
     def _fallback_tests(self) -> dict[str, str]:
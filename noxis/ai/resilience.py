@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any
+
+# Controles de cauda de latência do transporte, por servidor (base_url):
+# - retry com backoff exponencial + jitter, limitado por um orçamento proporcional
+#   ao tráfego (retries nunca multiplicam a carga de um servidor já em apuros);
+# - circuit breaker: depois de N falhas seguidas, falha na hora durante o cooldown;
+#   passado o cooldown, um único request de prova decide se fecha de novo;
+# - latências recentes (1º byte da resposta) para o percentil do hedge.
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(ConnectionError):
+    def __init__(self, base_url: str, retry_in: float) -> None:
+        super().__init__(f"Circuit open for {base_url}; retry in {retry_in:.0f}s")
+        self.base_url = base_url
+        self.retry_in = retry_in
+
+
+@dataclass(frozen=True)
+class ResiliencePolicy:
+    """
+    Seção `ai.local_http` (connect_timeout_seconds, retry, circuit_breaker, hedge).
+    """
+
+    connect_timeout_seconds: float = 5.0
+    max_retries: int = 2
+    backoff_ms: int = 200
+    max_backoff_ms: int = 5000
+    # fração dos requests que pode virar retry (além de uma reserva inicial)
+    retry_budget_ratio: float = 0.2
+    breaker_failures: int = 3
+    breaker_cooldown_seconds: float = 30.0
+    hedge_url: str | None = None
+    hedge_percentile: float = 95.0
+    hedge_min_samples: int = 20
+
+    @staticmethod
+    def from_policy(local: dict[str, Any]) -> "ResiliencePolicy":
+        d = ResiliencePolicy()
+        retry = local.get("retry") or {}
+        breaker = local.get("circuit_breaker") or {}
+        hedge = local.get("hedge") or {}
+        return ResiliencePolicy(
+            connect_timeout_seconds=float(
+                local.get("connect_timeout_seconds", d.connect_timeout_seconds)
+            ),
+            max_retries=max(0, int(retry.get("max_retries", d.max_retries))),
+            backoff_ms=max(0, int(retry.get("backoff_ms", d.backoff_ms))),
+            max_backoff_ms=max(0, int(retry.get("max_backoff_ms", d.max_backoff_ms))),
+            retry_budget_ratio=max(0.0, float(retry.get("budget_ratio", d.retry_budget_ratio))),
+            breaker_failures=max(1, int(breaker.get("failures", d.breaker_failures))),
+            breaker_cooldown_seconds=max(
+                0.0, float(breaker.get("cooldown_seconds", d.breaker_cooldown_seconds))
+            ),
+            hedge_url=hedge.get("base_url") or None,
+            hedge_percentile=min(99.9, max(1.0, float(hedge.get("percentile", 95)))),
+            hedge_min_samples=max(1, int(hedge.get("min_samples", d.hedge_min_samples))),
+        )
+
+
+def backoff_delay(attempt: int, policy: ResiliencePolicy, rnd: random.Random) -> float:
+    # "full jitter": uniforme em [0, min(teto, base * 2^tentativa)], em segundos
+    ceiling = min(policy.max_backoff_ms, policy.backoff_ms * (2**attempt))
+    return rnd.uniform(0, ceiling) / 1000
+
+
+class RetryBudget:
+    """
+    Cada request deposita `ratio`; cada retry gasta 1. Começa com uma reserva
+    para que um comando curto ainda consiga repetir uma falha isolada.
+    """
+
+    def __init__(self, ratio: float, reserve: float = 2.0, cap: float = 10.0) -> None:
+        self.ratio = ratio
+        self.cap = max(cap, reserve)
+        self.balance = reserve
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self.balance = min(self.cap, self.balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.balance < 1:
+                return False
+            self.balance -= 1
+            return True
+
+
+class LatencyTracker:
+    def __init__(self, maxlen: int = 200) -> None:
+        self.samples: deque[float] = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def add(self, ms: float) -> None:
+        with self._lock:
+            self.samples.append(ms)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def percentile(self, p: float) -> float | None:
+        with self._lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class CircuitBreaker:
+    def __init__(self, failures: int, cooldown_seconds: float) -> None:
+        self.threshold = failures
+        self.cooldown = cooldown_seconds
+        self.state = CLOSED
+        self.failures = 0  # seguidas
+        self.opened_at: float | None = None  # time.time(): persiste entre processos
+        self.last_error = ""
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def retry_in(self) -> float:
+        if self.state != OPEN or self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.cooldown - time.time())
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.retry_in() > 0:
+                return False
+            # cooldown acabou: deixa passar um único request de prova
+            if self._probing:
+                return False
+            self.state = HALF_OPEN
+            self._probing = True
+            return True
+
+    def success(self) -> None:
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def failure(self, error: str) -> None:
+        with self._lock:
+            self.failures += 1
+            self.last_error = error
+            self._probing = False
+            if self.state == HALF_OPEN or self.failures >= self.threshold:
+                self.state = OPEN
+                self.opened_at = time.time()
+
+
+class ServerHealth:
+    """
+    Estado de resiliência de um servidor: breaker, orçamento de retry, latências
+    e contadores. `to_dict`/`restore` levam o estado para o memory.db (doctor).
+    """
+
+    def __init__(self, base_url: str, policy: ResiliencePolicy) -> None:
+        self.base_url = base_url
+        self.policy = policy
+        self.breaker = CircuitBreaker(policy.breaker_failures, policy.breaker_cooldown_seconds)
+        self.budget = RetryBudget(policy.retry_budget_ratio)
+        # stream: até o 1º byte do corpo (≈ TTFT); sem stream: resposta inteira
+        self.latency = {"stream": LatencyTracker(), "call": LatencyTracker()}
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.restored = False
+        self._rnd = random.Random()
+        self._lock = threading.Lock()
+
+    def apply_policy(self, policy: ResiliencePolicy) -> None:
+        """
+        Policy nova (policies.yml editado): limites do breaker e do orçamento mudam,
+        mas o estado (aberto, falhas seguidas, saldo) continua valendo.
+        """
+        if policy == self.policy:
+            return
+        self.policy = policy
+        b = self.breaker
+        with b._lock:
+            b.threshold = policy.breaker_failures
+            b.cooldown = policy.breaker_cooldown_seconds
+        with self.budget._lock:
+            self.budget.ratio = policy.retry_budget_ratio
+
+    def admit(self) -> None:
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.base_url, self.breaker.retry_in())
+        self.budget.deposit()
+
+    def backoff(self, attempt: int) -> float:
+        with self._lock:
+            return backoff_delay(attempt, self.policy, self._rnd)
+
+    def success(self, kind: str, ms: float) -> None:
+        self.breaker.success()
+        self.latency[kind].add(ms)
+        self.bump("calls")
+
+    def failure(self, error: BaseException) -> None:
+        self.breaker.failure(str(error) or type(error).__name__)
+        self.bump("calls")
+        self.bump("errors")
+
+    def bump(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def to_dict(self) -> dict[str, Any]:
+        b = self.breaker
+        latency = {}
+        for kind, tracker in self.latency.items():
+            latency[kind] = {
+                "p50_ms": tracker.percentile(50),
+                "p95_ms": tracker.percentile(95),
+                "samples": [round(ms, 1) for ms in list(tracker.samples)],
+            }
+        return {
+            "state": b.state,
+            "consecutive_failures": b.failures,
+            "opened_at": b.opened_at,
+            "cooldown_seconds": b.cooldown,
+            "last_error": b.last_error,
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "latency": latency,
+            "updated_at": time.time(),
+        }
+
+    def restore(self, data: dict[str, Any]) -> None:
+        # só uma vez por processo: o estado em memória é mais novo que o do banco
+        if self.restored:
+            return
+        self.restored = True
+        b = self.breaker
+        with b._lock:
+            state = data.get("state", CLOSED)
+            # half_open de outro processo: a prova não terminou, trata como aberto
+            b.state = OPEN if state in (OPEN, HALF_OPEN) else CLOSED
+            b.failures = int(data.get("consecutive_failures") or 0)
+            b.opened_at = data.get("opened_at")
+            b.last_error = str(data.get("last_error") or "")
+        with self._lock:
+            for counter in ("calls", "errors", "retries", "hedges", "hedge_wins"):
+                setattr(self, counter, int(data.get(counter) or 0))
+        for kind, info in (data.get("latency") or {}).items():
+            tracker = self.latency.get(kind)
+            if tracker is not None:
+                for ms in info.get("samples") or []:
+                    tracker.add(float(ms))
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Sequence, TypeVar
+
+from noxis.ai.resilience import CircuitOpenError
+
+if TYPE_CHECKING:
+    from noxis.storage.memory import MemoryStore
+
+T = TypeVar("T")
+
+TASKS = ("explain", "tests")
+# mesma estimativa do ast_compactor: ~4 caracteres por token
+CHARS_PER_TOKEN = 4
+# peso da chamada mais recente nas médias móveis de latência e sucesso
+EWMA_WEIGHT = 0.3
+# abaixo disso o modelo vai para o fim da fila, mesmo sendo o mais rápido
+MIN_SUCCESS_RATE = 0.5
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    """
+    Um modelo de `ai.local_http.models`. None: sem restrição.
+    """
+
+    name: str
+    tasks: frozenset[str] | None = None
+    max_prompt_tokens: int | None = None
+    timeout_seconds: int | None = None
+
+    def accepts(self, task: str, prompt_tokens: int) -> bool:
+        if self.tasks is not None and task not in self.tasks:
+            return False
+        return self.max_prompt_tokens is None or prompt_tokens <= self.max_prompt_tokens
+
+    @staticmethod
+    def from_policy(item: Any) -> "ModelSpec":
+        # "nome" ou {name, tasks, max_prompt_tokens, timeout_seconds}
+        if isinstance(item, str):
+            return ModelSpec(item)
+        if not isinstance(item, dict) or not item.get("name"):
+            raise ValueError(f"Invalid model entry in ai.local_http.models: {item!r}")
+        tasks = item.get("tasks")
+        if isinstance(tasks, str):
+            tasks = [tasks]
+        max_tokens = item.get("max_prompt_tokens")
+        timeout = item.get("timeout_seconds")
+        return ModelSpec(
+            name=str(item["name"]),
+            tasks=frozenset(str(t) for t in tasks) if tasks else None,
+            max_prompt_tokens=None if max_tokens is None else int(max_tokens),
+            timeout_seconds=None if timeout is None else int(timeout),
+        )
+
+
+@dataclass(frozen=True)
+class ModelStats:
+    calls: int
+    latency_ms: float | None  # média móvel das chamadas com sucesso
+    success_rate: float
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class ModelRouter:
+    """
+    Escolhe o modelo por tarefa ("explain", "tests") e tamanho do prompt:
+    entre os que atendem a regra, o de menor latência medida; modelos ainda
+    sem medição vão primeiro (na ordem do policies.yml) para serem medidos.
+    Se a chamada falha (timeout, erro HTTP, saída inválida), tenta o próximo.
+    """
+
+    def __init__(self, models: Sequence[ModelSpec], endpoint: str) -> None:
+        if not models:
+            raise ValueError("ModelRouter needs at least one model")
+        self.models = list(models)
+        self.endpoint = endpoint
+        self.store: "MemoryStore | None" = None
+        self._stats: dict[tuple[str, str], ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def load_stats(self, store: "MemoryStore") -> None:
+        """
+        Carrega as medições do memory.db e passa a gravar as novas nele.
+        """
+        try:
+            rows = store.get_model_stats(self.endpoint)
+        except Exception:
+            rows = []
+        with self._lock:
+            for model, task, calls, latency_ms, success_rate in rows:
+                self._stats[(model, task)] = ModelStats(calls, latency_ms, success_rate)
+        self.store = store
+
+    def stats(self, model: str, task: str) -> ModelStats | None:
+        with self._lock:
+            return self._stats.get((model, task))
+
+    def candidates(self, task: str, prompt: str) -> list[ModelSpec]:
+        tokens = estimate_tokens(prompt)
+        eligible = [m for m in self.models if m.accepts(task, tokens)]
+        if not eligible:
+            # nenhum comporta o prompt: os da tarefa, do maior limite para o menor
+            eligible = sorted(
+                (m for m in self.models if m.tasks is None or task in m.tasks),
+                key=lambda m: -(m.max_prompt_tokens or math.inf),
+            )
+        if not eligible:
+            eligible = list(self.models)
+
+        def rank(item: tuple[int, ModelSpec]) -> tuple[int, float, int]:
+            order, spec = item
+            stats = self.stats(spec.name, task)
+            if stats is None or stats.calls == 0:
+                return (0, 0.0, order)
+            latency = math.inf if stats.latency_ms is None else stats.latency_ms
+            return (1 if stats.success_rate >= MIN_SUCCESS_RATE else 2, latency, order)
+
+        return [spec for _, spec in sorted(enumerate(eligible), key=rank)]
+
+    def call(
+        self,
+        task: str,
+        models: Sequence[ModelSpec],
+        attempt: Callable[[ModelSpec], T],
+        fallback_on: Callable[[Exception], bool] | None = None,
+    ) -> T:
+        """
+        `attempt(spec)` em cada modelo até um dar certo. `fallback_on(exc)` False
+        interrompe (ex.: parte da resposta já foi exibida) e propaga o erro.
+        """
+        last_error: Exception | None = None
+        for spec in models:
+            started = time.perf_counter()
+            try:
+                result = attempt(spec)
+            except CircuitOpenError:
+                # servidor fora do ar: os outros modelos estão nele também; não
+                # conta contra o modelo
+                raise
+            except Exception as exc:
+                self.record(spec.name, task, None)
+                if fallback_on is not None and not fallback_on(exc):
+                    raise
+                last_error = exc
+                continue
+            self.record(spec.name, task, (time.perf_counter() - started) * 1000)
+            return result
+        if last_error is None:
+            raise RuntimeError(f"No model available for task {task!r}")
+        raise last_error
+
+    def record(self, model: str, task: str, latency_ms: float | None) -> None:
+        # latency_ms None: falhou
+        w = EWMA_WEIGHT
+        ok = 1.0 if latency_ms is not None else 0.0
+        with self._lock:
+            old = self._stats.get((model, task))
+            if old is None:
+                new = ModelStats(1, latency_ms, ok)
+            else:
+                latency = old.latency_ms
+                if latency_ms is not None:
+                    latency = latency_ms if latency is None else latency * (1 - w) + latency_ms * w
+                new = ModelStats(old.calls + 1, latency, old.success_rate * (1 - w) + ok * w)
+            self._stats[(model, task)] = new
+        if self.store is not None:
+            try:
+                self.store.record_model_call(model, self.endpoint, task, latency_ms, w)
+            except Exception:
+                pass
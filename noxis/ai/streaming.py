@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Callable, Iterator
+
+# Respostas em streaming dos servidores locais:
+# - NDJSON (Ollama): uma linha JSON por pedaço, {"response": "...", "done": false};
+#   a última traz eval_count/eval_duration (tokens gerados, ns), prompt_eval_count/
+#   prompt_eval_duration (prefill) e, no /api/generate, `context` (tokens da conversa).
+# - SSE (llama.cpp, vLLM, servidores OpenAI-compatíveis): linhas "data: {...}",
+#   texto em choices[0].delta.content / choices[0].text / content; fim em "data: [DONE]".
+
+TokenCallback = Callable[[str], None]
+ContextCallback = Callable[[list[int]], None]
+
+
+@dataclass(frozen=True)
+class StreamMetrics:
+    ttft_ms: float | None  # time to first token (desde o envio do request)
+    total_ms: float
+    tokens: int
+    tokens_per_sec: float | None
+    # prefill informado pelo servidor (Ollama); sem ele, ttft_ms é a aproximação
+    prompt_tokens: int | None = None
+    prefill_ms: float | None = None
+
+
+@dataclass
+class _Chunk:
+    text: str = ""
+    done: bool = False
+    eval_count: int | None = None
+    eval_duration_ns: int | None = None
+    prompt_eval_count: int | None = None
+    prompt_eval_duration_ns: int | None = None
+    context: list[int] | None = None
+
+
+def _int_or_none(value: Any) -> int | None:
+    return value if isinstance(value, int) else None
+
+
+def server_context(obj: dict[str, Any]) -> list[int] | None:
+    context = obj.get("context")
+    if isinstance(context, list) and context and all(isinstance(t, int) for t in context):
+        return context
+    return None
+
+
+def _text_of(obj: dict[str, Any]) -> str:
+    for key in ("response", "content", "text"):
+        v = obj.get(key)
+        if isinstance(v, str):
+            return v
+    message = obj.get("message")
+    if isinstance(message, dict) and isinstance(message.get("content"), str):
+        return message["content"]  # ollama /api/chat
+    choices = obj.get("choices")
+    if isinstance(choices, list) and choices and isinstance(choices[0], dict):
+        first = choices[0]
+        delta = first.get("delta")
+        if isinstance(delta, dict) and isinstance(delta.get("content"), str):
+            return delta["content"]
+        if isinstance(first.get("text"), str):
+            return first["text"]
+    return ""
+
+
+def _parse_event(payload: str) -> _Chunk | None:
+    try:
+        obj = json.loads(payload)
+    except ValueError:
+        return None
+    if not isinstance(obj, dict):
+        return None
+    if isinstance(obj.get("error"), str):
+        raise RuntimeError(f"Model server error: {obj['error']}")
+
+    choices = obj.get("choices")
+    finished = (
+        isinstance(choices, list)
+        and bool(choices)
+        and isinstance(choices[0], dict)
+        and choices[0].get("finish_reason") is not None
+    )
+    return _Chunk(
+        text=_text_of(obj),
+        done=bool(obj.get("done") or obj.get("stop")) or finished,
+        eval_count=_int_or_none(obj.get("eval_count")),
+        eval_duration_ns=_int_or_none(obj.get("eval_duration")),
+        prompt_eval_count=_int_or_none(obj.get("prompt_eval_count")),
+        prompt_eval_duration_ns=_int_or_none(obj.get("prompt_eval_duration")),
+        context=server_context(obj),
+    )
+
+
+def _iter_chunks(body: BinaryIO, sse: bool) -> Iterator[_Chunk]:
+    # readline em bytes: uma linha nunca corta um caractere UTF-8 ao meio
+    for raw in iter(body.readline, b""):
+        line = raw.decode("utf-8", errors="replace").strip()
+        if not line:
+            continue
+        if sse:
+            if not line.startswith("data:"):
+                continue  # "event:", "id:", comentários ":"
+            line = line[5:].strip()
+            if line == "[DONE]":
+                return
+        chunk = _parse_event(line)
+        if chunk is None:
+            continue
+        yield chunk
+        if chunk.done:
+            return
+
+
+def read_stream(
+    body: BinaryIO,
+    content_type: str,
+    on_token: TokenCallback,
+    started: float,
+    on_context: ContextCallback | None = None,
+) -> tuple[str, StreamMetrics]:
+    """
+    Consome a resposta em streaming chamando `on_token` a cada pedaço de texto.
+    `started` é o perf_counter() do envio do request; `on_context` recebe o
+    `context` do chunk final, quando o servidor o devolve.
+    """
+    sse = "text/event-stream" in (content_type or "")
+    parts: list[str] = []
+    first: float | None = None
+    pieces = 0
+    eval_count: int | None = None
+    eval_duration_ns: int | None = None
+    prompt_tokens: int | None = None
+    prefill_ns: int | None = None
+
+    for chunk in _iter_chunks(body, sse):
+        if chunk.text:
+            if first is None:
+                first = time.perf_counter()
+            pieces += 1
+            parts.append(chunk.text)
+            on_token(chunk.text)
+        if chunk.eval_count is not None:
+            eval_count = chunk.eval_count
+            eval_duration_ns = chunk.eval_duration_ns
+        if chunk.prompt_eval_count is not None:
+            prompt_tokens = chunk.prompt_eval_count
+        if chunk.prompt_eval_duration_ns is not None:
+            prefill_ns = chunk.prompt_eval_duration_ns
+        if chunk.context is not None and on_context is not None:
+            on_context(chunk.context)
+
+    end = time.perf_counter()
+    tokens = eval_count if eval_count is not None else pieces
+    if eval_duration_ns:
+        rate: float | None = tokens / (eval_duration_ns / 1e9)
+    elif first is not None and end > first and pieces > 1:
+        # sem contagem do servidor: pedaços recebidos ≈ tokens
+        rate = (pieces - 1) / (end - first)
+    else:
+        rate = None
+
+    metrics = StreamMetrics(
+        ttft_ms=None if first is None else (first - started) * 1000,
+        total_ms=(end - started) * 1000,
+        tokens=tokens,
+        tokens_per_sec=rate,
+        prompt_tokens=prompt_tokens,
+        prefill_ms=None if prefill_ns is None else prefill_ns / 1e6,
+    )
+    return "".join(parts), metrics
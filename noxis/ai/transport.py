@@ -0,0 +1,440 @@
+from __future__ import annotations
+
+import http.client
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, TypeVar
+from urllib.parse import urlsplit
+
+from noxis.ai.resilience import CLOSED, OPEN, CircuitOpenError, ResiliencePolicy, ServerHealth
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# conexão keep-alive derrubada pelo servidor enquanto estava ociosa no pool
+_STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    BrokenPipeError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+)
+
+
+class TransportError(RuntimeError):
+    def __init__(self, status: int, reason: str, body: bytes = b"") -> None:
+        super().__init__(f"HTTP {status} {reason}")
+        self.status = status
+        self.reason = reason
+        self.body = body
+
+
+class ConnectError(ConnectionError):
+    """
+    Falha ao abrir a conexão (recusada, sem rota, connect timeout): nada foi enviado.
+    """
+
+
+def is_retryable(exc: BaseException) -> bool:
+    # seguro repetir: nada chegou ao modelo, ou o servidor recusou por sobrecarga
+    if isinstance(exc, ConnectError):
+        return True
+    return isinstance(exc, TransportError) and (exc.status == 429 or exc.status >= 500)
+
+
+def is_server_failure(exc: BaseException) -> bool:
+    # conta para o circuit breaker; 4xx é erro do request, não do servidor
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, TransportError):
+        return exc.status == 429 or exc.status >= 500
+    return isinstance(exc, (OSError, http.client.HTTPException))
+
+
+@dataclass(frozen=True)
+class Response:
+    status: int
+    headers: http.client.HTTPMessage
+    body: bytes
+
+    def json(self) -> Any:
+        return json.loads(self.body.decode("utf-8", errors="replace"))
+
+
+class ConnectionPool:
+    """
+    Conexões HTTP/1.1 keep-alive para um único host. No máximo `max_connections`
+    abertas ao mesmo tempo; quem passa do limite espera uma ser devolvida.
+    """
+
+    def __init__(self, base_url: str, max_connections: int = 4, timeout: float = 120) -> None:
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Unsupported base URL: {base_url}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.max_connections = max(1, max_connections)
+        self._idle: deque[http.client.HTTPConnection] = deque()
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+        self._lock = threading.Lock()
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        cls = (
+            http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        )
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    @contextmanager
+    def connection(self) -> Iterator[tuple[http.client.HTTPConnection, bool]]:
+        """
+        Empresta uma conexão: (conn, reused). Quem usa fecha `conn` se ela
+        não puder voltar ao pool (erro, resposta não lida até o fim).
+        """
+        self._slots.acquire()
+        try:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            reused = conn is not None
+            if conn is None:
+                conn = self._new_connection()
+            try:
+                yield conn, reused
+            finally:
+                if conn.sock is not None:
+                    with self._lock:
+                        self._idle.append(conn)
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        with self._lock:
+            while self._idle:
+                self._idle.pop().close()
+
+
+class Transport:
+    """
+    POST JSON sobre o pool keep-alive. Uma conexão reaproveitada que o servidor
+    já fechou é refeita uma vez, transparente. Timeout de conexão separado do de
+    leitura (por request); falhas de conexão e 5xx repetem com backoff dentro do
+    orçamento, e o circuit breaker do servidor falha na hora enquanto aberto.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        max_connections: int = 4,
+        timeout: float = 120,
+        policy: ResiliencePolicy | None = None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.policy = policy or ResiliencePolicy()
+        self.pool = ConnectionPool(base_url, max_connections=max_connections, timeout=timeout)
+        self.health = get_health(base_url, policy)
+
+    def post_json(self, path: str, payload: Any, timeout: float | None = None) -> Response:
+        with self._send(path, payload, timeout) as resp:
+            body = resp.read()
+            return Response(resp.status, resp.headers, body)
+
+    @contextmanager
+    def stream_json(
+        self, path: str, payload: Any, timeout: float | None = None
+    ) -> Iterator[http.client.HTTPResponse]:
+        """
+        Resposta aberta para leitura incremental (`readline`); a conexão volta
+        ao pool só se o corpo foi consumido até o fim.
+        """
+        with self._send(path, payload, timeout) as resp:
+            yield resp
+
+    @contextmanager
+    def _send(
+        self, path: str, payload: Any, timeout: float | None
+    ) -> Iterator[http.client.HTTPResponse]:
+        data = json.dumps(payload).encode("utf-8")
+        kind = "stream" if isinstance(payload, dict) and payload.get("stream") else "call"
+        health = self.health
+        health.admit()
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            answered = False
+            try:
+                with self._exchange(path, data, timeout) as resp:
+                    if kind == "stream":
+                        # headers podem sair antes do modelo gerar: espera o 1º byte (≈ TTFT)
+                        resp.peek(1)
+                    answered = True
+                    health.success(kind, (time.perf_counter() - started) * 1000)
+                    yield resp
+                return
+            except Exception as exc:
+                if answered:
+                    # erro lendo o corpo (ou do chamador): sem retry, o modelo já gerou
+                    if is_server_failure(exc):
+                        health.failure(exc)
+                    raise
+                if is_server_failure(exc):
+                    health.failure(exc)
+                retry = (
+                    is_retryable(exc)
+                    and attempt < self.policy.max_retries
+                    and health.breaker.state == CLOSED
+                    and health.budget.withdraw()
+                )
+                if not retry:
+                    raise
+            time.sleep(health.backoff(attempt))
+            attempt += 1
+            health.bump("retries")
+
+    @contextmanager
+    def _exchange(
+        self, path: str, data: bytes, timeout: float | None
+    ) -> Iterator[http.client.HTTPResponse]:
+        headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        url = self.pool.prefix + path
+        read_timeout = self.pool.timeout if timeout is None else timeout
+
+        for attempt in range(2):
+            with self.pool.connection() as (conn, reused):
+                try:
+                    if conn.sock is None:
+                        conn.timeout = self.policy.connect_timeout_seconds
+                        try:
+                            conn.connect()
+                        except OSError as exc:
+                            raise ConnectError(f"{self.base_url}: {exc}") from exc
+                    conn.timeout = read_timeout
+                    conn.sock.settimeout(read_timeout)
+                    conn.request("POST", url, body=data, headers=headers)
+                    resp = conn.getresponse()
+                except _STALE_ERRORS:
+                    conn.close()
+                    if reused and attempt == 0:
+                        continue
+                    raise
+                except BaseException:
+                    conn.close()
+                    raise
+
+                try:
+                    if resp.status >= 400:
+                        raise TransportError(resp.status, resp.reason, resp.read())
+                    yield resp
+                except BaseException:
+                    conn.close()
+                    raise
+                finally:
+                    if not resp.isclosed():
+                        # corpo não lido até o fim: a conexão não pode ser reaproveitada
+                        conn.close()
+                return
+        raise AssertionError("unreachable")
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+class HedgedTransport:
+    """
+    Transport com hedge: se o servidor principal não respondeu (1º byte) até o
+    percentil configurado das latências recentes, o mesmo request vai também
+    para `hedge`; fica a primeira resposta, a outra é descartada ao chegar.
+    Com o breaker do principal aberto, vai direto para o hedge.
+    """
+
+    def __init__(self, primary: Transport, hedge: Transport) -> None:
+        self.primary = primary
+        self.hedge = hedge
+
+    def post_json(self, path: str, payload: Any, timeout: float | None = None) -> Response:
+        with self._send(path, payload, timeout) as resp:
+            body = resp.read()
+            return Response(resp.status, resp.headers, body)
+
+    @contextmanager
+    def stream_json(
+        self, path: str, payload: Any, timeout: float | None = None
+    ) -> Iterator[http.client.HTTPResponse]:
+        with self._send(path, payload, timeout) as resp:
+            yield resp
+
+    def _hedge_delay(self, payload: Any) -> float | None:
+        policy = self.primary.policy
+        kind = "stream" if isinstance(payload, dict) and payload.get("stream") else "call"
+        tracker = self.primary.health.latency[kind]
+        if len(tracker) < policy.hedge_min_samples:
+            return None
+        ms = tracker.percentile(policy.hedge_percentile)
+        return None if ms is None else ms / 1000
+
+    @contextmanager
+    def _send(
+        self, path: str, payload: Any, timeout: float | None
+    ) -> Iterator[http.client.HTTPResponse]:
+        primary = self.primary
+        if primary.health.breaker.state == OPEN and primary.health.breaker.retry_in() > 0:
+            with self.hedge._send(path, payload, timeout) as resp:
+                yield resp
+            return
+        delay = self._hedge_delay(payload)
+        if delay is None:
+            with primary._send(path, payload, timeout) as resp:
+                yield resp
+            return
+
+        race = _Race()
+        race.start(primary, path, payload, timeout)
+        if not race.settled.wait(delay):
+            primary.health.bump("hedges")
+            race.start(self.hedge, path, payload, timeout)
+        winner, cm, resp = race.result()
+        if winner is self.hedge:
+            primary.health.bump("hedge_wins")
+        # já entrou na thread da corrida: aqui só falta a saída
+        with ExitStack() as stack:
+            stack.push(cm)
+            yield resp
+
+
+class _Race:
+    """
+    Abre o mesmo request em mais de um Transport (threads daemon: um perdedor
+    pendurado não segura a saída do processo) e fica com a primeira resposta.
+    """
+
+    def __init__(self) -> None:
+        self.settled = threading.Event()
+        self._lock = threading.Lock()
+        self._winner: tuple[Transport, Any, http.client.HTTPResponse] | None = None
+        self._errors: list[BaseException] = []
+        self._running = 0
+
+    def start(self, transport: Transport, path: str, payload: Any, timeout: float | None) -> None:
+        with self._lock:
+            self._running += 1
+        thread = threading.Thread(
+            target=self._run, args=(transport, path, payload, timeout), daemon=True
+        )
+        thread.start()
+
+    def _run(self, transport: Transport, path: str, payload: Any, timeout: float | None) -> None:
+        cm = transport._send(path, payload, timeout)
+        try:
+            resp = cm.__enter__()
+        except BaseException as exc:  # noqa: BLE001
+            with self._lock:
+                self._errors.append(exc)
+                self._running -= 1
+                if self._running == 0 and self._winner is None:
+                    self.settled.set()
+            return
+        with self._lock:
+            self._running -= 1
+            if self._winner is None:
+                self._winner = (transport, cm, resp)
+                self.settled.set()
+                return
+        # perdeu: corpo não lido, a conexão é fechada ao sair
+        cm.__exit__(None, None, None)
+
+    def result(self) -> tuple[Transport, Any, http.client.HTTPResponse]:
+        while True:
+            self.settled.wait()
+            with self._lock:
+                if self._winner is not None:
+                    return self._winner
+                if self._running == 0:
+                    raise self._errors[0]
+                # uma falhou e a outra ainda corre: espera a outra
+                self.settled.clear()
+
+
+class RequestExecutor:
+    """
+    Executa chamadas ao modelo com concorrência limitada (threads: o trabalho é
+    esperar I/O do servidor local). O timeout de cada request é o do socket.
+    """
+
+    def __init__(self, max_workers: int = 4) -> None:
+        self.max_workers = max(1, max_workers)
+
+    def run(
+        self, fn: Callable[[T], R], items: Iterable[T]
+    ) -> Iterator[tuple[T, Future]]:
+        """
+        Devolve (item, future) na ordem em que terminam. No máximo `max_workers`
+        ficam em voo; os próximos só são submetidos quando um termina, então
+        `items` pode ser um gerador longo.
+        """
+        it = iter(items)
+        with ThreadPoolExecutor(self.max_workers, thread_name_prefix="noxis-ai") as pool:
+            in_flight: dict[Future, T] = {}
+
+            def fill() -> None:
+                while len(in_flight) < self.max_workers:
+                    try:
+                        item = next(it)
+                    except StopIteration:
+                        return
+                    in_flight[pool.submit(fn, item)] = item
+
+            fill()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield in_flight.pop(future), future
+                fill()
+
+
+_TRANSPORTS: dict[tuple[str, int], Transport] = {}
+_HEALTH: dict[str, ServerHealth] = {}
+_TRANSPORTS_LOCK = threading.Lock()
+_HEALTH_LOCK = threading.Lock()
+
+
+def get_transport(
+    base_url: str,
+    max_connections: int = 4,
+    timeout: float = 120,
+    policy: ResiliencePolicy | None = None,
+) -> Transport:
+    # um pool por servidor no processo: providers diferentes reaproveitam as conexões
+    key = (base_url.rstrip("/"), max_connections)
+    with _TRANSPORTS_LOCK:
+        transport = _TRANSPORTS.get(key)
+        if transport is None:
+            transport = _TRANSPORTS[key] = Transport(
+                base_url, max_connections=max_connections, timeout=timeout, policy=policy
+            )
+        elif policy is not None:
+            transport.policy = policy
+            get_health(base_url, policy)
+        return transport
+
+
+def get_health(base_url: str, policy: ResiliencePolicy | None = None) -> ServerHealth:
+    # breaker e latências por servidor, compartilhados por todos os pools dele
+    key = base_url.rstrip("/")
+    with _HEALTH_LOCK:
+        health = _HEALTH.get(key)
+        if health is None:
+            health = _HEALTH[key] = ServerHealth(key, policy or ResiliencePolicy())
+        elif policy is not None:
+            health.apply_policy(policy)
+        return health
+
+
+def all_health() -> list[ServerHealth]:
+    return list(_HEALTH.values())
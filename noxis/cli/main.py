@@ -2,18 +2,33 @@ from __future__ import annotations
 
 from pathlib import Path
 
+import sys
+
 import typer
 from rich.console import Console
+from rich.live import Live
+from rich.progress import Progress
+from rich.text import Text
 
 from noxis.core import workspace
 from noxis.core import orchestrator
 from noxis.core import results
 from noxis.core.orchestrator import Orchestrator
-from noxis.core.results import print_human_results
+from noxis.core.results import Result, print_human_results
 from noxis.core.workspace import Workspace
 
 app = typer.Typer(no_args_is_help=True, add_completion=False)
+db_app = typer.Typer(no_args_is_help=True, help="Manutenção do memory.db.")
+app.add_typer(db_app, name="db")
+history_app = typer.Typer(help="Histórico de scans e doctors gravado em memory.db.")
+app.add_typer(history_app, name="history")
+ai_history_app = typer.Typer(
+    no_args_is_help=True, help="Busca nas explicações de IA e findings antigos."
+)
+app.add_typer(ai_history_app, name="ai-history")
 console = Console()
+# relatórios de comandos que escrevem dados no stdout vão para o stderr
+err_console = Console(stderr=True)
 
 
 @app.callback()
@@ -64,6 +79,28 @@ def scan(
         dir_okay=True,
         resolve_path=True,
     ),
+    full: bool = typer.Option(
+        False,
+        "--full",
+        help=(
+            "Varre a árvore inteira no filesystem, sem cache de fingerprints. Sem ele, "
+            "checkouts git usam o .git/index (que já é o stat cache) e os demais, o cache."
+        ),
+    ),
+    since: str | None = typer.Option(
+        None,
+        "--since",
+        help="Reavalia apenas os paths alterados desde a revisão git informada.",
+    ),
+    monorepo: bool = typer.Option(
+        False,
+        "--workspace",
+        "-w",
+        help="Modo monorepo: um ProjectModel por sub-projeto, escaneados em paralelo.",
+    ),
+    jobs: int | None = typer.Option(
+        None, "--jobs", "-j", help="Processos paralelos no modo workspace (padrão: CPUs)."
+    ),
 ) -> None:
     """
     Analise o repositório e imprime um relatório do contexto (ProjectModel).
@@ -71,7 +108,9 @@ def scan(
     workspace = Workspace(root=path)
     orchestrator = Orchestrator()
 
-    results = orchestrator.scan(workspace)
+    results = orchestrator.scan(
+        workspace, full=full, since=since, monorepo=monorepo, jobs=jobs
+    )
     print_human_results(results, console)
     if any(r.severity == "error" for r in results):
         raise typer.Exit(code=1)
@@ -89,6 +128,15 @@ def doctor(
         dir_okay=True,
         resolve_path=True,
     ),
+    monorepo: bool = typer.Option(
+        False,
+        "--workspace",
+        "-w",
+        help="Modo monorepo: doctor por sub-projeto (requer `scan --workspace`).",
+    ),
+    jobs: int | None = typer.Option(
+        None, "--jobs", "-j", help="Processos paralelos no modo workspace (padrão: CPUs)."
+    ),
 ) -> None:
     """
     Verifica se o ambiente está adequado para o projeto.
@@ -96,13 +144,223 @@ def doctor(
     workspace = Workspace(root=path)
     orchestrator = Orchestrator()
 
-    results = orchestrator.doctor(workspace)
+    results = orchestrator.doctor(workspace, monorepo=monorepo, jobs=jobs)
 
     print_human_results(results, console)
     if any(r.severity == "error" for r in results):
         raise typer.Exit(code=1)
 
 
+@app.command()
+def watch(
+    path: Path = typer.Option(
+        Path("."),
+        "--path",
+        "-p",
+        help="Caminho do projeto (root).",
+        exists=True,
+        file_okay=False,
+        dir_okay=True,
+        resolve_path=True,
+    ),
+    debounce_ms: int = typer.Option(
+        300, "--debounce", help="Janela de debounce (ms) antes de aplicar mudanças."
+    ),
+    poll: bool = typer.Option(False, "--poll", help="Força o watcher por polling."),
+    interval: float = typer.Option(
+        1.0, "--interval", help="Intervalo (s) entre varreduras no modo polling."
+    ),
+) -> None:
+    """
+    Mantém o ProjectModel atualizado em memory.db conforme o filesystem muda.
+    """
+    workspace = Workspace(root=path)
+    orchestrator = Orchestrator()
+
+    def on_update(changed: list[str], results: list[Result]) -> None:
+        if changed:
+            console.print(f"[dim]{len(changed)} paths changed[/dim]")
+        print_human_results(results, console)
+
+    try:
+        orchestrator.watch(
+            workspace,
+            debounce_ms=debounce_ms,
+            force_polling=poll,
+            poll_interval=interval,
+            on_update=on_update,
+        )
+    except KeyboardInterrupt:
+        console.print("[dim]watch stopped[/dim]")
+
+
+@db_app.command("compact")
+def db_compact(
+    path: Path = typer.Option(
+        Path("."),
+        "--path",
+        "-p",
+        help="Caminho do projeto (root).",
+        exists=True,
+        file_okay=False,
+        dir_okay=True,
+        resolve_path=True,
+    ),
+    full: bool = typer.Option(
+        False, "--full", help="Reescreve o arquivo inteiro com VACUUM (mais lento)."
+    ),
+) -> None:
+    """
+    Aplica a retenção do policies.yml, faz incremental vacuum e trunca o WAL.
+    """
+    workspace = Workspace(root=path)
+    orchestrator = Orchestrator()
+
+    results = orchestrator.db_compact(workspace, full=full)
+
+    print_human_results(results, console)
+    if any(r.severity == "error" for r in results):
+        raise typer.Exit(code=1)
+
+
+@history_app.callback(invoke_without_command=True)
+def history(
+    ctx: typer.Context,
+    path: Path = typer.Option(
+        Path("."),
+        "--path",
+        "-p",
+        help="Caminho do projeto (root).",
+        exists=True,
+        file_okay=False,
+        dir_okay=True,
+        resolve_path=True,
+    ),
+) -> None:
+    """
+    Sem subcomando: mostra o que mudou no último scan/doctor.
+    """
+    if ctx.invoked_subcommand is None:
+        _print_and_exit(Orchestrator().history_changes(Workspace(root=path)))
+
+
+@history_app.command("changes")
+def history_changes(
+    path: Path = typer.Option(
+        Path("."),
+        "--path",
+        "-p",
+        help="Caminho do projeto (root).",
+        exists=True,
+        file_okay=False,
+        dir_okay=True,
+        resolve_path=True,
+    ),
+) -> None:
+    """
+    Findings novos/resolvidos e sinais alterados em relação ao run anterior.
+    """
+    _print_and_exit(Orchestrator().history_changes(Workspace(root=path)))
+
+
+@history_app.command("trends")
+def history_trends(
+    path: Path = typer.Option(
+        Path("."),
+        "--path",
+        "-p",
+        help="Caminho do projeto (root).",
+        exists=True,
+        file_okay=False,
+        dir_okay=True,
+        resolve_path=True,
+    ),
+    runs: int = typer.Option(20, "--runs", "-n", help="Quantidade de doctors analisados."),
+) -> None:
+    """
+    Contagem por severidade e findings recorrentes nos últimos N doctors.
+    """
+    _print_and_exit(Orchestrator().history_trends(Workspace(root=path), runs=runs))
+
+
+@history_app.command("export")
+def history_export(
+    path: Path = typer.Option(
+        Path("."),
+        "--path",
+        "-p",
+        help="Caminho do projeto (root).",
+        exists=True,
+        file_okay=False,
+        dir_okay=True,
+        resolve_path=True,
+    ),
+    fmt: str = typer.Option("ndjson", "--format", "-f", help="Formato de saída (ndjson)."),
+    output: Path | None = typer.Option(
+        None, "--output", "-o", help="Arquivo de saída (padrão: stdout)."
+    ),
+    command: str | None = typer.Option(
+        None, "--command", "-c", help="Exporta só runs deste comando (sem explicações de IA)."
+    ),
+    since: str | None = typer.Option(None, "--since", help="Data/hora ISO (UTC) inicial."),
+    until: str | None = typer.Option(
+        None, "--until", help="Data/hora ISO (UTC) final, exclusiva."
+    ),
+) -> None:
+    """
+    Exporta o histórico (runs e explicações de IA) em streaming, uma linha JSON por registro.
+    """
+    orchestrator = Orchestrator()
+    workspace = Workspace(root=path)
+    kwargs = {"fmt": fmt, "command": command, "since": since, "until": until}
+
+    if output is None:
+        results = orchestrator.history_export(workspace, sys.stdout, **kwargs)
+    else:
+        with output.open("w", encoding="utf-8") as out:
+            results = orchestrator.history_export(workspace, out, **kwargs)
+    _print_and_exit(results, err_console)
+
+
+@history_app.command("import")
+def history_import(
+    source: str = typer.Argument(
+        ..., help="Arquivo NDJSON gerado por `history export` ('-' = stdin)."
+    ),
+    path: Path = typer.Option(
+        Path("."),
+        "--path",
+        "-p",
+        help="Caminho do projeto (root).",
+        exists=True,
+        file_okay=False,
+        dir_okay=True,
+        resolve_path=True,
+    ),
+) -> None:
+    """
+    Importa um export NDJSON em lotes grandes (executemany). Os registros guardam a
+    origem (source e id original), reimportar o mesmo arquivo não duplica, e seguem a
+    retenção do policies.yml pelo created_at. Não entram no histórico local (último
+    run, diffs, tendências, ai-explain).
+    """
+    orchestrator = Orchestrator()
+    workspace = Workspace(root=path)
+
+    if source == "-":
+        results = orchestrator.history_import(workspace, sys.stdin)
+    else:
+        with open(source, encoding="utf-8") as lines:
+            results = orchestrator.history_import(workspace, lines)
+    _print_and_exit(results)
+
+
+def _print_and_exit(results: list[Result], out: Console = console) -> None:
+    print_human_results(results, out)
+    if any(r.severity == "error" for r in results):
+        raise typer.Exit(code=1)
+
+
 @app.command("ai-explain")
 def ai_explain(
     path: Path = typer.Option(
@@ -115,6 +373,18 @@ def ai_explain(
         dir_okay=True,
         resolve_path=True,
     ),
+    no_cache: bool = typer.Option(
+        False, "--no-cache", help="Ignora o cache de respostas e chama o modelo."
+    ),
+    stream: bool = typer.Option(
+        True, "--stream/--no-stream", help="Mostra a resposta conforme o modelo gera."
+    ),
+    incremental: bool = typer.Option(
+        False,
+        "--incremental",
+        "-i",
+        help="Manda só o que mudou desde a última explicação (e o resumo dela).",
+    ),
 ) -> None:
     """
     Explica o estado atual do projeto com base em scan e doctor.
@@ -122,19 +392,101 @@ def ai_explain(
     workspace = Workspace(root=path)
     orchestrator = Orchestrator()
 
-    explanation = orchestrator.ai_explain(workspace)
-
     console.print("\n[bold cyan]AI Explanation[/bold cyan]\n")
-    console.print(explanation)
+    if not stream:
+        console.print(
+            orchestrator.ai_explain(workspace, use_cache=not no_cache, incremental=incremental)
+        )
+        return
+
+    # Text cresce no lugar; o Live redesenha no máximo 12x/s
+    live_text = Text()
+    with Live(live_text, console=console, refresh_per_second=12, transient=False):
+        explanation = orchestrator.ai_explain(
+            workspace,
+            use_cache=not no_cache,
+            on_token=live_text.append,
+            incremental=incremental,
+        )
+    if not live_text:
+        # sem streaming (modelo indisponível): mostra a resposta inteira
+        console.print(explanation)
+
+
+@ai_history_app.command("search")
+def ai_history_search(
+    query: str = typer.Argument(..., help="Texto procurado (a última palavra casa por prefixo)."),
+    path: Path = typer.Option(
+        Path("."),
+        "--path",
+        "-p",
+        help="Caminho do projeto (root).",
+        exists=True,
+        file_okay=False,
+        dir_okay=True,
+        resolve_path=True,
+    ),
+    limit: int = typer.Option(10, "--limit", "-n", help="Quantidade máxima de resultados."),
+    kind: str = typer.Option(
+        "all", "--kind", "-k", help="all | ai_explanation | finding."
+    ),
+    raw: bool = typer.Option(
+        False, "--raw", help="Usa a consulta como sintaxe FTS5 (OR, NEAR, \"frase\", prefixo*)."
+    ),
+    full: bool = typer.Option(False, "--full", help="Mostra o texto inteiro, não só o trecho."),
+) -> None:
+    """
+    Busca textual com ranking bm25 nas explicações de IA e mensagens do doctor gravadas.
+    """
+    _print_and_exit(
+        Orchestrator().ai_history_search(
+            Workspace(root=path), query, kind=kind, limit=limit, raw=raw, full=full
+        )
+    )
 
 
 @app.command("ai-tests")
 def ai_tests(
     path: Path = typer.Option(Path("."), "--path", "-p", help="Project root path"),
+    no_cache: bool = typer.Option(
+        False, "--no-cache", help="Ignora o cache de respostas e chama o modelo."
+    ),
+    all_files: bool = typer.Option(
+        False, "--all", help="Gera testes para todos os módulos do projeto."
+    ),
+    max_files: int | None = typer.Option(
+        None, "--max-files", help="Limita a N módulos (os menores primeiro)."
+    ),
+    jobs: int | None = typer.Option(
+        None,
+        "--jobs",
+        "-j",
+        min=1,
+        help="Requests simultâneos ao modelo (padrão: ai.local_http.max_connections).",
+    ),
 ):
     workspace = Workspace(root=path)
     orchestrator = Orchestrator()
-    results = orchestrator.ai_tests(workspace)
 
-    for r in results:
-        console.print(r.to_rich())
+    if not all_files and max_files is None:
+        results = orchestrator.ai_tests(workspace, use_cache=not no_cache)
+        for r in results:
+            console.print(r.to_rich())
+        return
+
+    with Progress(console=console, transient=True) as progress:
+        task = progress.add_task("ai-tests", total=None)
+
+        def on_progress(done: int, total: int, outcome) -> None:
+            progress.update(task, completed=done, total=total)
+            progress.console.print(f"[dim]{done}/{total}[/dim] {outcome.target}: {outcome.status}")
+
+        results = orchestrator.ai_tests(
+            workspace,
+            use_cache=not no_cache,
+            all_files=all_files,
+            max_files=max_files,
+            jobs=jobs,
+            on_progress=on_progress,
+        )
+    _print_and_exit(results)
@@ -2,10 +2,12 @@ from __future__ import annotations
 
 from pathlib import Path
 
+from noxis.context.inventory import FileInventory
 from noxis.context.model import ProjectModel
+from noxis.context.walker import walk_tree
 
 
-def discover_project(root: Path) -> ProjectModel:
+def discover_project(root: Path, inventory: FileInventory | None = None) -> ProjectModel:
     # Heurística MVP: sinais por aarquivos conhecidos
     patterns = {
         "python": ["pyproject.toml", "requirements.txt", "setup.py", "Pipfile"],
@@ -15,13 +17,12 @@ def discover_project(root: Path) -> ProjectModel:
         "docker": ["Dockerfile", "docker-compose.yml", "compose.yml"],
     }
 
+    if inventory is None:
+        inventory = walk_tree(root)
+
     found: dict[str, list[str]] = {}
     for group, files in patterns.items():
-        hits: list[str] = []
-        for f in files:
-            p = root / f
-            if p.exists():
-                hits.append(str(p.relative_to(root)))
+        hits = [f for f in files if f in inventory]
         if hits:
             found[group] = hits
     languages = []
@@ -32,5 +33,9 @@ def discover_project(root: Path) -> ProjectModel:
     repo_type = "mono" if (root / "packages").exists() or (root / "apps").exists() else "single"
 
     return ProjectModel(
-        root_path=str(root), repo_type=repo_type, languages_detected=languages, signals=found
+        root_path=str(root),
+        repo_type=repo_type,
+        languages_detected=languages,
+        signals=found,
+        inventory=inventory,
     )
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import os
+import shutil
+import stat
+import struct
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+
+from noxis.context.inventory import FileEntry, FileInventory
+from noxis.context.walker import DEFAULT_PRUNE_DIRS, IgnoreRules, is_pruned, stat_entry
+
+_HEADER = struct.Struct(">4sII")
+# ctime(s, ns), mtime(s, ns), dev, ino, mode, uid, gid, size
+_STAT = struct.Struct(">10I")
+
+_FLAG_EXTENDED = 0x4000
+_FLAG_STAGE_MASK = 0x3000
+_EXT_SKIP_WORKTREE = 0x4000
+_MODE_GITLINK = 0o160000
+
+GIT_TIMEOUT_SECONDS = 30
+
+
+class GitIndexError(ValueError):
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class IndexEntry:
+    path: str
+    mtime: float
+    mtime_ns: int
+    inode: int
+    mode: int
+    size: int  # truncado em 32 bits pelo próprio git
+
+
+def find_git_dir(root: Path) -> Path | None:
+    dot_git = root / ".git"
+    if dot_git.is_dir():
+        return dot_git
+    if dot_git.is_file():
+        # worktrees/submódulos: ".git" é um arquivo "gitdir: <path>"
+        text = dot_git.read_text(encoding="utf-8", errors="replace").strip()
+        if text.startswith("gitdir:"):
+            git_dir = Path(text[len("gitdir:") :].strip())
+            if not git_dir.is_absolute():
+                git_dir = (root / git_dir).resolve()
+            return git_dir if git_dir.is_dir() else None
+    return None
+
+
+def read_git_index(index_path: Path) -> list[IndexEntry]:
+    """
+    Lê o .git/index (versões 2, 3 e 4) sem chamar o git.
+    Retorna apenas entradas stage 0 que o git materializa no working tree (sem
+    skip-worktree nem submódulos); não confere se o arquivo ainda existe.
+    """
+    data = index_path.read_bytes()
+    if len(data) < _HEADER.size:
+        raise GitIndexError("git index too short")
+
+    signature, version, count = _HEADER.unpack_from(data, 0)
+    if signature != b"DIRC":
+        raise GitIndexError("not a git index file")
+    if version not in (2, 3, 4):
+        raise GitIndexError(f"unsupported git index version: {version}")
+
+    # sha1 (20 bytes); repositórios sha256 usam 32
+    hash_size = 32 if _uses_sha256(index_path) else 20
+    entries: list[IndexEntry] = []
+    offset = _HEADER.size
+    prev_path = b""
+
+    for _ in range(count):
+        start = offset
+        (
+            _ctime_s,
+            _ctime_ns,
+            mtime_s,
+            mtime_ns,
+            _dev,
+            ino,
+            mode,
+            _uid,
+            _gid,
+            size,
+        ) = _STAT.unpack_from(data, offset)
+        offset += _STAT.size + hash_size
+        (flags,) = struct.unpack_from(">H", data, offset)
+        offset += 2
+
+        ext_flags = 0
+        if version >= 3 and flags & _FLAG_EXTENDED:
+            (ext_flags,) = struct.unpack_from(">H", data, offset)
+            offset += 2
+
+        if version == 4:
+            strip, offset = _read_varint(data, offset)
+            end = data.index(b"\x00", offset)
+            path = prev_path[: len(prev_path) - strip] + data[offset:end]
+            offset = end + 1
+        else:
+            end = data.index(b"\x00", offset)
+            path = data[offset:end]
+            # entradas v2/v3 são alinhadas em 8 bytes (1 a 8 NULs)
+            offset = start + ((end - start + 8) // 8) * 8
+        prev_path = path
+
+        if flags & _FLAG_STAGE_MASK:
+            continue  # conflito de merge: stages 1..3
+        if ext_flags & _EXT_SKIP_WORKTREE or mode == _MODE_GITLINK:
+            continue
+
+        entries.append(
+            IndexEntry(
+                path=path.decode("utf-8", errors="surrogateescape"),
+                mtime=mtime_s + mtime_ns / 1e9,
+                mtime_ns=mtime_s * 1_000_000_000 + mtime_ns,
+                inode=ino,
+                mode=mode,
+                size=size,
+            )
+        )
+
+    return entries
+
+
+def _read_varint(data: bytes, offset: int) -> tuple[int, int]:
+    # codificação "offset" do git (varint.c)
+    c = data[offset]
+    offset += 1
+    value = c & 0x7F
+    while c & 0x80:
+        c = data[offset]
+        offset += 1
+        value = ((value + 1) << 7) | (c & 0x7F)
+    return value, offset
+
+
+def _uses_sha256(index_path: Path) -> bool:
+    config = index_path.parent / "config"
+    try:
+        text = config.read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return False
+    return "objectformat = sha256" in text.replace("\t", " ").lower()
+
+
+def _run_git(root: Path, args: list[str]) -> list[str]:
+    git = shutil.which("git")
+    if not git:
+        raise GitIndexError("git executable not found")
+    proc = subprocess.run(
+        [git, "-C", str(root), *args],
+        capture_output=True,
+        timeout=GIT_TIMEOUT_SECONDS,
+        check=False,
+    )
+    if proc.returncode != 0:
+        raise GitIndexError(proc.stderr.decode("utf-8", errors="replace").strip())
+    out = proc.stdout.decode("utf-8", errors="surrogateescape")
+    return [p for p in out.split("\x00") if p]
+
+
+def git_untracked_files(root: Path) -> list[str]:
+    # o git usa o untracked cache: bem mais barato que varrer a árvore aqui
+    return _run_git(root, ["ls-files", "--others", "--exclude-standard", "-z"])
+
+
+def git_changed_since(root: Path, rev: str) -> list[str]:
+    """
+    Paths alterados desde `rev` (commitados, staged, no working tree e untracked).
+    """
+    changed = _run_git(root, ["diff", "--name-only", "--no-renames", "-z", rev, "--"])
+    changed.extend(git_untracked_files(root))
+    return sorted(set(changed))
+
+
+def _worktree_entry(root: Path, e: IndexEntry) -> FileEntry | None:
+    try:
+        st = os.lstat(root / e.path)
+    except OSError:
+        return None  # apagado sem `git rm`
+    if stat.S_ISLNK(st.st_mode):
+        return stat_entry(root, e.path)  # como o walker: segue o link
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    # o stat do index vira só referência: size/mtime vêm do working tree, que reflete
+    # edições sem `git add` (e o size do index é truncado em 32 bits)
+    return FileEntry(
+        path=e.path,
+        size=st.st_size,
+        mtime=st.st_mtime,
+        extension=os.path.splitext(e.path)[1].lower(),
+    )
+
+
+def inventory_from_git(
+    root: Path,
+    rules: IgnoreRules | None = None,
+    prune: frozenset[str] = DEFAULT_PRUNE_DIRS,
+    include_untracked: bool = True,
+) -> FileInventory | None:
+    """
+    Monta o inventário a partir do .git/index (stat cache do próprio git).
+    O index só diz quais paths existem: cada um leva um lstat no working tree, que
+    descarta os apagados sem `git rm` e dá size/mtime de quem mudou sem `git add`.
+    Retorna None se `root` não for a raiz de um checkout git.
+    """
+    git_dir = find_git_dir(root)
+    if git_dir is None or not (git_dir / "index").exists():
+        return None
+    if rules is None:
+        rules = IgnoreRules.from_root(root)
+
+    entries: list[FileEntry] = []
+    for e in read_git_index(git_dir / "index"):
+        if is_pruned(e.path, rules, prune):
+            continue
+        entry = _worktree_entry(root, e)
+        if entry is not None:
+            entries.append(entry)
+
+    if include_untracked:
+        for rel in git_untracked_files(root):
+            if is_pruned(rel, rules, prune):
+                continue
+            entry = stat_entry(root, rel)
+            if entry is not None:
+                entries.append(entry)
+
+    return FileInventory(entries)
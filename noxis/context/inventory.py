@@ -0,0 +1,373 @@
+from __future__ import annotations
+
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Sequence
+
+
+@dataclass(frozen=True, slots=True)
+class FileEntry:
+    path: str  # relativo ao root, separador "/"
+    size: int
+    mtime: float
+    extension: str  # ".py", ".toml", "" ...
+
+    @property
+    def name(self) -> str:
+        return self.path.rsplit("/", 1)[-1]
+
+
+# magic, byteorder ("<" ou ">"), n_files, n_dirs, n_names, n_exts, names_len, exts_len
+_HEADER = struct.Struct("<8sc7xQQQQQQ")
+_MAGIC = b"NXINV\x00\x00\x02"
+_NATIVE_ORDER = b"<" if sys.byteorder == "little" else b">"
+
+
+def _pad8(n: int) -> int:
+    return (n + 7) & ~7
+
+
+class _PathSequence(Sequence[str]):
+    # permite bisect sobre os paths sem materializar a lista
+    def __init__(self, inventory: "FileInventory") -> None:
+        self._inv = inventory
+
+    def __len__(self) -> int:
+        return len(self._inv)
+
+    def __getitem__(self, i):  # type: ignore[override]
+        return self._inv._path_at(i)
+
+
+class FileInventory:
+    """
+    Inventário de arquivos produzido pelo walker.
+    Uma única varredura alimenta discovery, plugins e ai-tests.
+
+    Armazenamento colunar: diretórios numa trie interna (pai + nome internado)
+    e arquivos em colunas `array` (dir, nome, size, mtime, extensão), ordenados
+    pelo path. O formato binário de `to_bytes()` é lido sem cópia por
+    `from_bytes()` (memoryview.cast sobre o buffer).
+    """
+
+    def __init__(self, entries: Iterable[FileEntry] = ()) -> None:
+        names: list[str] = [""]
+        name_ids: dict[str, int] = {"": 0}
+        dir_ids: dict[str, int] = {"": 0}
+        dir_parent = array("i", [-1])
+        dir_name = array("I", [0])
+        exts: list[str] = [""]
+        ext_ids: dict[str, int] = {"": 0}
+
+        def intern(name: str) -> int:
+            nid = name_ids.get(name)
+            if nid is None:
+                nid = name_ids[name] = len(names)
+                names.append(name)
+            return nid
+
+        def dir_id(path: str) -> int:
+            did = dir_ids.get(path)
+            if did is None:
+                parent, _, name = path.rpartition("/")
+                pid = dir_id(parent)
+                did = dir_ids[path] = len(dir_parent)
+                dir_parent.append(pid)
+                dir_name.append(intern(name))
+            return did
+
+        file_dir = array("I")
+        file_name = array("I")
+        file_size = array("q")
+        file_mtime = array("d")
+        file_ext = array("I")
+
+        for e in sorted(entries, key=lambda e: e.path):
+            parent, _, name = e.path.rpartition("/")
+            eid = ext_ids.get(e.extension)
+            if eid is None:
+                eid = ext_ids[e.extension] = len(exts)
+                exts.append(e.extension)
+            file_dir.append(dir_id(parent))
+            file_name.append(intern(name))
+            file_size.append(e.size)
+            file_mtime.append(e.mtime)
+            file_ext.append(eid)
+
+        self._names_blob: memoryview | None = None
+        self._name_offsets: Sequence[int] | None = None
+        self._names: list[str | None] = list(names)
+        self._exts = exts
+        self._dir_parent: Sequence[int] = dir_parent
+        self._dir_name: Sequence[int] = dir_name
+        self._file_dir: Sequence[int] = file_dir
+        self._file_name: Sequence[int] = file_name
+        self._file_size: Sequence[int] = file_size
+        self._file_mtime: Sequence[float] = file_mtime
+        self._file_ext: Sequence[int] = file_ext
+        self._dir_paths: dict[int, str] = {0: ""}
+        self._by_ext: dict[int, array] | None = None
+
+    # --- leitura -----------------------------------------------------------
+
+    def _name(self, nid: int) -> str:
+        name = self._names[nid]
+        if name is None:
+            assert self._names_blob is not None and self._name_offsets is not None
+            start, end = self._name_offsets[nid], self._name_offsets[nid + 1]
+            raw = self._names_blob[start:end]
+            name = self._names[nid] = str(raw, "utf-8", "surrogateescape")
+        return name
+
+    def _dir_path(self, did: int) -> str:
+        path = self._dir_paths.get(did)
+        if path is None:
+            parent = self._dir_path(self._dir_parent[did])
+            name = self._name(self._dir_name[did])
+            path = self._dir_paths[did] = f"{parent}/{name}" if parent else name
+        return path
+
+    def _path_at(self, i: int) -> str:
+        parent = self._dir_path(self._file_dir[i])
+        name = self._name(self._file_name[i])
+        return f"{parent}/{name}" if parent else name
+
+    def _entry_at(self, i: int) -> FileEntry:
+        return FileEntry(
+            path=self._path_at(i),
+            size=self._file_size[i],
+            mtime=self._file_mtime[i],
+            extension=self._exts[self._file_ext[i]],
+        )
+
+    def __len__(self) -> int:
+        return len(self._file_dir)
+
+    def __iter__(self) -> Iterator[FileEntry]:
+        dir_path, name, exts = self._dir_path, self._name, self._exts
+        rows = zip(
+            self._file_dir,
+            self._file_name,
+            self._file_size,
+            self._file_mtime,
+            self._file_ext,
+            strict=True,
+        )
+        for did, nid, size, mtime, eid in rows:
+            parent = dir_path(did)
+            path = f"{parent}/{name(nid)}" if parent else name(nid)
+            yield FileEntry(path, size, mtime, exts[eid])
+
+    def __contains__(self, path: object) -> bool:
+        return isinstance(path, str) and self._index_of(path) is not None
+
+    def _index_of(self, path: str) -> int | None:
+        i = bisect_left(_PathSequence(self), path)
+        if i < len(self) and self._path_at(i) == path:
+            return i
+        return None
+
+    def get(self, path: str) -> FileEntry | None:
+        i = self._index_of(path)
+        return None if i is None else self._entry_at(i)
+
+    def _range_under(self, prefix: str) -> range:
+        prefix = prefix.strip("/")
+        if not prefix:
+            return range(len(self))
+        # arquivos ordenados por path: tudo sob "a/b/" é contíguo
+        seq = _PathSequence(self)
+        lo = bisect_left(seq, prefix + "/")
+        hi = bisect_left(seq, prefix + "0", lo)  # "0" é o caractere seguinte a "/"
+        return range(lo, hi)
+
+    def under(self, prefix: str) -> list[FileEntry]:
+        return [self._entry_at(i) for i in self._range_under(prefix)]
+
+    def count_under(self, prefix: str) -> int:
+        return len(self._range_under(prefix))
+
+    def with_extension(self, extension: str) -> list[FileEntry]:
+        try:
+            eid = self._exts.index(extension)
+        except ValueError:
+            return []
+        if self._by_ext is None:
+            by_ext: dict[int, array] = {}
+            for i, e in enumerate(self._file_ext):
+                by_ext.setdefault(e, array("I")).append(i)
+            self._by_ext = by_ext
+        return [self._entry_at(i) for i in self._by_ext.get(eid, ())]
+
+    def extensions(self) -> list[str]:
+        return list(self._exts)
+
+    def total_size(self) -> int:
+        return sum(self._file_size)
+
+    def view(self) -> "InventoryView":
+        return InventoryView(self)
+
+    # --- serialização ------------------------------------------------------
+
+    def to_bytes(self) -> bytes:
+        names = [
+            self._name(i).encode("utf-8", "surrogateescape") for i in range(len(self._names))
+        ]
+        name_offsets = array("Q", [0])
+        for n in names:
+            name_offsets.append(name_offsets[-1] + len(n))
+        exts = [e.encode("utf-8", "surrogateescape") for e in self._exts]
+        ext_offsets = array("Q", [0])
+        for e in exts:
+            ext_offsets.append(ext_offsets[-1] + len(e))
+        names_blob = b"".join(names)
+        exts_blob = b"".join(exts)
+
+        header = _HEADER.pack(
+            _MAGIC,
+            _NATIVE_ORDER,
+            len(self),
+            len(self._dir_parent),
+            len(names),
+            len(exts),
+            len(names_blob),
+            len(exts_blob),
+        )
+        sections = [
+            _as_bytes(self._dir_parent, "i"),
+            _as_bytes(self._dir_name, "I"),
+            name_offsets.tobytes(),
+            names_blob,
+            ext_offsets.tobytes(),
+            exts_blob,
+            _as_bytes(self._file_dir, "I"),
+            _as_bytes(self._file_name, "I"),
+            _as_bytes(self._file_size, "q"),
+            _as_bytes(self._file_mtime, "d"),
+            _as_bytes(self._file_ext, "I"),
+        ]
+        out = bytearray(header)
+        for sec in sections:
+            out += sec
+            out += b"\x00" * (_pad8(len(sec)) - len(sec))
+        return bytes(out)
+
+    def __reduce__(self):
+        # memoryviews não são picklable: atravessa processos no formato binário
+        return (FileInventory.from_bytes, (self.to_bytes(),))
+
+    @classmethod
+    def from_bytes(cls, buf: bytes | memoryview) -> "FileInventory":
+        """
+        Reconstrói a partir de `to_bytes()` sem copiar as colunas numéricas:
+        elas passam a ser memoryviews sobre `buf`.
+        """
+        mv = memoryview(buf).cast("B")
+        if len(mv) < _HEADER.size:
+            raise ValueError("inventory buffer too short")
+        magic, order, n_files, n_dirs, n_names, n_exts, names_len, exts_len = (
+            _HEADER.unpack_from(mv, 0)
+        )
+        if magic != _MAGIC:
+            raise ValueError("unknown inventory format")
+
+        offset = _HEADER.size
+
+        def take(nbytes: int) -> memoryview:
+            nonlocal offset
+            if offset + nbytes > len(mv):
+                raise ValueError("truncated inventory buffer")
+            section = mv[offset : offset + nbytes]
+            offset += _pad8(nbytes)
+            return section
+
+        def column(count: int, fmt: str) -> Sequence:
+            raw = take(count * array(fmt).itemsize)
+            if order == _NATIVE_ORDER:
+                return raw.cast(fmt)
+            swapped = array(fmt, raw.tobytes())
+            swapped.byteswap()
+            return swapped
+
+        inv = cls.__new__(cls)
+        inv._dir_parent = column(n_dirs, "i")
+        inv._dir_name = column(n_dirs, "I")
+        inv._name_offsets = column(n_names + 1, "Q")
+        inv._names_blob = take(names_len)
+        ext_offsets = column(n_exts + 1, "Q")
+        exts_blob = take(exts_len)
+        inv._exts = [
+            str(exts_blob[ext_offsets[i] : ext_offsets[i + 1]], "utf-8", "surrogateescape")
+            for i in range(n_exts)
+        ]
+        inv._file_dir = column(n_files, "I")
+        inv._file_name = column(n_files, "I")
+        inv._file_size = column(n_files, "q")
+        inv._file_mtime = column(n_files, "d")
+        inv._file_ext = column(n_files, "I")
+        inv._names = [None] * n_names
+        inv._dir_paths = {0: ""}
+        inv._by_ext = None
+        return inv
+
+
+def _as_bytes(col: Sequence, fmt: str) -> bytes:
+    if isinstance(col, memoryview):
+        return col.tobytes()
+    if isinstance(col, array):
+        return col.tobytes()
+    return array(fmt, col).tobytes()
+
+
+class InventoryView:
+    """
+    Visão somente-leitura do inventário para plugins: consultas + colunas
+    expostas como memoryviews read-only (sem cópia).
+    """
+
+    __slots__ = ("_inv",)
+
+    def __init__(self, inventory: FileInventory) -> None:
+        self._inv = inventory
+
+    def __len__(self) -> int:
+        return len(self._inv)
+
+    def __iter__(self) -> Iterator[FileEntry]:
+        return iter(self._inv)
+
+    def __contains__(self, path: object) -> bool:
+        return path in self._inv
+
+    def get(self, path: str) -> FileEntry | None:
+        return self._inv.get(path)
+
+    def under(self, prefix: str) -> list[FileEntry]:
+        return self._inv.under(prefix)
+
+    def count_under(self, prefix: str) -> int:
+        return self._inv.count_under(prefix)
+
+    def with_extension(self, extension: str) -> list[FileEntry]:
+        return self._inv.with_extension(extension)
+
+    def extensions(self) -> list[str]:
+        return self._inv.extensions()
+
+    def columns(self) -> dict[str, memoryview]:
+        inv = self._inv
+        return {
+            "size": _readonly(inv._file_size, "q"),
+            "mtime": _readonly(inv._file_mtime, "d"),
+            "extension_id": _readonly(inv._file_ext, "I"),
+        }
+
+
+def _readonly(col: Sequence, fmt: str) -> memoryview:
+    if not isinstance(col, (memoryview, array)):
+        col = array(fmt, col)
+    return memoryview(col).toreadonly()
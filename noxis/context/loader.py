@@ -2,13 +2,29 @@ from pathlib import Path
 
 from noxis.context.discovery import discover_project
 from noxis.context.model import ProjectModel
+from noxis.context.snapshot import SnapshotMismatch, read_snapshot, snapshot_matches, write_snapshot
 
 
 def load_project(root: Path) -> ProjectModel:
     project_file = root / ".noxis" / "project.yml"
 
     if project_file.exists():
-        return ProjectModel.from_yaml(project_file)
+        # snapshot binário quando válido; YAML como fonte de verdade legível
+        try:
+            return read_snapshot(project_file)
+        except (OSError, SnapshotMismatch):
+            return ProjectModel.from_yaml(project_file)
 
     # fallback (MVP / campatibilidade)
     return discover_project(root)
+
+
+def save_project(root: Path, model: ProjectModel) -> Path:
+    """
+    Grava project.yml (só se o modelo mudou) + snapshot binário com o inventário.
+    """
+    project_file = root / ".noxis" / "project.yml"
+    if not project_file.exists() or not snapshot_matches(project_file, model):
+        project_file.write_text(model.to_yaml(), encoding="utf-8")
+    write_snapshot(project_file, model)
+    return project_file
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Any
 
 import yaml
 
+from noxis.context.inventory import FileInventory
+
 
 @dataclass(frozen=True)
 class ProjectModel:
@@ -12,23 +15,38 @@ class ProjectModel:
     repo_type: str  # "single" | "mono"
     languages_detected: list[str]
     signals: dict[str, list[str]]
+    # modo workspace: sub-projetos indexados pelo path relativo ao root
+    packages: dict[str, "ProjectModel"] = field(default_factory=dict)
+    # não vai para o YAML: só existe durante o comando que varreu a árvore
+    inventory: FileInventory | None = field(default=None, compare=False, repr=False)
 
-    def to_yaml(self) -> str:
-        payload = {
+    def to_dict(self) -> dict[str, Any]:
+        payload: dict[str, Any] = {
             "root_path": self.root_path,
             "repo_type": self.repo_type,
             "languages_detected": self.languages_detected,
             "signals": self.signals,
         }
-        return yaml.safe_dump(payload, sort_keys=False, allow_unicode=True)
+        if self.packages:
+            payload["packages"] = {rel: pkg.to_dict() for rel, pkg in self.packages.items()}
+        return payload
 
     @classmethod
-    def from_yaml(cls, path: Path) -> "ProjectModel":
-        data = yaml.safe_load(path.read_text(encoding="utf-8"))
-
+    def from_dict(cls, data: dict[str, Any]) -> "ProjectModel":
         return cls(
             root_path=data["root_path"],
             repo_type=data["repo_type"],
             languages_detected=data.get("languages_detected", []),
             signals=data.get("signals", {}),
+            packages={
+                rel: cls.from_dict(pkg) for rel, pkg in (data.get("packages") or {}).items()
+            },
         )
+
+    def to_yaml(self) -> str:
+        return yaml.safe_dump(self.to_dict(), sort_keys=False, allow_unicode=True)
+
+    @classmethod
+    def from_yaml(cls, path: Path) -> "ProjectModel":
+        data = yaml.safe_load(path.read_text(encoding="utf-8"))
+        return cls.from_dict(data)
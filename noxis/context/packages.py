@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from noxis.context.inventory import FileEntry, FileInventory
+
+# Arquivos que marcam a raiz de um sub-projeto num monorepo
+PACKAGE_MARKERS = ("pyproject.toml", "setup.py", "package.json", "composer.json")
+
+
+def find_packages(inventory: FileInventory) -> list[str]:
+    """
+    Diretórios (relativos ao root) que contêm algum marcador de projeto.
+    O próprio root não entra: ele é o agregado.
+    """
+    dirs: set[str] = set()
+    for entry in inventory:
+        if "/" not in entry.path:
+            continue
+        parent, name = entry.path.rsplit("/", 1)
+        if name in PACKAGE_MARKERS:
+            dirs.add(parent)
+    return sorted(dirs)
+
+
+def split_inventory(
+    inventory: FileInventory, packages: list[str]
+) -> dict[str, list[FileEntry]]:
+    """
+    Distribui os arquivos entre os pacotes (o mais profundo ganha), com paths
+    relativos à raiz de cada pacote.
+    """
+    by_depth = sorted(packages, key=lambda p: p.count("/"), reverse=True)
+    out: dict[str, list[FileEntry]] = {p: [] for p in packages}
+
+    for entry in inventory:
+        for pkg in by_depth:
+            prefix = pkg + "/"
+            if entry.path.startswith(prefix):
+                out[pkg].append(
+                    FileEntry(
+                        path=entry.path[len(prefix) :],
+                        size=entry.size,
+                        mtime=entry.mtime,
+                        extension=entry.extension,
+                    )
+                )
+                break
+    return out
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import hashlib
+import marshal
+import os
+import struct
+from dataclasses import replace
+from pathlib import Path
+
+from noxis.context.inventory import FileInventory
+from noxis.context.model import ProjectModel
+
+# Sidecar binário do project.yml: o YAML continua sendo o export legível,
+# mas os comandos carregam o snapshot quando ele corresponde ao YAML atual.
+SNAPSHOT_MAGIC = b"NXSNAP"
+SNAPSHOT_VERSION = 2
+
+# magic, versão, mtime_ns e size do project.yml, sha256 do project.yml, len(meta)
+_HEADER = struct.Struct(">6sHqq32sI")
+
+
+class SnapshotMismatch(ValueError):
+    pass
+
+
+def snapshot_path(project_file: Path) -> Path:
+    return project_file.with_suffix(".snap")
+
+
+def write_snapshot(project_file: Path, model: ProjectModel) -> None:
+    """
+    Grava o snapshot amarrado ao project.yml já escrito (mtime/size + hash).
+    Escrita atômica: arquivo temporário + os.replace.
+    """
+    st = project_file.stat()
+    digest = hashlib.sha256(project_file.read_bytes()).digest()
+    meta = marshal.dumps(model.to_dict())
+    inventory = model.inventory.to_bytes() if model.inventory is not None else b""
+
+    header = _HEADER.pack(
+        SNAPSHOT_MAGIC, SNAPSHOT_VERSION, st.st_mtime_ns, st.st_size, digest, len(meta)
+    )
+    target = snapshot_path(project_file)
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(header + meta + inventory)
+    os.replace(tmp, target)
+
+
+def read_snapshot(project_file: Path) -> ProjectModel:
+    """
+    Lê o snapshot se ele ainda corresponde ao project.yml.
+    Nomes de arquivos só são decodificados quando alguém os acessa.
+    """
+    data = snapshot_path(project_file).read_bytes()
+    if len(data) < _HEADER.size:
+        raise SnapshotMismatch("snapshot too short")
+
+    magic, version, mtime_ns, size, digest, meta_len = _HEADER.unpack_from(data, 0)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise SnapshotMismatch("unknown snapshot format")
+
+    st = project_file.stat()
+    # mtime mudou: só aceita se o conteúdo for o mesmo (ex.: `touch`)
+    if (st.st_mtime_ns, st.st_size) != (mtime_ns, size) and (
+        hashlib.sha256(project_file.read_bytes()).digest() != digest
+    ):
+        raise SnapshotMismatch("project.yml changed since snapshot")
+
+    start = _HEADER.size
+    try:
+        meta = marshal.loads(data[start : start + meta_len])
+        model = ProjectModel.from_dict(meta)
+    except (ValueError, EOFError, TypeError, KeyError) as exc:
+        raise SnapshotMismatch(f"corrupted snapshot: {exc}") from exc
+
+    blob = memoryview(data)[start + meta_len :]
+    if blob:
+        try:
+            # colunas viram memoryviews sobre `data`: sem cópia nem decodificação
+            inventory = FileInventory.from_bytes(blob)
+        except ValueError as exc:
+            raise SnapshotMismatch(f"corrupted inventory: {exc}") from exc
+        model = replace(model, inventory=inventory)
+    return model
+
+
+def snapshot_matches(project_file: Path, model: ProjectModel) -> bool:
+    """
+    True se o snapshot atual descreve o mesmo modelo (sem olhar o inventário):
+    nesse caso não é preciso reserializar o YAML.
+    """
+    try:
+        return read_snapshot(project_file) == model
+    except (OSError, SnapshotMismatch):
+        return False
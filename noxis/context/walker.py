@@ -0,0 +1,339 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import stat
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from pathlib import Path
+
+from noxis.context.inventory import FileEntry, FileInventory
+
+# Diretórios que nunca valem a pena descer (podados antes do scandir)
+DEFAULT_PRUNE_DIRS = frozenset(
+    {
+        ".git",
+        ".hg",
+        ".svn",
+        ".noxis",
+        ".venv",
+        "venv",
+        "node_modules",
+        "__pycache__",
+        ".mypy_cache",
+        ".pytest_cache",
+        ".ruff_cache",
+        ".tox",
+        ".nox",
+    }
+)
+
+IGNORE_FILES = (".gitignore", ".noxisignore")
+
+
+@dataclass(frozen=True)
+class _IgnorePattern:
+    pattern: str
+    negate: bool
+    dir_only: bool
+    anchored: bool
+
+    def matches(self, rel_path: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        if self.anchored:
+            return fnmatchcase(rel_path, self.pattern)
+        name = rel_path.rsplit("/", 1)[-1]
+        return fnmatchcase(name, self.pattern)
+
+
+class IgnoreRules:
+    """
+    Subconjunto do formato .gitignore: `!negação`, `dir/`, `/ancorado`, globs.
+    Só os arquivos da raiz são lidos (MVP).
+    """
+
+    def __init__(self, patterns: list[_IgnorePattern] | None = None) -> None:
+        self.patterns = patterns or []
+
+    @classmethod
+    def from_root(cls, root: Path) -> "IgnoreRules":
+        patterns: list[_IgnorePattern] = []
+        for fname in IGNORE_FILES:
+            path = root / fname
+            try:
+                text = path.read_text(encoding="utf-8", errors="replace")
+            except OSError:
+                continue
+            for line in text.splitlines():
+                parsed = cls._parse_line(line)
+                if parsed:
+                    patterns.append(parsed)
+        return cls(patterns)
+
+    @staticmethod
+    def _parse_line(line: str) -> _IgnorePattern | None:
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            return None
+
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+
+        anchored = "/" in line
+        line = line.lstrip("/")
+        if line.startswith("**/"):
+            # "**/x" equivale a "x" em qualquer nível
+            line = line[3:]
+            anchored = "/" in line
+        if not line:
+            return None
+
+        return _IgnorePattern(pattern=line, negate=negate, dir_only=dir_only, anchored=anchored)
+
+    def digest(self) -> str:
+        # muda quando .gitignore/.noxisignore mudam: invalida caches de varredura
+        raw = "\n".join(
+            f"{p.negate}:{p.dir_only}:{p.anchored}:{p.pattern}" for p in self.patterns
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def is_ignored(self, rel_path: str, is_dir: bool) -> bool:
+        ignored = False
+        for p in self.patterns:
+            if p.negate == ignored and p.matches(rel_path, is_dir):
+                ignored = not p.negate
+        return ignored
+
+
+@dataclass(frozen=True)
+class DirRecord:
+    """
+    Fingerprint de um diretório + seus filhos diretos.
+    Arquivos editados in-place não mudam o mtime do diretório: o inventário
+    reaproveitado pode ter size/mtime antigos, mas a lista de arquivos é exata.
+    Criar e apagar no mesmo tick de mtime não passa despercebido: diretório
+    alterado dentro de _RACY_WINDOW_NS é relido na varredura seguinte.
+    """
+
+    mtime_ns: int
+    inode: int
+    files: tuple[FileEntry, ...]
+    subdirs: tuple[str, ...]
+
+    def matches(self, st: os.stat_result) -> bool:
+        return self.mtime_ns == st.st_mtime_ns and self.inode == st.st_ino
+
+    def to_row(self, rel_dir: str) -> tuple:
+        files = [[e.name, e.size, e.mtime] for e in self.files]
+        subdirs = [d.rsplit("/", 1)[-1] for d in self.subdirs]
+        return (
+            rel_dir,
+            self.mtime_ns,
+            self.inode,
+            json.dumps(files, separators=(",", ":")),
+            json.dumps(subdirs, separators=(",", ":")),
+        )
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "DirRecord":
+        rel_dir, mtime_ns, inode, files_json, subdirs_json = row
+        prefix = f"{rel_dir}/" if rel_dir else ""
+        files = tuple(
+            FileEntry(
+                path=prefix + name,
+                size=size,
+                mtime=mtime,
+                extension=os.path.splitext(name)[1].lower(),
+            )
+            for name, size, mtime in json.loads(files_json)
+        )
+        subdirs = tuple(prefix + name for name in json.loads(subdirs_json))
+        return cls(mtime_ns, inode, files, subdirs)
+
+
+@dataclass
+class WalkResult:
+    inventory: FileInventory
+    records: dict[str, DirRecord]
+    rescanned: list[str]  # diretórios relidos com scandir
+
+
+# Diretórios alterados há menos que isso podem mudar de novo no mesmo tick de mtime
+_RACY_WINDOW_NS = 2_000_000_000
+
+
+def _scan_dir(
+    root: str,
+    rel_dir: str,
+    rules: IgnoreRules,
+    prune: frozenset[str],
+    previous: dict[str, DirRecord] | None,
+    started_ns: int,
+) -> tuple[DirRecord, bool]:
+    abs_dir = os.path.join(root, rel_dir) if rel_dir else root
+
+    try:
+        st = os.stat(abs_dir)
+    except OSError:
+        return DirRecord(-1, 0, (), ()), True
+
+    if previous:
+        cached = previous.get(rel_dir)
+        if cached and cached.matches(st):
+            return cached, False
+
+    files: list[FileEntry] = []
+    subdirs: list[str] = []
+
+    try:
+        it = os.scandir(abs_dir)
+    except OSError:
+        return DirRecord(-1, st.st_ino, (), ()), True
+
+    with it:
+        for entry in it:
+            rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name in prune or rules.is_ignored(rel, True):
+                        continue
+                    subdirs.append(rel)
+                elif entry.is_file():
+                    if rules.is_ignored(rel, False):
+                        continue
+                    fst = entry.stat()
+                    files.append(
+                        FileEntry(
+                            path=rel,
+                            size=fst.st_size,
+                            mtime=fst.st_mtime,
+                            extension=os.path.splitext(entry.name)[1].lower(),
+                        )
+                    )
+            except OSError:
+                # arquivo sumiu ou sem permissão: ignora
+                continue
+
+    # Diretório "racy" (alterado agora): força releitura na próxima vez
+    mtime_ns = st.st_mtime_ns if started_ns - st.st_mtime_ns > _RACY_WINDOW_NS else -1
+    return DirRecord(mtime_ns, st.st_ino, tuple(files), tuple(subdirs)), True
+
+
+def walk_tree_incremental(
+    root: Path,
+    previous: dict[str, DirRecord] | None = None,
+    rules: IgnoreRules | None = None,
+    prune: frozenset[str] = DEFAULT_PRUNE_DIRS,
+    max_workers: int | None = None,
+    start: str = "",
+) -> WalkResult:
+    """
+    Percorre a árvore uma única vez com os.scandir, podando diretórios ignorados
+    antes de entrar neles. Cada diretório é lido por uma thread do pool.
+
+    Com `previous`, diretórios cujo fingerprint (mtime, inode) não mudou são
+    reaproveitados sem scandir: custa um stat() por diretório.
+    `start` limita a varredura a uma subárvore (path relativo ao root).
+    """
+    root_str = str(root)
+    if rules is None:
+        rules = IgnoreRules.from_root(root)
+    started_ns = time.time_ns()
+
+    entries: list[FileEntry] = []
+    records: dict[str, DirRecord] = {}
+    rescanned: list[str] = []
+
+    def submit(rel: str):
+        return pool.submit(_scan_dir, root_str, rel, rules, prune, previous, started_ns)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {submit(start): start}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                rel_dir = pending.pop(fut)
+                record, was_scanned = fut.result()
+                records[rel_dir] = record
+                if was_scanned:
+                    rescanned.append(rel_dir)
+                entries.extend(record.files)
+                for rel in record.subdirs:
+                    pending[submit(rel)] = rel
+
+    return WalkResult(inventory=FileInventory(entries), records=records, rescanned=rescanned)
+
+
+def walk_tree(
+    root: Path,
+    rules: IgnoreRules | None = None,
+    prune: frozenset[str] = DEFAULT_PRUNE_DIRS,
+    max_workers: int | None = None,
+) -> FileInventory:
+    return walk_tree_incremental(root, None, rules, prune, max_workers).inventory
+
+
+def is_pruned(
+    rel_path: str, rules: IgnoreRules, prune: frozenset[str] = DEFAULT_PRUNE_DIRS
+) -> bool:
+    parts = rel_path.split("/")
+    for i, part in enumerate(parts[:-1]):
+        if part in prune or rules.is_ignored("/".join(parts[: i + 1]), True):
+            return True
+    return rules.is_ignored(rel_path, False)
+
+
+def stat_entry(root: Path, rel_path: str) -> FileEntry | None:
+    try:
+        st = os.stat(root / rel_path)
+    except OSError:
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return FileEntry(
+        path=rel_path,
+        size=st.st_size,
+        mtime=st.st_mtime,
+        extension=os.path.splitext(rel_path)[1].lower(),
+    )
+
+
+def apply_changed_paths(
+    root: Path,
+    inventory: FileInventory,
+    changed: list[str],
+    rules: IgnoreRules | None = None,
+    prune: frozenset[str] = DEFAULT_PRUNE_DIRS,
+) -> FileInventory:
+    """
+    Reavalia somente os paths alterados: stat() em cada um, remove os que sumiram.
+    Um diretório alterado é revarrido por inteiro (criado, movido ou removido).
+    """
+    if rules is None:
+        rules = IgnoreRules.from_root(root)
+    changed_set = set(changed)
+    prefixes = tuple(f"{p}/" for p in changed)
+
+    entries = [
+        e for e in inventory if e.path not in changed_set and not e.path.startswith(prefixes)
+    ]
+    for rel in changed:
+        if is_pruned(rel, rules, prune):
+            continue
+        if (root / rel).is_dir():
+            if rel.rsplit("/", 1)[-1] in prune or rules.is_ignored(rel, True):
+                continue
+            entries.extend(walk_tree_incremental(root, None, rules, prune, start=rel).inventory)
+            continue
+        entry = stat_entry(root, rel)
+        if entry is not None:
+            entries.append(entry)
+    return FileInventory(entries)
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import selectors
+import struct
+import sys
+import time
+from pathlib import Path
+
+from noxis.context.inventory import FileInventory
+from noxis.context.walker import (
+    DEFAULT_PRUNE_DIRS,
+    IgnoreRules,
+    is_pruned,
+    walk_tree,
+    walk_tree_incremental,
+)
+
+# <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+)
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class WatcherUnavailable(RuntimeError):
+    pass
+
+
+class InotifyWatcher:
+    """
+    inotify via ctypes + selectors (Linux). Um watch por diretório não ignorado.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        directories: list[str],
+        rules: IgnoreRules,
+        prune: frozenset[str] = DEFAULT_PRUNE_DIRS,
+    ) -> None:
+        if not sys.platform.startswith("linux"):
+            raise WatcherUnavailable("inotify is only available on Linux")
+
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        try:
+            self._libc = ctypes.CDLL(libc_name, use_errno=True)
+            self._libc.inotify_init1.argtypes = [ctypes.c_int]
+            self._libc.inotify_add_watch.argtypes = [
+                ctypes.c_int,
+                ctypes.c_char_p,
+                ctypes.c_uint32,
+            ]
+        except (OSError, AttributeError) as exc:
+            raise WatcherUnavailable(f"inotify not available: {exc}") from exc
+
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise WatcherUnavailable(os.strerror(ctypes.get_errno()))
+
+        self.root = root
+        self.rules = rules
+        self.prune = prune
+        self._fd = fd
+        self._wd_to_dir: dict[int, str] = {}
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(fd, selectors.EVENT_READ)
+
+        try:
+            for rel in directories:
+                self._add_watch(rel)
+        except WatcherUnavailable:
+            self.close()
+            raise
+
+    def _add_watch(self, rel_dir: str) -> None:
+        path = os.fsencode(str(self.root / rel_dir) if rel_dir else str(self.root))
+        wd = self._libc.inotify_add_watch(self._fd, path, _WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                # fs.inotify.max_user_watches estourado: melhor cair para polling
+                raise WatcherUnavailable("inotify watch limit reached")
+            return  # diretório sumiu entre a varredura e o watch
+        self._wd_to_dir[wd] = rel_dir
+
+    def poll(self, timeout: float | None) -> tuple[set[str], bool]:
+        """
+        Retorna (paths alterados, overflow). Com overflow o chamador deve revarrer tudo.
+        """
+        changed: set[str] = set()
+        overflow = False
+
+        if not self._selector.select(timeout):
+            return changed, overflow
+
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not buf:
+                break
+
+            offset = 0
+            while offset + _EVENT.size <= len(buf):
+                wd, mask, _cookie, length = _EVENT.unpack_from(buf, offset)
+                offset += _EVENT.size
+                raw_name = buf[offset : offset + length].rstrip(b"\x00")
+                offset += length
+
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                if mask & IN_IGNORED:
+                    self._wd_to_dir.pop(wd, None)
+                    continue
+
+                rel_dir = self._wd_to_dir.get(wd)
+                if rel_dir is None:
+                    continue
+                if not raw_name:
+                    # evento no próprio diretório (removido/movido)
+                    if mask & (IN_DELETE_SELF | IN_MOVE_SELF) and rel_dir:
+                        changed.add(rel_dir)
+                    continue
+
+                name = os.fsdecode(raw_name)
+                rel = f"{rel_dir}/{name}" if rel_dir else name
+                if mask & IN_ISDIR:
+                    if name in self.prune or self.rules.is_ignored(rel, True):
+                        continue
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        self._watch_subtree(rel)
+                elif is_pruned(rel, self.rules, self.prune):
+                    continue
+                changed.add(rel)
+
+        return changed, overflow
+
+    def _watch_subtree(self, rel_dir: str) -> None:
+        walk = walk_tree_incremental(self.root, None, self.rules, self.prune, start=rel_dir)
+        for d in walk.records:
+            self._add_watch(d)
+
+    def close(self) -> None:
+        self._selector.close()
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """
+    Fallback portátil: revarre a árvore a cada `interval` e compara (size, mtime).
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        rules: IgnoreRules,
+        inventory: FileInventory | None = None,
+        interval: float = 1.0,
+        prune: frozenset[str] = DEFAULT_PRUNE_DIRS,
+    ) -> None:
+        self.root = root
+        self.rules = rules
+        self.interval = interval
+        self.prune = prune
+        if inventory is None:
+            inventory = walk_tree(root, rules, prune)
+        self._last = self._snapshot(inventory)
+
+    @staticmethod
+    def _snapshot(inventory: FileInventory) -> dict[str, tuple[int, float]]:
+        return {e.path: (e.size, e.mtime) for e in inventory}
+
+    def poll(self, timeout: float | None) -> tuple[set[str], bool]:
+        time.sleep(self.interval if timeout is None else min(self.interval, timeout))
+        current = self._snapshot(walk_tree(self.root, self.rules, self.prune))
+        changed = {p for p, sig in current.items() if self._last.get(p) != sig}
+        changed.update(p for p in self._last if p not in current)
+        self._last = current
+        return changed, False
+
+    def close(self) -> None:
+        pass
+
+
+def create_watcher(
+    root: Path,
+    rules: IgnoreRules,
+    directories: list[str],
+    inventory: FileInventory | None = None,
+    force_polling: bool = False,
+    poll_interval: float = 1.0,
+) -> InotifyWatcher | PollingWatcher:
+    if not force_polling:
+        try:
+            return InotifyWatcher(root, directories, rules)
+        except WatcherUnavailable:
+            pass
+    return PollingWatcher(root, rules, inventory=inventory, interval=poll_interval)
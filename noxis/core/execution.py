@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Sequence
+
+
+def run_in_processes(
+    fn: Callable[..., Any],
+    jobs: Sequence[tuple],
+    max_workers: int | None = None,
+) -> list[Any]:
+    """
+    Executa `fn(*args)` para cada item de `jobs` num ProcessPoolExecutor,
+    preservando a ordem. `fn` precisa ser picklável (função de módulo).
+    """
+    if not jobs:
+        return []
+
+    workers = max_workers or os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    if workers <= 1:
+        return [fn(*args) for args in jobs]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(fn, *args) for args in jobs]
+        return [f.result() for f in futures]
@@ -8,20 +8,110 @@ from noxis.services.ai_tests import AITestsService
 from noxis.services.scan_service import ScanService
 from noxis.services.doctor_service import DoctorService
 from noxis.services.ai_explain_service import AIExplainService
+from noxis.services.ai_history_service import AIHistoryService
+from noxis.services.db_service import DbService
+from noxis.services.history_service import HistoryService
+from noxis.services.watch_service import WatchService
 
 
 class Orchestrator:
     def init_workspace(self, workspace: Workspace) -> list[Result]:
         return InitService().run(workspace)
 
-    def scan(self, workspace: Workspace) -> list[Result]:
-        return ScanService().run(workspace)
+    def scan(
+        self,
+        workspace: Workspace,
+        full: bool = False,
+        since: str | None = None,
+        monorepo: bool = False,
+        jobs: int | None = None,
+    ) -> list[Result]:
+        return ScanService().run(workspace, full=full, since=since, monorepo=monorepo, jobs=jobs)
 
-    def doctor(self, workspace: Workspace) -> list[Result]:
-        return DoctorService().run(workspace)
+    def doctor(
+        self, workspace: Workspace, monorepo: bool = False, jobs: int | None = None
+    ) -> list[Result]:
+        return DoctorService().run(workspace, monorepo=monorepo, jobs=jobs)
 
-    def ai_explain(self, workspace: Workspace) -> str:
-        return AIExplainService().run(workspace)
+    def watch(
+        self,
+        workspace: Workspace,
+        debounce_ms: int = 300,
+        force_polling: bool = False,
+        poll_interval: float = 1.0,
+        on_update=None,
+    ) -> None:
+        WatchService().run(
+            workspace,
+            debounce_ms=debounce_ms,
+            force_polling=force_polling,
+            poll_interval=poll_interval,
+            on_update=on_update,
+        )
 
-    def ai_tests(self, workspace: Workspace) -> list[Result]:
-        return AITestsService().run(workspace)
+    def db_compact(self, workspace: Workspace, full: bool = False) -> list[Result]:
+        return DbService().compact(workspace, full=full)
+
+    def history_changes(self, workspace: Workspace) -> list[Result]:
+        return HistoryService().changes(workspace)
+
+    def history_trends(self, workspace: Workspace, runs: int = 20) -> list[Result]:
+        return HistoryService().trends(workspace, runs=runs)
+
+    def history_export(
+        self,
+        workspace: Workspace,
+        out,
+        fmt: str = "ndjson",
+        command: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+    ) -> list[Result]:
+        return HistoryService().export(
+            workspace, out, fmt=fmt, command=command, since=since, until=until
+        )
+
+    def history_import(self, workspace: Workspace, lines) -> list[Result]:
+        return HistoryService().import_(workspace, lines)
+
+    def ai_explain(
+        self,
+        workspace: Workspace,
+        use_cache: bool = True,
+        on_token=None,
+        incremental: bool = False,
+    ) -> str:
+        return AIExplainService().run(
+            workspace, use_cache=use_cache, on_token=on_token, incremental=incremental
+        )
+
+    def ai_history_search(
+        self,
+        workspace: Workspace,
+        query: str,
+        kind: str = "all",
+        limit: int = 10,
+        raw: bool = False,
+        full: bool = False,
+    ) -> list[Result]:
+        return AIHistoryService().search(
+            workspace, query, kind=kind, limit=limit, raw=raw, full=full
+        )
+
+    def ai_tests(
+        self,
+        workspace: Workspace,
+        use_cache: bool = True,
+        all_files: bool = False,
+        max_files: int | None = None,
+        jobs: int | None = None,
+        on_progress=None,
+    ) -> list[Result]:
+        return AITestsService().run(
+            workspace,
+            use_cache=use_cache,
+            all_files=all_files,
+            max_files=max_files,
+            jobs=jobs,
+            on_progress=on_progress,
+        )
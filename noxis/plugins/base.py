@@ -4,6 +4,7 @@ from dataclasses import dataclass
 from typing import Any, Protocol, Literal
 
 from noxis.core.results import Result
+from noxis.context.inventory import InventoryView
 from noxis.context.model import ProjectModel
 
 CapabilityKind = Literal["deterministic", "ai"]
@@ -33,6 +34,12 @@ class ActionRequest:
     options: dict[str, Any]
     artifacts: dict[str, Any] | None = None
 
+    @property
+    def inventory(self) -> InventoryView | None:
+        # plugins só enxergam o inventário em modo leitura
+        inventory = self.project.inventory
+        return inventory.view() if inventory is not None else None
+
 
 class Plugin(Protocol):
     id: str
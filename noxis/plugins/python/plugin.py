@@ -51,7 +51,7 @@ class PythonPlugin(Plugin):
 
     def run(self, request: ActionRequest) -> list[Result]:
         handlers = {
-            "scan": lambda: self._scan(request.project),
+            "scan": lambda: self._scan(request.project, request.options.get("changed_paths")),
             "doctor": self._doctor,
         }
 
@@ -101,14 +101,17 @@ class PythonPlugin(Plugin):
 
         return results
 
-    def _scan(self, project: ProjectModel) -> list[Result]:
+    def _scan(self, project: ProjectModel, changed_paths: list[str] | None = None) -> list[Result]:
         results: list[Result] = []
 
         signals = project.signals.setdefault("python", [])
 
         for fname in ["pyproject.toml", "requirement.txt", "setup.py", "Pipfile"]:
+            if changed_paths is not None and fname not in changed_paths:
+                # scan --since: só reavalia o que mudou
+                continue
             path = f"{project.root_path}/{fname}"
-            if path not in signals:
+            if fname not in signals:
                 import os
 
                 if os.path.exists(path):
@@ -1,8 +1,36 @@
 from __future__ import annotations
 
 from importlib.resources import files
+from pathlib import Path
+from typing import Any
+
+import yaml
+
 
 def load_default_policies_yaml() -> str:
     # lê o defaults.yml empacotado
     data = files("noxis.policies").joinpath("defaults.yml").read_text(encoding="utf-8")
     return data
+
+
+def load_policies(policies_file: Path | None = None) -> dict[str, Any]:
+    """
+    Policies efetivas: defaults.yml do pacote sobrescrito pelo policies.yml do projeto.
+    Chaves novas dos defaults continuam valendo para policies.yml antigos.
+    """
+    policies = yaml.safe_load(load_default_policies_yaml()) or {}
+    if policies_file is not None and policies_file.exists():
+        user = yaml.safe_load(policies_file.read_text(encoding="utf-8")) or {}
+        if isinstance(user, dict):
+            policies = _merge(policies, user)
+    return policies
+
+
+def _merge(base: dict[str, Any], override: dict[str, Any]) -> dict[str, Any]:
+    out = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(out.get(key), dict):
+            out[key] = _merge(out[key], value)
+        else:
+            out[key] = value
+    return out
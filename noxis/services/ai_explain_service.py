@@ -1,17 +1,37 @@
 from __future__ import annotations
 
-import hashlib
-
-from noxis.ai.context_builder import build_ai_context
-from noxis.ai.provider import AIProvider
+from noxis.ai.context_builder import (
+    build_ai_context,
+    build_incremental_context,
+    summarize_explanation,
+)
+from noxis.ai.provider import AIProvider, ServerContext
+from noxis.ai.streaming import TokenCallback
 from noxis.context.loader import load_project
 from noxis.core.project_state import ProjectState
 from noxis.core.workspace import Workspace
-from noxis.storage.memory import MemoryStore
+from noxis.storage.cache import ResponseCache, prompt_hash
+from noxis.storage.history import FindingChanges, SignalChanges
+from noxis.storage.memory import ExplanationAnchor, MemoryStore
+
+# contexto do servidor maior que isso (num_ctx comum) teria o início cortado pelo
+# Ollama e só cresce a cada continuação: acima dele, o prompt leva o resumo
+MAX_SERVER_CONTEXT_TOKENS = 8192
 
 
 class AIExplainService:
-    def run(self, workspace: Workspace) -> str:
+    def run(
+        self,
+        workspace: Workspace,
+        use_cache: bool = True,
+        on_token: TokenCallback | None = None,
+        incremental: bool = False,
+    ) -> str:
+        """
+        `incremental`: em vez do estado inteiro, manda só o que mudou desde a última
+        explicação (e o resumo dela). Sem explicação anterior utilizável, faz a completa.
+        Sem scan/doctor novo desde ela, repete a resposta, exceto com `use_cache=False`.
+        """
         if not workspace.project_file.exists():
             raise RuntimeError("project.yml not found. Run `noxis scan` first.")
 
@@ -19,27 +39,113 @@ class AIExplainService:
         store = MemoryStore(workspace.memory_db_file)
         store.initialize()
 
-        recent_scans = store.get_recent_runs("scan", limit=3)
-        recent_doctors = store.get_recent_runs("doctor", limit=3)
+        scan_run_id = store.last_run_id("scan")
+        doctor_run_id = store.last_run_id("doctor")
 
-        state = ProjectState(store)
-        scan_state = state.last_scan()
-        doctor_state = state.last_doctor()
+        anchor = store.last_ai_explanation() if incremental else None
+        delta = self._delta(store, anchor, scan_run_id, doctor_run_id) if anchor else None
+        resume = None
+        if anchor is not None and delta is not None:
+            unchanged = (anchor.scan_run_id, anchor.doctor_run_id) == (scan_run_id, doctor_run_id)
+            if unchanged and use_cache:
+                # nenhum scan/doctor novo: a última explicação continua valendo
+                if on_token is not None:
+                    on_token(anchor.response)
+                return anchor.response
+            mode = "incremental"
+            scan_changes, doctor_changes = delta
+            prompt = build_incremental_context(
+                scan_changes, doctor_changes, summarize_explanation(anchor.response)
+            )
+            context = anchor.server_context
+            if context and anchor.model and len(context) <= MAX_SERVER_CONTEXT_TOKENS:
+                resume = ServerContext(
+                    model=anchor.model,
+                    tokens=tuple(context),
+                    prompt=build_incremental_context(scan_changes, doctor_changes),
+                )
+        else:
+            mode = "full"
+            state = ProjectState(store)
+            prompt = build_ai_context(
+                scan_state=state.last_scan(),
+                doctor_state=state.last_doctor(),
+                scan_changes=store.signal_changes("scan"),
+                doctor_changes=store.finding_changes("doctor"),
+            )
 
-        prompt = build_ai_context(
-            scan_state=scan_state,
-            doctor_state=doctor_state,
-            scan_history=recent_scans,
-            doctor_history=recent_doctors,
+        cache = (
+            ResponseCache.open(workspace.memory_db_file, workspace.policies_file)
+            if use_cache
+            else None
         )
+        provider = AIProvider(cache=cache)
+        provider.load_state(store)
+        response = provider.explain(prompt, on_token=on_token, resume=resume)
 
-        provider = AIProvider()
-        response = provider.explain(prompt)
+        metrics = provider.last.metrics
+        if metrics is not None:
+            try:
+                store.record_ai_metrics(
+                    "ai-explain",
+                    provider.last.model,
+                    provider.config.endpoint,
+                    streamed=provider.last.streamed,
+                    ttft_ms=metrics.ttft_ms,
+                    total_ms=metrics.total_ms,
+                    tokens=metrics.tokens,
+                    tokens_per_sec=metrics.tokens_per_sec,
+                    mode="resume" if provider.last.resumed else mode,
+                    prompt_chars=provider.last.prompt_chars,
+                    prompt_tokens=metrics.prompt_tokens,
+                    prefill_ms=metrics.prefill_ms,
+                )
+            except Exception:
+                pass
 
         try:
-            prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
-            store.record_ai_explanation(prompt_hash=prompt_hash, response=response)
+            # fallback e stream cortado ficam no histórico, mas não viram base do incremental
+            complete = provider.last.complete
+            store.record_ai_explanation(
+                prompt_hash=prompt_hash(prompt),
+                response=response,
+                scan_run_id=scan_run_id,
+                doctor_run_id=doctor_run_id,
+                mode=mode if complete else None,
+                model=provider.last.model if complete else None,
+                server_context=provider.last.context if complete else None,
+            )
         except Exception:
             pass
 
         return response
+
+    def _delta(
+        self,
+        store: MemoryStore,
+        anchor: ExplanationAnchor,
+        scan_run_id: int | None,
+        doctor_run_id: int | None,
+    ) -> tuple[SignalChanges | None, FindingChanges | None] | None:
+        """
+        Diffs desde os runs da explicação anterior; None quando não dá para comparar
+        (comando que rodou pela primeira vez depois dela, run apagado pela retenção).
+        """
+        scan_changes = doctor_changes = None
+        if anchor.scan_run_id != scan_run_id:
+            if anchor.scan_run_id is None:
+                return None
+            scan_changes = store.signal_changes("scan", since_run_id=anchor.scan_run_id)
+            if scan_changes is None:
+                return None
+        elif scan_run_id is not None:
+            scan_changes = SignalChanges(scan_run_id, scan_run_id, added=[], removed=[])
+        if anchor.doctor_run_id != doctor_run_id:
+            if anchor.doctor_run_id is None:
+                return None
+            doctor_changes = store.finding_changes("doctor", since_run_id=anchor.doctor_run_id)
+            if doctor_changes is None:
+                return None
+        elif doctor_run_id is not None:
+            doctor_changes = FindingChanges(doctor_run_id, doctor_run_id, added=[], resolved=[])
+        return scan_changes, doctor_changes
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from noxis.core.results import Result
+from noxis.core.workspace import Workspace
+from noxis.storage.memory import MemoryStore
+from noxis.storage.search import KIND_AI_EXPLANATION, KIND_FINDING
+
+SEARCH_KINDS = ("all", KIND_AI_EXPLANATION, KIND_FINDING)
+
+
+class AIHistoryService:
+    def search(
+        self,
+        workspace: Workspace,
+        query: str,
+        kind: str = "all",
+        limit: int = 10,
+        raw: bool = False,
+        full: bool = False,
+    ) -> list[Result]:
+        """
+        Busca nas explicações de IA e findings antigos, mais relevantes primeiro (bm25).
+        """
+        if kind not in SEARCH_KINDS:
+            return [
+                Result.error(
+                    "ai-history",
+                    f"Unknown kind: {kind} (supported: {', '.join(SEARCH_KINDS)})",
+                )
+            ]
+        if not workspace.memory_db_file.exists():
+            return [
+                Result.warn(
+                    "ai-history",
+                    "memory.db not found. Run `noxis init` first.",
+                    str(workspace.memory_db_file),
+                )
+            ]
+
+        try:
+            store = MemoryStore(workspace.memory_db_file)
+            store.initialize()
+            hits = store.search(query, kind=kind, limit=limit, raw=raw)
+        except Exception as exc:  # noqa: BLE001
+            return [Result.error("ai-history", f"Search failed: {exc}")]
+
+        if not hits:
+            return [Result.info("ai-history", f"No match for: {query}")]
+
+        results: list[Result] = []
+        for hit in hits:
+            if hit.kind == KIND_AI_EXPLANATION:
+                where = f"AI explanation #{hit.ref} ({hit.created_at})"
+            elif hit.ref is not None:
+                where = f"Finding, last seen in run #{hit.ref} ({hit.created_at})"
+            else:
+                where = "Finding"
+            text = hit.text if full else hit.snippet
+            results.append(Result.info("ai-history", f"{where}: {text}"))
+        return results
@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+import ast
+from dataclasses import dataclass, field
+
+# ~4 caracteres por token em código Python com tokenizers BPE: estimativa
+# suficiente para orçamento, sem depender do tokenizer do modelo.
+CHARS_PER_TOKEN = 4
+
+_OMITTED, _STUB, _FULL = 0, 1, 2
+_SEPARATOR = 2  # linha em branco entre blocos
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@dataclass(frozen=True)
+class CompactedSource:
+    text: str
+    tokens: int
+    full: list[str]  # símbolos com corpo completo
+    stubs: list[str]  # só assinatura + docstring
+    omitted: list[str]
+
+
+@dataclass
+class _Symbol:
+    name: str  # "f", "Classe" ou "Classe.metodo"
+    public: bool
+    order: int
+    stub: str
+    full: str
+    stub_names: frozenset[str]
+    full_names: frozenset[str]
+    parent: "_Symbol | None" = None
+    members: list["_Symbol"] = field(default_factory=list)
+    state: int = _OMITTED
+
+
+@dataclass
+class _Import:
+    text: str
+    order: int
+    bound: frozenset[str]
+    included: bool = False
+
+
+def _names(nodes: list[ast.AST]) -> frozenset[str]:
+    found: set[str] = set()
+    for node in nodes:
+        for sub in ast.walk(node):
+            if isinstance(sub, ast.Name):
+                found.add(sub.id)
+            elif isinstance(sub, ast.Attribute):
+                found.add(sub.attr)  # self._helper(), Classe.CONSTANTE
+                base = sub.value
+                while isinstance(base, ast.Attribute):
+                    base = base.value
+                if isinstance(base, ast.Name):
+                    found.add(base.id)
+    return frozenset(found)
+
+
+def _signature_nodes(node: ast.FunctionDef | ast.AsyncFunctionDef) -> list[ast.AST]:
+    return [*node.decorator_list, node.args, *([node.returns] if node.returns else [])]
+
+
+class _Source:
+    def __init__(self, source: str) -> None:
+        self.lines = source.splitlines()
+
+    def span(self, node: ast.AST) -> str:
+        # linhas inteiras: preserva a indentação de métodos
+        decorators = getattr(node, "decorator_list", [])
+        start = min([node.lineno] + [d.lineno for d in decorators])
+        return "\n".join(self.lines[start - 1 : node.end_lineno])
+
+    def function_stub(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> str:
+        body = node.body
+        first = body[0]
+        if first.lineno == node.lineno:
+            return self.span(node)  # def f(): return x — já é uma linha
+        decorators = node.decorator_list
+        start = min([node.lineno] + [d.lineno for d in decorators])
+        end = first.lineno - 1
+        if _docstring_node(node) is not None:
+            end = first.end_lineno
+        head = "\n".join(self.lines[start - 1 : end])
+        indent = " " * (first.col_offset)
+        return f"{head}\n{indent}..."
+
+
+def _docstring_node(node: ast.AST) -> ast.Expr | None:
+    body = getattr(node, "body", None)
+    if not body:
+        return None
+    first = body[0]
+    if (
+        isinstance(first, ast.Expr)
+        and isinstance(first.value, ast.Constant)
+        and isinstance(first.value.value, str)
+    ):
+        return first
+    return None
+
+
+def _is_public(name: str, exported: set[str] | None) -> bool:
+    if exported is not None:
+        return name in exported
+    return not name.startswith("_")
+
+
+def _exported_names(tree: ast.Module) -> set[str] | None:
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(t, ast.Name) and t.id == "__all__" for t in node.targets
+        ):
+            try:
+                value = ast.literal_eval(node.value)
+            except ValueError:
+                return None
+            return {str(v) for v in value}
+    return None
+
+
+class _Packer:
+    def __init__(self, budget_chars: int, imports: list[_Import]) -> None:
+        self.remaining = budget_chars
+        self.imports = imports
+
+    def _imports_for(self, names: frozenset[str]) -> list[_Import]:
+        return [i for i in self.imports if not i.included and i.bound & names]
+
+    def take(self, cost: int, names: frozenset[str]) -> bool:
+        extra = self._imports_for(names)
+        total = cost + sum(len(i.text) + 1 for i in extra)
+        if total > self.remaining:
+            return False
+        self.remaining -= total
+        for i in extra:
+            i.included = True
+        return True
+
+
+def compact_source(source: str, max_tokens: int) -> CompactedSource | None:
+    """
+    Reduz um módulo ao que importa para gerar testes, dentro de `max_tokens`:
+    1. assinaturas + docstrings de toda a API pública (ordem do arquivo);
+    2. corpos completos dos símbolos públicos, menores primeiro;
+    3. helpers privados e constantes usados pelos corpos incluídos.
+    Só entram os imports que os trechos incluídos usam. None se não parseia.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return None
+
+    src = _Source(source)
+    exported = _exported_names(tree)
+    imports: list[_Import] = []
+    symbols: list[_Symbol] = []
+    constants: list[_Symbol] = []
+    module_doc = ""
+    doc = _docstring_node(tree)
+    if doc is not None:
+        module_doc = src.span(doc)
+
+    for order, node in enumerate(tree.body):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            bound = {
+                (a.asname or a.name).split(".")[0] for a in node.names if a.name != "*"
+            }
+            if any(a.name == "*" for a in node.names):
+                bound.add("*")
+            imports.append(_Import(src.span(node), order, frozenset(bound)))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            symbols.append(
+                _Symbol(
+                    name=node.name,
+                    public=_is_public(node.name, exported),
+                    order=order,
+                    stub=src.function_stub(node),
+                    full=src.span(node),
+                    stub_names=_names(_signature_nodes(node)),
+                    full_names=_names([node]),
+                )
+            )
+        elif isinstance(node, ast.ClassDef):
+            symbols.append(_class_symbol(src, node, order, exported))
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            names = [t.id for t in targets if isinstance(t, ast.Name)]
+            if names and names[0] != "__all__":
+                text = src.span(node)
+                constants.append(
+                    _Symbol(names[0], False, order, text, text, _names([node]), _names([node]))
+                )
+
+    # reserva para os comentários de membros omitidos
+    packer = _Packer(max_tokens * CHARS_PER_TOKEN - len(module_doc) - 64, imports)
+    # "import *" e __future__ não dá para filtrar por uso: entram sempre
+    for imp in imports:
+        if "*" in imp.bound or imp.text.startswith("from __future__"):
+            imp.included = True
+            packer.remaining -= len(imp.text) + 1
+
+    def stub(sym: _Symbol) -> bool:
+        if sym.state >= _STUB:
+            return True
+        if sym.parent is not None and not stub(sym.parent):
+            return False
+        if not packer.take(len(sym.stub) + _SEPARATOR, sym.stub_names):
+            return False
+        sym.state = _STUB
+        return True
+
+    def expand(sym: _Symbol) -> bool:
+        if sym.state == _FULL:
+            return True
+        if sym.parent is not None and not stub(sym.parent):
+            return False
+        current = len(sym.stub) + _SEPARATOR if sym.state == _STUB else 0
+        if not packer.take(len(sym.full) + _SEPARATOR - current, sym.full_names):
+            return False
+        sym.state = _FULL
+        return True
+
+    flat = [s for top in symbols for s in (top.members if top.members else [top])]
+    public = [s for s in flat if s.public]
+
+    # 1. API pública em stubs
+    for top in symbols:
+        if top.public:
+            stub(top)
+        for member in top.members:
+            if member.public:
+                stub(member)
+    # 2. corpos sob teste: menores primeiro cobrem mais símbolos por token
+    for sym in sorted(public, key=lambda s: len(s.full) - len(s.stub)):
+        expand(sym)
+    # 3. o que os corpos incluídos usam (helpers privados, constantes), até estabilizar
+    private = [s for s in flat + constants if not s.public]
+    while True:
+        used = frozenset().union(*(s.full_names for s in flat + constants if s.state == _FULL))
+        helpers = [
+            s for s in private if s.state != _FULL and s.name.split(".")[-1] in used
+        ]
+        added = [s for s in sorted(helpers, key=lambda s: len(s.full)) if expand(s)]
+        if not added:
+            break
+
+    text = _render(module_doc, imports, symbols, constants)
+    full = [s.name for s in flat + constants if s.state == _FULL]
+    stubs = [s.name for s in flat if s.state == _STUB]
+    omitted = [s.name for s in flat if s.state == _OMITTED]
+    return CompactedSource(text, estimate_tokens(text), full, stubs, omitted)
+
+
+def _class_symbol(
+    src: _Source, node: ast.ClassDef, order: int, exported: set[str] | None
+) -> _Symbol:
+    # cabeçalho: decorators, linha do class e tudo que não é método (campos, docstring)
+    start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+    first_member = node.body[0].lineno if node.body else node.end_lineno + 1
+    parts = ["\n".join(src.lines[start - 1 : first_member - 1])]
+    header_nodes: list[ast.AST] = [*node.decorator_list, *node.bases, *node.keywords]
+    methods: list[ast.FunctionDef | ast.AsyncFunctionDef] = []
+    for item in node.body:
+        if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            methods.append(item)
+        else:
+            parts.append(src.span(item))
+            header_nodes.append(item)
+    header = "\n".join(p for p in parts if p)
+
+    cls = _Symbol(
+        name=node.name,
+        public=_is_public(node.name, exported),
+        order=order,
+        stub=header,
+        full=header,
+        stub_names=_names(header_nodes),
+        full_names=_names(header_nodes),
+    )
+    for i, m in enumerate(methods):
+        public = cls.public and (not m.name.startswith("_") or m.name == "__init__")
+        cls.members.append(
+            _Symbol(
+                name=f"{node.name}.{m.name}",
+                public=public,
+                order=i,
+                stub=src.function_stub(m),
+                full=src.span(m),
+                stub_names=_names(_signature_nodes(m)),
+                full_names=_names([m]),
+                parent=cls,
+            )
+        )
+    if not methods:
+        # classe sem métodos (dataclass, exceção): o cabeçalho é o símbolo
+        cls.members = []
+    return cls
+
+
+def _render(
+    module_doc: str, imports: list[_Import], symbols: list[_Symbol], constants: list[_Symbol]
+) -> str:
+    blocks: list[tuple[int, str]] = []
+    if module_doc:
+        blocks.append((-1, module_doc))
+    included = [i for i in imports if i.included]
+    if included:
+        blocks.append((included[0].order, "\n".join(i.text for i in included)))
+    blocks.extend((c.order, c.full) for c in constants if c.state == _FULL)
+
+    for sym in symbols:
+        if not sym.members:
+            if sym.state != _OMITTED:
+                blocks.append((sym.order, sym.full if sym.state == _FULL else sym.stub))
+            continue
+        if sym.state == _OMITTED:
+            continue
+        lines = [sym.stub]
+        skipped = 0
+        for m in sym.members:
+            if m.state == _FULL:
+                lines.append(m.full)
+            elif m.state == _STUB:
+                lines.append(m.stub)
+            else:
+                skipped += 1
+        if skipped:
+            first = sym.members[0].full
+            indent = first[: len(first) - len(first.lstrip())]
+            lines.append(f"{indent}# ... {skipped} members omitted")
+        blocks.append((sym.order, "\n\n".join(lines)))
+
+    blocks.sort(key=lambda b: b[0])
+    return "\n\n".join(text for _, text in blocks) + "\n"
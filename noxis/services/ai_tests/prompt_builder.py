@@ -1,6 +1,10 @@
 from __future__ import annotations
 from pathlib import Path
 
+from .ast_compactor import compact_source
+
+PROMPT_MODES = ("ast", "truncate")
+
 
 class AITestsPromptBuilder:
     def build_for_file(
@@ -9,11 +13,26 @@ class AITestsPromptBuilder:
         target_file: Path,
         root: Path,
         max_chars: int = 12000,
+        mode: str = "ast",
+        max_tokens: int = 3000,
     ) -> str:
+        """
+        mode="ast": API pública + corpos por prioridade dentro de `max_tokens`;
+        mode="truncate" (ou arquivo que não parseia): corta em `max_chars`.
+        """
         rel_path = target_file.relative_to(root).as_posix()
         code = target_file.read_text(encoding="utf-8", errors="replace")
 
-        if len(code) > max_chars:
+        notes: list[str] = []
+        compacted = compact_source(code, max_tokens) if mode == "ast" else None
+        if compacted is not None:
+            code = compacted.text
+            if compacted.stubs or compacted.omitted:
+                notes.append(
+                    "- The code below is compacted: `...` marks bodies left out and some "
+                    "private members are omitted; import the real module in tests"
+                )
+        elif len(code) > max_chars:
             code = code[:max_chars] + "\n\n# ... truncated ...\n"
         return "\n".join(
             [
@@ -27,6 +46,7 @@ class AITestsPromptBuilder:
                 "- Use mocks only when strictly necessary",
                 "- Return ONLY a JSON object mapping filename -> content",
                 "- Filename must ne a single .py file (no directories)",
+                *notes,
                 "",
                 f"Project root: {project.root_path}",
                 f"Target module: {rel_path}",
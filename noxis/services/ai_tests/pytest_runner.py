@@ -1,12 +1,28 @@
 from __future__ import annotations
 import subprocess
+import tempfile
+from contextlib import ExitStack
 from pathlib import Path
 
 
+class PytestRun:
+    # pytest em andamento (ver PytestRunner.start)
+    def __init__(self, proc: subprocess.Popen, output) -> None:
+        self._proc = proc
+        self._output = output
+
+    def wait(self) -> tuple[bool, str]:
+        code = self._proc.wait()
+        self._output.seek(0)
+        output = self._output.read().decode("utf-8", errors="replace")
+        self._output.close()
+        return code == 0, output
+
+
 class PytestRunner:
-    def run(self, root: Path) -> tuple[bool, str]:
+    def run(self, root: Path, paths: list[str] | None = None) -> tuple[bool, str]:
         proc = subprocess.run(
-            ["pytest", "-q", "tests"],
+            ["pytest", "-q", *(paths or ["tests"])],
             cwd=str(root),
             capture_output=True,
             text=True,
@@ -14,3 +30,20 @@ class PytestRunner:
 
         output = proc.stdout + "\n" + proc.stderr
         return proc.returncode == 0, output
+
+    def start(self, root: Path, paths: list[str]) -> PytestRun:
+        """
+        Dispara o pytest sem esperar: a validação roda enquanto o modelo ainda gera.
+        Saída vai para um arquivo temporário (um pipe cheio travaria o processo).
+        """
+        with ExitStack() as stack:
+            output = stack.enter_context(tempfile.TemporaryFile())
+            # pytest ausente, cwd inválido: o arquivo fecha com o erro
+            proc = subprocess.Popen(
+                ["pytest", "-q", *paths],
+                cwd=str(root),
+                stdout=output,
+                stderr=subprocess.STDOUT,
+            )
+            stack.pop_all()  # daqui em diante quem fecha é PytestRun.wait()
+        return PytestRun(proc, output)
@@ -1,17 +1,35 @@
 from __future__ import annotations
+from dataclasses import asdict, dataclass
 from pathlib import Path
+from typing import Callable
 import shutil
+import time
 
 from noxis.ai.provider import AIProvider
 from noxis.context.loader import load_project
 from noxis.core.results import Result
 from noxis.core.workspace import Workspace
+from noxis.policies.loader import load_policies
+from noxis.storage.cache import ResponseCache
 from noxis.storage.memory import MemoryStore
 
 from .source_discovery import PythonSourceDiscovery
-from .prompt_builder import AITestsPromptBuilder
+from .prompt_builder import PROMPT_MODES, AITestsPromptBuilder
 from .writer import TestFileWriter
-from .pytest_runner import PytestRunner
+from .pytest_runner import PytestRun, PytestRunner
+
+
+@dataclass(frozen=True)
+class ModuleOutcome:
+    target: str  # relativo ao root
+    status: str  # passed | failed | error | skipped
+    test_files: tuple[str, ...] = ()  # em tests/
+    seconds: float = 0.0
+    detail: str = ""
+    rejected_files: tuple[str, ...] = ()  # reprovados no pytest, em .noxis/
+
+
+ProgressCallback = Callable[[int, int, ModuleOutcome], None]
 
 
 class AITestsService:
@@ -21,10 +39,29 @@ class AITestsService:
         self.writer = TestFileWriter()
         self.pytest = PytestRunner()
         self.provider = AIProvider()
+        self.prompt_mode = "ast"
+        self.max_prompt_tokens = 3000
 
-    def run(self, workspace: Workspace) -> list[Result]:
+    def run(
+        self,
+        workspace: Workspace,
+        use_cache: bool = True,
+        all_files: bool = False,
+        max_files: int | None = None,
+        jobs: int | None = None,
+        on_progress: ProgressCallback | None = None,
+    ) -> list[Result]:
         if not workspace.project_file.exists():
             return [Result.error("ai-tests", "project.yml not found. Run `noxis scan` first.")]
+        self._load_prompt_settings(workspace)
+        store = MemoryStore(workspace.memory_db_file)
+        store.initialize()
+        # latência por modelo e circuit breaker do servidor valem entre rodadas
+        self.provider.load_state(store)
+        if use_cache:
+            self.provider.cache = ResponseCache.open(
+                workspace.memory_db_file, workspace.policies_file
+            )
         project = load_project(workspace.root)
 
         if "python" not in (project.languages_detected or []):
@@ -33,16 +70,18 @@ class AITestsService:
         if not shutil.which("pytest"):
             return [Result.error("ai-tests", "pytest not found")]
 
-        py_files = self.discovery.discover_files(workspace.root)
+        py_files = self.discovery.discover_files(workspace.root, project.inventory)
         if not py_files:
             return [Result.warn("ai-tests", "No Python source directories found.")]
 
-        target = py_files[0]  # MVP: exatamente 1 arquivo
+        if all_files or max_files is not None:
+            targets = py_files if max_files is None else py_files[: max(max_files, 0)]
+            return self._run_batch(workspace, project, targets, jobs, on_progress)
+
+        target = py_files[0]  # sem --all/--max-files: só o menor arquivo
         test_filename = self._test_filename_for_target(target, workspace.root)
 
-        prompt = self.prompt_builder.build_for_file(
-            project=project, target_file=target, root=workspace.root
-        )
+        prompt = self._build_prompt(project, target, workspace.root)
 
         generated = self.provider.generate_tests(prompt)
 
@@ -70,6 +109,159 @@ class AITestsService:
             )
         ]
 
+    def _load_prompt_settings(self, workspace: Workspace) -> None:
+        try:
+            tests = (load_policies(workspace.policies_file).get("ai") or {}).get("tests") or {}
+        except Exception:
+            return
+        mode = str(tests.get("prompt_mode", self.prompt_mode))
+        if mode in PROMPT_MODES:
+            self.prompt_mode = mode
+        self.max_prompt_tokens = max(256, int(tests.get("max_prompt_tokens", 3000)))
+
+    def _build_prompt(self, project, target: Path, root: Path) -> str:
+        return self.prompt_builder.build_for_file(
+            project=project,
+            target_file=target,
+            root=root,
+            mode=self.prompt_mode,
+            max_tokens=self.max_prompt_tokens,
+        )
+
+    def _run_batch(
+        self,
+        workspace: Workspace,
+        project,
+        targets: list[Path],
+        jobs: int | None,
+        on_progress: ProgressCallback | None,
+    ) -> list[Result]:
+        """
+        Gera em paralelo (até `jobs` requests em voo) e valida cada módulo com
+        pytest assim que a resposta chega, enquanto os próximos ainda geram.
+        """
+        root = workspace.root
+        pending: list[Path] = []
+        outcomes: list[ModuleOutcome] = []
+        for target in targets:
+            test_file = root / "tests" / self._test_filename_for_target(target, root)
+            if test_file.exists():
+                # não sobrescreve testes existentes (nem os gerados numa rodada anterior)
+                outcomes.append(
+                    ModuleOutcome(
+                        target.relative_to(root).as_posix(),
+                        "skipped",
+                        (str(test_file),),
+                        detail="test file already exists",
+                    )
+                )
+            else:
+                pending.append(target)
+
+        total = len(targets)
+        if on_progress is not None:
+            for i, outcome in enumerate(outcomes, start=1):
+                on_progress(i, total, outcome)
+
+        def generate(target: Path) -> ModuleOutcome:
+            return self._generate_module(workspace, project, target)
+
+        for _, future in self.provider.executor(jobs).run(generate, pending):
+            outcome = future.result()
+            outcomes.append(outcome)
+            if on_progress is not None:
+                on_progress(len(outcomes), total, outcome)
+
+        self._persist_batch(workspace, outcomes)
+        return self._batch_results(outcomes)
+
+    def _generate_module(self, workspace: Workspace, project, target: Path) -> ModuleOutcome:
+        """
+        Roda na thread do executor. Cada arquivo do mapping é gravado e entra no
+        pytest assim que o par JSON fecha no stream: a validação sobrepõe a geração.
+        """
+        root = workspace.root
+        rel = target.relative_to(root).as_posix()
+        started = time.perf_counter()
+        base = self._test_filename_for_target(target, root)
+        running: list[tuple[str, PytestRun]] = []
+
+        def on_file(name: str, content: str) -> None:
+            filename = base if not running else f"{base[:-3]}_{len(running) + 1}.py"
+            path = self.writer.write(root, {filename: content})[0]
+            running.append((path, self.pytest.start(root, [path])))
+
+        error = ""
+        try:
+            prompt = self._build_prompt(project, target, root)
+            self.provider.generate_tests_stream(prompt, on_file)
+        except Exception as exc:  # noqa: BLE001
+            error = str(exc) or type(exc).__name__
+
+        kept: list[str] = []
+        rejected: list[str] = []
+        failures: list[str] = []
+        for path, run in running:
+            ok, output = run.wait()
+            if ok:
+                kept.append(path)
+                continue
+            # teste reprovado sai de tests/ para não quebrar a suíte; fica para inspeção
+            dest = workspace.state_dir / "ai_tests" / "rejected" / Path(path).name
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            Path(path).replace(dest)
+            rejected.append(str(dest))
+            failures.append("\n".join(output.strip().splitlines()[-20:]))
+
+        seconds = time.perf_counter() - started
+        if error:
+            status, detail = "error", error
+        elif rejected:
+            status, detail = "failed", "\n\n".join(failures)
+        else:
+            status, detail = "passed", ""
+        return ModuleOutcome(rel, status, tuple(kept), seconds, detail, tuple(rejected))
+
+    def _batch_results(self, outcomes: list[ModuleOutcome]) -> list[Result]:
+        results: list[Result] = []
+        counts: dict[str, int] = {}
+        for o in outcomes:
+            counts[o.status] = counts.get(o.status, 0) + 1
+            location = ", ".join(o.test_files + o.rejected_files) or None
+            if o.status == "passed":
+                results.append(Result.info("ai-tests", f"{o.target}: tests passed", location))
+            elif o.status == "skipped":
+                results.append(Result.warn("ai-tests", f"{o.target}: {o.detail}", location))
+            elif o.status == "failed":
+                results.append(
+                    Result.error("ai-tests", f"{o.target}: generated tests failed", location)
+                )
+            else:
+                results.append(Result.error("ai-tests", f"{o.target}: {o.detail}", location))
+
+        summary = ", ".join(f"{n} {status}" for status, n in sorted(counts.items()))
+        results.append(
+            Result.info("ai-tests", f"{len(outcomes)} modules: {summary or 'nothing to do'}.")
+        )
+        return results
+
+    def _persist_batch(self, workspace: Workspace, outcomes: list[ModuleOutcome]) -> None:
+        try:
+            store = MemoryStore(workspace.memory_db_file)
+            store.initialize()
+            store.record_run(
+                "ai-tests",
+                payload={
+                    "mode": "batch",
+                    "generated_files": [
+                        f for o in outcomes if o.status != "skipped" for f in o.test_files
+                    ],
+                    "modules": [asdict(o) for o in outcomes],
+                },
+            )
+        except Exception:
+            pass
+
     def _test_filename_for_target(self, target: Path, root: Path) -> str:
         rel = target.relative_to(root).as_posix()
         base = rel.replace("/", "_").replace(".py", "")
@@ -1,19 +1,26 @@
 from __future__ import annotations
 from pathlib import Path
 
+from noxis.context.inventory import FileInventory
+from noxis.context.walker import walk_tree
+
 
 class PythonSourceDiscovery:
     IGNORE_DIRS = {".venv", "venv", "__pycache__", ".noxis", ".git", "tests", "dist", "build"}
 
-    def discover_files(self, root: Path) -> list[str]:
-        files: list[str] = []
+    def discover_files(self, root: Path, inventory: FileInventory | None = None) -> list[Path]:
+        if inventory is None:
+            inventory = walk_tree(root)
 
-        for p in root.rglob("*.py"):
-            if any(part in self.IGNORE_DIRS for part in p.parts):
+        entries = []
+        for entry in inventory.with_extension(".py"):
+            parts = entry.path.split("/")
+            if any(part in self.IGNORE_DIRS for part in parts[:-1]):
                 continue
-            if p.name == "__init__.py":
+            if entry.name == "__init__.py":
                 continue
 
-            files.append(p)
-        files.sort(key=lambda f: f.stat().st_size if f.exists() else 10**9)
-        return files
+            entries.append(entry)
+        # tamanho já vem do inventário: sem stat() extra
+        entries.sort(key=lambda e: e.size)
+        return [root / e.path for e in entries]
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from noxis.core.results import Result
+from noxis.core.workspace import Workspace
+from noxis.storage.memory import MemoryStore
+from noxis.storage.retention import RetentionPolicy
+
+
+class DbService:
+    def compact(self, workspace: Workspace, full: bool = False) -> list[Result]:
+        if not workspace.memory_db_file.exists():
+            return [
+                Result.warn(
+                    "db",
+                    "memory.db not found. Run `noxis init` first.",
+                    str(workspace.memory_db_file),
+                )
+            ]
+
+        try:
+            store = MemoryStore(
+                workspace.memory_db_file,
+                retention=RetentionPolicy.load(workspace.policies_file),
+            )
+            store.initialize()
+            stats = store.compact(full=full)
+        except Exception as exc:  # noqa: BLE001
+            return [Result.error("db", f"Failed to compact memory.db: {exc}")]
+
+        freed = stats.bytes_before - stats.bytes_after
+        return [
+            Result.info(
+                "db",
+                f"Removed {stats.runs_deleted} runs, {stats.explanations_deleted} AI explanations "
+                f"and {stats.blobs_deleted} orphan payloads past retention.",
+                str(workspace.memory_db_file),
+            ),
+            Result.info(
+                "db",
+                f"Size: {stats.bytes_before / 1024:.0f} KiB -> {stats.bytes_after / 1024:.0f} KiB "
+                f"({max(freed, 0) / 1024:.0f} KiB freed).",
+                str(workspace.memory_db_file),
+            ),
+        ]
@@ -1,6 +1,12 @@
 from __future__ import annotations
 
+import time
+from typing import Any
+
+from noxis.ai.provider import TRANSPORT_STATE_KEY
 from noxis.context.loader import load_project
+from noxis.context.model import ProjectModel
+from noxis.core.execution import run_in_processes
 from noxis.core.results import Result
 from noxis.core.workspace import Workspace
 from noxis.plugins.manager import PluginManager
@@ -9,7 +15,9 @@ from noxis.storage.memory import MemoryStore
 
 
 class DoctorService:
-    def run(self, workspace: Workspace) -> list[Result]:
+    def run(
+        self, workspace: Workspace, monorepo: bool = False, jobs: int | None = None
+    ) -> list[Result]:
         results: list[Result] = []
 
         try:
@@ -22,45 +30,27 @@ class DoctorService:
         except Exception as exc:  # noqa: BLE001
             return [Result.error("doctor", f"Project discovery failed: {exc}")]
 
-        manager = PluginManager()
-        plugins = manager.load_all()
-
-        applicable_plugins: list = []
-
-        for plugin in plugins:
-            app = plugin.detect(project)
-            if app.is_applicable:
-                applicable_plugins.append(plugin)
+        if monorepo and project.packages:
+            # agregado do root + um doctor por pacote, em paralelo
+            results.extend(_run_doctor_plugins(project))
+            outputs = run_in_processes(
+                doctor_package,
+                [(rel, pkg) for rel, pkg in project.packages.items()],
+                max_workers=jobs,
+            )
+            for package_results in outputs:
+                results.extend(package_results)
+        else:
+            if monorepo:
                 results.append(
-                    Result.info(
+                    Result.warn(
                         "doctor",
-                        f"Plugin applicable: {plugin.id} (confidence={app.confidence})",
-                        ", ".join(app.reasons),
+                        "Workspace mode: no packages in project.yml. "
+                        "Run `noxis scan --workspace` first.",
+                        project.root_path,
                     )
                 )
-
-        if not applicable_plugins:
-            results.append(
-                Result.warn(
-                    "doctor",
-                    "No applicable plugins found for this project.",
-                    project.root_path,
-                )
-            )
-
-        for plugin in applicable_plugins:
-            capabilities = {c.name for c in plugin.capabilities(project)}
-            if "doctor" not in capabilities:
-                continue
-
-            plugin_results = plugin.run(
-                ActionRequest(
-                    capability="doctor",
-                    project=project,
-                    options={},
-                )
-            )
-            results.extend(plugin_results)
+            results.extend(_run_doctor_plugins(project))
 
         try:
             store = MemoryStore(workspace.memory_db_file)
@@ -73,9 +63,119 @@ class DoctorService:
                 ]
             }
 
-            store.record_run("doctor", payload=payload)
-            store.set_state("last_doctor", payload)
+            store.record_run("doctor", payload=payload, state={"last_doctor": payload})
         except Exception:
             pass
 
+        # fora do payload: latências mudam a cada rodada e virariam findings novos/resolvidos
+        results.extend(_ai_server_results(workspace))
         return results
+
+
+def _ai_server_results(workspace: Workspace) -> list[Result]:
+    """
+    Circuit breaker, latências e retries/hedges de cada servidor de IA usado
+    (gravados pelo AIProvider no memory.db).
+    """
+    try:
+        store = MemoryStore(workspace.memory_db_file)
+        store.initialize()
+        servers = store.get_state(TRANSPORT_STATE_KEY) or {}
+    except Exception:
+        return []
+
+    results: list[Result] = []
+    for url, server in sorted(servers.items()):
+        if not isinstance(server, dict):
+            continue
+        summary = _ai_server_summary(server)
+        state = server.get("state")
+        if state == "closed":
+            results.append(Result.info("doctor", f"AI server circuit closed. {summary}", url))
+            continue
+        error = server.get("last_error") or "unknown error"
+        opened_at = server.get("opened_at") or 0.0
+        retry_in = opened_at + float(server.get("cooldown_seconds") or 0) - time.time()
+        failures = server.get("consecutive_failures", 0)
+        if state == "open" and retry_in > 0:
+            message = (
+                f"AI server circuit open after {failures} consecutive failures "
+                f"(last: {error}); failing fast for {retry_in:.0f}s more. {summary}"
+            )
+        else:
+            message = (
+                f"AI server circuit half-open (last failure: {error}); "
+                f"the next call probes the server. {summary}"
+            )
+        results.append(Result.warn("doctor", message, url))
+    return results
+
+
+def _ai_server_summary(server: dict[str, Any]) -> str:
+    parts = [
+        (
+            f"{server.get('calls', 0)} calls, {server.get('errors', 0)} errors, "
+            f"{server.get('retries', 0)} retries"
+        )
+    ]
+    if server.get("hedges"):
+        parts.append(f"{server['hedges']} hedged ({server.get('hedge_wins', 0)} won by hedge)")
+    for kind, latency in sorted((server.get("latency") or {}).items()):
+        p50, p95 = latency.get("p50_ms"), latency.get("p95_ms")
+        if p50 is not None and p95 is not None:
+            label = "time to first byte (stream)" if kind == "stream" else "response"
+            parts.append(f"{label} p50 {p50:.0f} ms, p95 {p95:.0f} ms")
+    return "; ".join(parts) + "."
+
+
+def _run_doctor_plugins(project: ProjectModel) -> list[Result]:
+    results: list[Result] = []
+    manager = PluginManager()
+    plugins = manager.load_all()
+
+    applicable_plugins: list = []
+
+    for plugin in plugins:
+        app = plugin.detect(project)
+        if app.is_applicable:
+            applicable_plugins.append(plugin)
+            results.append(
+                Result.info(
+                    "doctor",
+                    f"Plugin applicable: {plugin.id} (confidence={app.confidence})",
+                    ", ".join(app.reasons),
+                )
+            )
+
+    if not applicable_plugins:
+        results.append(
+            Result.warn(
+                "doctor",
+                "No applicable plugins found for this project.",
+                project.root_path,
+            )
+        )
+
+    for plugin in applicable_plugins:
+        capabilities = {c.name for c in plugin.capabilities(project)}
+        if "doctor" not in capabilities:
+            continue
+
+        plugin_results = plugin.run(
+            ActionRequest(
+                capability="doctor",
+                project=project,
+                options={},
+            )
+        )
+        results.extend(plugin_results)
+    return results
+
+
+def doctor_package(rel: str, project: ProjectModel) -> list[Result]:
+    """
+    Worker (processo separado): doctor de um sub-projeto.
+    """
+    results = [Result.info("doctor", f"Package {rel}", project.root_path)]
+    results.extend(_run_doctor_plugins(project))
+    return results
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+from typing import Iterable, TextIO
+
+from noxis.core.results import Result
+from noxis.core.workspace import Workspace
+from noxis.storage.export import EXPORT_FORMATS, export_ndjson, import_ndjson
+from noxis.storage.history import KIND_SIGNAL, Signal
+from noxis.storage.memory import MemoryStore
+
+
+class HistoryService:
+    def changes(self, workspace: Workspace) -> list[Result]:
+        """
+        Diff do último scan/doctor em relação ao anterior.
+        """
+        store, results = self._open(workspace)
+        if store is None:
+            return results
+
+        try:
+            signal_changes = store.signal_changes("scan")
+            finding_changes = store.finding_changes("doctor")
+        except Exception as exc:  # noqa: BLE001
+            return [Result.error("history", f"Failed to read history: {exc}")]
+
+        if signal_changes is None:
+            results.append(Result.info("history", "No previous scan to compare."))
+        elif not signal_changes.added and not signal_changes.removed:
+            results.append(Result.info("history", "Scan: no change."))
+        else:
+            for s in signal_changes.added:
+                results.append(Result.info("history", f"Scan added {_signal_label(s)}"))
+            for s in signal_changes.removed:
+                results.append(Result.info("history", f"Scan removed {_signal_label(s)}"))
+
+        if finding_changes is None:
+            results.append(Result.info("history", "No previous doctor to compare."))
+        elif not finding_changes.added and not finding_changes.resolved:
+            results.append(Result.info("history", "Doctor results: no change."))
+        else:
+            for f in finding_changes.added:
+                make = Result.info if f.severity == "info" else Result.warn
+                results.append(make("history", f"New: {f.label()}", f.location or None))
+            for f in finding_changes.resolved:
+                results.append(
+                    Result.info("history", f"Resolved: {f.label()}", f.location or None)
+                )
+
+        return results
+
+    def trends(self, workspace: Workspace, runs: int = 20, limit: int = 20) -> list[Result]:
+        """
+        Contagens por severidade e findings recorrentes nos últimos `runs` doctors.
+        """
+        store, results = self._open(workspace)
+        if store is None:
+            return results
+
+        try:
+            counts = store.run_counts(runs=runs, command="doctor")
+            trends = store.finding_trends(runs=runs, command="doctor", limit=limit)
+        except Exception as exc:  # noqa: BLE001
+            return [Result.error("history", f"Failed to read history: {exc}")]
+
+        if not counts:
+            return [Result.info("history", "No doctor runs recorded. Run `noxis doctor` first.")]
+
+        for c in counts:
+            results.append(
+                Result.info(
+                    "history",
+                    f"Run #{c.run_id} ({c.created_at}): "
+                    f"{c.errors} errors, {c.warnings} warnings, {c.infos} info",
+                )
+            )
+
+        for t in trends:
+            status = "persistent" if t.persistent else f"{t.runs_present}/{t.total_runs} runs"
+            make = Result.info if t.finding.severity == "info" else Result.warn
+            results.append(
+                make("history", f"{t.finding.label()} ({status})", t.finding.location or None)
+            )
+
+        return results
+
+    def export(
+        self,
+        workspace: Workspace,
+        out: TextIO,
+        fmt: str = "ndjson",
+        command: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+    ) -> list[Result]:
+        if fmt not in EXPORT_FORMATS:
+            return [
+                Result.error(
+                    "history",
+                    f"Unsupported export format: {fmt} (supported: {', '.join(EXPORT_FORMATS)})",
+                )
+            ]
+        store, results = self._open(workspace)
+        if store is None:
+            return results
+
+        try:
+            stats = export_ndjson(
+                store,
+                out,
+                command=command,
+                since=since,
+                until=until,
+                source=str(workspace.root),
+            )
+        except Exception as exc:  # noqa: BLE001
+            return [Result.error("history", f"Export failed: {exc}")]
+
+        return [
+            Result.info(
+                "history",
+                f"Exported {stats.runs} runs and {stats.explanations} AI explanations.",
+                str(workspace.memory_db_file),
+            )
+        ]
+
+    def import_(self, workspace: Workspace, lines: Iterable[str]) -> list[Result]:
+        try:
+            workspace.state_dir.mkdir(parents=True, exist_ok=True)
+            store = MemoryStore(workspace.memory_db_file)
+            store.initialize()
+            stats = import_ndjson(store, lines)
+        except Exception as exc:  # noqa: BLE001
+            return [Result.error("history", f"Import failed: {exc}")]
+
+        results = [
+            Result.info(
+                "history",
+                f"Imported {stats.runs} runs and {stats.explanations} AI explanations.",
+                str(workspace.memory_db_file),
+            )
+        ]
+        if stats.skipped:
+            results.append(
+                Result.warn("history", f"Skipped {stats.skipped} invalid or unknown lines.")
+            )
+        if stats.duplicates:
+            results.append(
+                Result.info("history", f"Skipped {stats.duplicates} records already imported.")
+            )
+        return results
+
+    def _open(self, workspace: Workspace) -> tuple[MemoryStore | None, list[Result]]:
+        if not workspace.memory_db_file.exists():
+            return None, [
+                Result.warn(
+                    "history",
+                    "memory.db not found. Run `noxis init` first.",
+                    str(workspace.memory_db_file),
+                )
+            ]
+        try:
+            store = MemoryStore(workspace.memory_db_file)
+            store.initialize()
+        except Exception as exc:  # noqa: BLE001
+            return None, [Result.error("history", f"Failed to open memory.db: {exc}")]
+        return store, []
+
+
+def _signal_label(signal: Signal) -> str:
+    if signal.kind == KIND_SIGNAL:
+        return f"signal {signal.group}: {signal.value}"
+    return f"{signal.kind.replace('_', ' ')}: {signal.value}"
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from noxis.context.discovery import discover_project
+from noxis.context.loader import save_project
 from noxis.core.results import Result
 from noxis.core.workspace import Workspace
 from noxis.policies.loader import load_default_policies_yaml
@@ -45,7 +46,7 @@ class InitService:
     def _write_project(self, workspace: Workspace) -> list[Result]:
         try:
             project_model = discover_project(workspace.root)
-            workspace.project_file.write_text(project_model.to_yaml(), encoding="utf-8")
+            save_project(workspace.root, project_model)
             return [
                 Result.info("init", "Created/updated project.yml.", str(workspace.project_file))
             ]
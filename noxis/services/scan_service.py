@@ -1,15 +1,69 @@
 from __future__ import annotations
 
+import hashlib
+from dataclasses import dataclass, replace
+from pathlib import Path
+
 from noxis.context.discovery import discover_project
+from noxis.context.git_index import GitIndexError, git_changed_since, inventory_from_git
+from noxis.context.inventory import FileEntry, FileInventory
+from noxis.context.loader import load_project, save_project
+from noxis.context.model import ProjectModel
+from noxis.context.packages import find_packages, split_inventory
+from noxis.context.walker import (
+    DirRecord,
+    IgnoreRules,
+    apply_changed_paths,
+    is_pruned,
+    walk_tree_incremental,
+)
+from noxis.core.execution import run_in_processes
 from noxis.core.results import Result
 from noxis.core.workspace import Workspace
 from noxis.plugins.manager import PluginManager
 from noxis.plugins.base import ActionRequest
 from noxis.storage.memory import MemoryStore
 
+# project_state: digest da raiz no último scan via .git/index
+GIT_ROOT_STATE_KEY = "git_root"
+
+
+@dataclass
+class _Enumeration:
+    inventory: FileInventory
+    summary: str
+    root_changed: bool
+    changed_paths: list[str] | None = None
+    # checkouts git: estado da raiz do qual a detecção salva no project.yml saiu
+    root_digest: str | None = None
+
+
+def _git_root_digest(inventory: FileInventory, rules: IgnoreRules) -> str:
+    """
+    Arquivos da raiz (nome, tamanho, mtime), diretórios de primeiro nível e regras de
+    ignore: o que a detecção de linguagens/sinais lê.
+    """
+    files: list[str] = []
+    dirs: set[str] = set()
+    for entry in inventory:
+        top, sep, _rest = entry.path.partition("/")
+        if sep:
+            dirs.add(top)
+        else:
+            files.append(f"{top}:{entry.size}:{entry.mtime}")
+    raw = "\n".join([rules.digest(), *sorted(files), "", *sorted(dirs)])
+    return hashlib.sha256(raw.encode("utf-8", errors="surrogateescape")).hexdigest()
+
 
 class ScanService:
-    def run(self, workspace: Workspace) -> list[Result]:
+    def run(
+        self,
+        workspace: Workspace,
+        full: bool = False,
+        since: str | None = None,
+        monorepo: bool = False,
+        jobs: int | None = None,
+    ) -> list[Result]:
         results: list[Result] = []
 
         try:
@@ -17,43 +71,43 @@ class ScanService:
         except Exception as exc:  # noqa: BLE001
             return [Result.error("scan", f"Failed to create .noxis directory: {exc}")]
 
+        store = MemoryStore(workspace.memory_db_file)
+        try:
+            store.initialize()
+        except Exception:  # noqa: BLE001
+            store = None
+
         try:
-            project_model = discover_project(workspace.root)
+            enumeration = self._enumerate(workspace, store, full, since)
+            previous_model = None
+            if not enumeration.root_changed:
+                previous_model = self._load_previous_model(workspace)
+            if previous_model is not None and not previous_model.packages:
+                # raiz inalterada: sinais/linguagens/repo_type continuam válidos
+                project_model = replace(previous_model, inventory=enumeration.inventory)
+            else:
+                project_model = discover_project(workspace.root, enumeration.inventory)
         except Exception as exc:  # noqa: BLE001
             return [Result.error("scan", f"Project discovery failed: {exc}")]
 
-        manager = PluginManager()
-        plugins = manager.load_all()
-
-        for plugin in plugins:
-            applicability = plugin.detect(project_model)
-            if not applicability.is_applicable:
-                continue
+        results.append(Result.info("scan", enumeration.summary, project_model.root_path))
 
-            capabilities = {c.name for c in plugin.capabilities(project_model)}
-            if "scan" not in capabilities:
-                continue
+        options: dict = {}
+        if enumeration.changed_paths is not None:
+            options["changed_paths"] = enumeration.changed_paths
 
-            results.append(
-                Result.info(
-                    "scan",
-                    f"Running scan for plugin: {plugin.id}",
-                    ", ".join(applicability.reasons),
-                )
-            )
+        results.extend(run_scan_plugins(project_model, options))
 
-            plugin_results = plugin.run(
-                ActionRequest(
-                    capability="scan",
-                    project=project_model,
-                    options={},
-                )
+        if monorepo:
+            project_model, package_results = self._scan_packages(
+                workspace.root, project_model, jobs
             )
-            results.extend(plugin_results)
+            results.extend(package_results)
 
         # Persist project.yml
         try:
-            workspace.project_file.write_text(project_model.to_yaml(), encoding="utf-8")
+            save_project(workspace.root, project_model)
+            self._save_root_digest(store, enumeration.root_digest)
             results.append(
                 Result.info(
                     "scan",
@@ -97,18 +151,11 @@ class ScanService:
 
         # Persist state + history
         try:
-            store = MemoryStore(workspace.memory_db_file)
-            store.initialize()
-
-            payload = {
-                "root_path": project_model.root_path,
-                "repo_type": project_model.repo_type,
-                "languages_detected": project_model.languages_detected,
-                "signals": project_model.signals,
-            }
+            if store is None:
+                raise RuntimeError("memory.db unavailable")
 
-            store.record_run("scan", payload=payload)
-            store.set_state("last_scan", payload)
+            payload = scan_payload(project_model)
+            store.record_run("scan", payload=payload, state={"last_scan": payload})
 
             results.append(
                 Result.info(
@@ -127,3 +174,238 @@ class ScanService:
             )
 
         return results
+
+    def _scan_packages(
+        self, root: Path, project_model: ProjectModel, jobs: int | None
+    ) -> tuple[ProjectModel, list[Result]]:
+        """
+        Modo workspace: um ProjectModel por sub-projeto, escaneados em paralelo
+        (ProcessPoolExecutor). O modelo do root vira o agregado.
+        """
+        inventory = project_model.inventory or FileInventory()
+        package_dirs = find_packages(inventory)
+        if not package_dirs:
+            return project_model, [
+                Result.warn("scan", "Workspace mode: no sub-projects found.", str(root))
+            ]
+
+        split = split_inventory(inventory, package_dirs)
+        outputs = run_in_processes(
+            scan_package,
+            [(str(root), rel, split[rel]) for rel in package_dirs],
+            max_workers=jobs,
+        )
+
+        results: list[Result] = [
+            Result.info(
+                "scan", f"Workspace mode: scanned {len(package_dirs)} packages.", str(root)
+            )
+        ]
+        packages: dict[str, ProjectModel] = {}
+        languages = list(project_model.languages_detected)
+        for rel, model, package_results in outputs:
+            packages[rel] = model
+            results.extend(package_results)
+            for lang in model.languages_detected:
+                if lang not in languages:
+                    languages.append(lang)
+
+        aggregated = replace(
+            project_model,
+            repo_type="mono" if len(packages) > 1 else project_model.repo_type,
+            languages_detected=languages,
+            packages=packages,
+        )
+        return aggregated, results
+
+    def _enumerate(
+        self, workspace: Workspace, store: MemoryStore | None, full: bool, since: str | None
+    ) -> _Enumeration:
+        """
+        Escolhe a fonte do inventário:
+        - `since`: .git/index + apenas os paths alterados desde a revisão
+        - checkout git: .git/index (stat cache do git) + untracked; os fingerprints
+          de diretórios não entram, o index já cumpre esse papel
+        - demais casos (ou `full`): varredura do filesystem
+        """
+        root = workspace.root
+        rules = IgnoreRules.from_root(root)
+
+        if since:
+            base = inventory_from_git(root, rules, include_untracked=False)
+            if base is None:
+                raise GitIndexError("--since requires a git checkout")
+            # .noxis/, .venv etc. nunca entram no inventário: fora da contagem também
+            changed = [p for p in git_changed_since(root, since) if not is_pruned(p, rules)]
+            inventory = apply_changed_paths(root, base, changed, rules)
+            # a raiz pode ter mudado antes de `since` (checkout, reset): compara também
+            # com o estado do qual saiu a detecção salva
+            digest = _git_root_digest(inventory, rules)
+            return _Enumeration(
+                inventory=inventory,
+                summary=f"Re-evaluated {len(changed)} paths changed since {since}.",
+                root_changed=any("/" not in p for p in changed)
+                or self._git_root_changed(store, digest),
+                changed_paths=changed,
+                root_digest=digest,
+            )
+
+        if not full:
+            try:
+                inventory = inventory_from_git(root, rules)
+            except (GitIndexError, OSError, ValueError):
+                inventory = None
+            if inventory is not None:
+                digest = _git_root_digest(inventory, rules)
+                return _Enumeration(
+                    inventory=inventory,
+                    summary=f"Indexed {len(inventory)} files from .git/index.",
+                    root_changed=self._git_root_changed(store, digest),
+                    root_digest=digest,
+                )
+
+        return self._walk(workspace, store, rules, full)
+
+    def _git_root_changed(self, store: MemoryStore | None, digest: str) -> bool:
+        """
+        Equivalente ao "" em `rescanned` da varredura: a raiz difere daquela de onde
+        saiu o project.yml atual (ou não há registro dela).
+        """
+        if store is None:
+            return True
+        try:
+            saved = store.get_state(GIT_ROOT_STATE_KEY) or {}
+        except Exception:  # noqa: BLE001
+            return True
+        return saved.get("digest") != digest
+
+    def _save_root_digest(self, store: MemoryStore | None, digest: str | None) -> None:
+        """
+        Só depois de gravar o project.yml: uma varredura sem git zera o registro, já
+        que a detecção salva deixa de corresponder ao último estado do index.
+        """
+        if store is None:
+            return
+        try:
+            store.set_state(GIT_ROOT_STATE_KEY, {"digest": digest}, wait=False)
+        except Exception:  # noqa: BLE001
+            pass
+
+    def _walk(
+        self, workspace: Workspace, store: MemoryStore | None, rules: IgnoreRules, full: bool
+    ) -> _Enumeration:
+        """
+        Varredura incremental: reaproveita fingerprints de diretórios do memory.db.
+        `full=True` ignora o cache e reconstrói tudo.
+        """
+        digest = rules.digest()
+
+        previous: dict[str, DirRecord] | None = None
+        if store is not None and not full:
+            try:
+                cache_state = store.get_state("walk_cache") or {}
+                if cache_state.get("rules") == digest:
+                    previous = {
+                        row[0]: DirRecord.from_row(row) for row in store.load_dir_fingerprints()
+                    }
+            except Exception:  # noqa: BLE001
+                previous = None
+
+        walk = walk_tree_incremental(workspace.root, previous, rules)
+
+        if store is not None:
+            try:
+                upserts = [walk.records[d].to_row(d) for d in walk.rescanned]
+                deletes = [d for d in (previous or {}) if d not in walk.records]
+                if upserts or deletes or previous is None:
+                    store.update_dir_fingerprints(upserts, deletes, replace_all=previous is None)
+                    store.set_state("walk_cache", {"rules": digest})
+            except Exception:  # noqa: BLE001
+                pass
+
+        return _Enumeration(
+            inventory=walk.inventory,
+            summary=(
+                f"Indexed {len(walk.inventory)} files "
+                f"({len(walk.rescanned)}/{len(walk.records)} directories rescanned)."
+            ),
+            root_changed=not previous or "" in walk.rescanned,
+        )
+
+    def _load_previous_model(self, workspace: Workspace) -> ProjectModel | None:
+        if not workspace.project_file.exists():
+            return None
+        try:
+            return load_project(workspace.root)
+        except Exception:  # noqa: BLE001
+            return None
+
+
+def scan_payload(project_model: ProjectModel) -> dict:
+    """
+    Payload gravado em memory.db (runs + project_state['last_scan']).
+    """
+    payload = {
+        "root_path": project_model.root_path,
+        "repo_type": project_model.repo_type,
+        "languages_detected": project_model.languages_detected,
+        "signals": project_model.signals,
+    }
+    if project_model.packages:
+        payload["packages"] = {
+            rel: pkg.languages_detected for rel, pkg in project_model.packages.items()
+        }
+    return payload
+
+
+def run_scan_plugins(project_model: ProjectModel, options: dict) -> list[Result]:
+    results: list[Result] = []
+    manager = PluginManager()
+    plugins = manager.load_all()
+
+    for plugin in plugins:
+        applicability = plugin.detect(project_model)
+        if not applicability.is_applicable:
+            continue
+
+        capabilities = {c.name for c in plugin.capabilities(project_model)}
+        if "scan" not in capabilities:
+            continue
+
+        results.append(
+            Result.info(
+                "scan",
+                f"Running scan for plugin: {plugin.id}",
+                ", ".join(applicability.reasons),
+            )
+        )
+
+        plugin_results = plugin.run(
+            ActionRequest(
+                capability="scan",
+                project=project_model,
+                options=options,
+            )
+        )
+        results.extend(plugin_results)
+    return results
+
+
+def scan_package(
+    root: str, rel: str, entries: list[FileEntry]
+) -> tuple[str, ProjectModel, list[Result]]:
+    """
+    Worker (processo separado): descobre e escaneia um sub-projeto.
+    """
+    package_root = Path(root) / rel
+    model = discover_project(package_root, FileInventory(entries))
+    results = [
+        Result.info(
+            "scan",
+            f"Package {rel}: {', '.join(model.languages_detected) or 'no languages detected'}",
+            str(package_root),
+        )
+    ]
+    results.extend(run_scan_plugins(model, {}))
+    # o inventário não volta pelo pipe: o agregado já tem o do root
+    return rel, replace(model, inventory=None), results
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import replace
+from typing import Callable
+
+from noxis.context.discovery import discover_project
+from noxis.context.loader import save_project
+from noxis.context.model import ProjectModel
+from noxis.context.walker import IgnoreRules, apply_changed_paths, walk_tree_incremental
+from noxis.context.watcher import create_watcher
+from noxis.core.results import Result
+from noxis.core.workspace import Workspace
+from noxis.services.scan_service import run_scan_plugins, scan_payload
+from noxis.storage.memory import MemoryStore
+
+UpdateCallback = Callable[[list[str], list[Result]], None]
+
+# mesmo com eventos contínuos, aplica as mudanças pelo menos a cada MAX_BATCH_SECONDS
+MAX_BATCH_SECONDS = 2.0
+
+
+class WatchService:
+    """
+    Mantém ProjectModel + inventário em memória, aplicando eventos do filesystem
+    incrementalmente. Cada lote (com debounce) reexecuta os plugins só para os
+    paths afetados e grava o resultado em memory.db.
+    """
+
+    def run(
+        self,
+        workspace: Workspace,
+        debounce_ms: int = 300,
+        force_polling: bool = False,
+        poll_interval: float = 1.0,
+        on_update: UpdateCallback | None = None,
+        stop: threading.Event | None = None,
+    ) -> None:
+        stop = stop or threading.Event()
+        root = workspace.root
+        workspace.state_dir.mkdir(parents=True, exist_ok=True)
+
+        store = MemoryStore(workspace.memory_db_file)
+        store.initialize()
+
+        rules = IgnoreRules.from_root(root)
+        walk = walk_tree_incremental(root, None, rules)
+        project_model = discover_project(root, walk.inventory)
+        results = run_scan_plugins(project_model, {})
+
+        watcher = create_watcher(
+            root,
+            rules,
+            directories=list(walk.records),
+            inventory=walk.inventory,
+            force_polling=force_polling,
+            poll_interval=poll_interval,
+        )
+        kind = type(watcher).__name__
+        self._persist(workspace, store, project_model, watcher_kind=kind)
+        if on_update:
+            results.insert(
+                0,
+                Result.info(
+                    "watch",
+                    f"Watching {len(walk.records)} directories ({kind}).",
+                    str(root),
+                ),
+            )
+            on_update([], results)
+
+        debounce = debounce_ms / 1000
+        try:
+            while not stop.is_set():
+                changed, overflow = watcher.poll(timeout=0.5)
+                if not changed and not overflow:
+                    continue
+
+                # debounce: junta eventos até ficar `debounce` sem novidades
+                batch_started = time.monotonic()
+                while time.monotonic() - batch_started < MAX_BATCH_SECONDS:
+                    more, more_overflow = watcher.poll(timeout=debounce)
+                    if not more and not more_overflow:
+                        break
+                    changed |= more
+                    overflow = overflow or more_overflow
+
+                if any(p in (".gitignore", ".noxisignore") for p in changed):
+                    rules = IgnoreRules.from_root(root)
+                    watcher.rules = rules
+                    overflow = True
+
+                project_model, results = self._apply(
+                    root, project_model, sorted(changed), rules, overflow
+                )
+                self._persist(workspace, store, project_model, watcher_kind=kind)
+                if on_update:
+                    on_update(sorted(changed), results)
+        finally:
+            watcher.close()
+            store.flush()
+
+    def _apply(
+        self,
+        root,
+        project_model: ProjectModel,
+        changed: list[str],
+        rules: IgnoreRules,
+        rescan_all: bool,
+    ) -> tuple[ProjectModel, list[Result]]:
+        if rescan_all:
+            inventory = walk_tree_incremental(root, None, rules).inventory
+            project_model = discover_project(root, inventory)
+            results = [Result.warn("watch", "Full rescan (queue overflow or ignore rules).")]
+            results.extend(run_scan_plugins(project_model, {}))
+            return project_model, results
+
+        inventory = apply_changed_paths(root, project_model.inventory, changed, rules)
+        if any("/" not in p for p in changed):
+            # arquivos da raiz definem sinais/linguagens: redescobre (barato, em memória)
+            project_model = discover_project(root, inventory)
+        else:
+            project_model = replace(project_model, inventory=inventory)
+
+        results = [
+            Result.info("watch", f"Applied {len(changed)} changed paths.", str(root))
+        ]
+        results.extend(run_scan_plugins(project_model, {"changed_paths": changed}))
+        return project_model, results
+
+    def _persist(
+        self,
+        workspace: Workspace,
+        store: MemoryStore,
+        project_model: ProjectModel,
+        watcher_kind: str,
+    ) -> None:
+        try:
+            save_project(workspace.root, project_model)
+            payload = scan_payload(project_model)
+            state = {
+                "last_scan": payload,
+                # editores consultam isso para saber se o estado está "quente"
+                "watch": {
+                    "pid": os.getpid(),
+                    "watcher": watcher_kind,
+                    "files": len(project_model.inventory or ()),
+                    "updated_at": time.time(),
+                },
+            }
+            # write-behind: o loop de eventos não espera o commit
+            store.record_run("scan", payload=payload, state=state, wait=False)
+        except Exception:  # noqa: BLE001
+            pass
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import zlib
+from typing import Any, Iterator, Mapping
+
+_ZLIB_LEVEL = 6
+
+
+def canonical_json(payload: Any) -> bytes:
+    # chaves ordenadas e sem espaços: payloads iguais viram os mesmos bytes
+    return json.dumps(
+        payload, ensure_ascii=False, sort_keys=True, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def payload_hash(raw: bytes) -> bytes:
+    return hashlib.sha256(raw).digest()
+
+
+def compress(raw: bytes) -> bytes:
+    return zlib.compress(raw, _ZLIB_LEVEL)
+
+
+def decode_payload(data: bytes | None, legacy_json: str | None = None) -> dict[str, Any]:
+    try:
+        if data is not None:
+            return json.loads(zlib.decompress(data))
+        return json.loads(legacy_json or "{}")
+    except (zlib.error, ValueError):
+        return {}
+
+
+class RunRecord(Mapping[str, Any]):
+    """
+    Run lido do memory.db. Compatível com o dict antigo
+    ({"created_at", "command", "payload"}), mas o payload só é
+    descomprimido e decodificado quando alguém o acessa.
+    """
+
+    __slots__ = (
+        "_data",
+        "_legacy",
+        "_payload",
+        "command",
+        "created_at",
+        "run_id",
+        "source",
+        "source_id",
+    )
+
+    _KEYS = ("created_at", "command", "payload")
+
+    def __init__(
+        self,
+        created_at: str,
+        command: str,
+        data: bytes | None,
+        legacy_json: str | None = None,
+        run_id: int | None = None,
+        source: str | None = None,
+        source_id: int | None = None,
+    ) -> None:
+        self.created_at = created_at
+        self.command = command
+        self.run_id = run_id
+        # runs importados: origem e id no banco de origem (None nos locais)
+        self.source = source
+        self.source_id = source_id
+        self._data = data
+        self._legacy = legacy_json
+        self._payload: dict[str, Any] | None = None
+
+    @property
+    def payload(self) -> dict[str, Any]:
+        if self._payload is None:
+            self._payload = decode_payload(self._data, self._legacy)
+            self._data = self._legacy = None
+        return self._payload
+
+    def payload_json(self) -> str:
+        """
+        JSON do payload sem decodificar (export copia os bytes direto).
+        """
+        if self._payload is not None:
+            return json.dumps(self._payload, ensure_ascii=False, sort_keys=True)
+        if self._data is not None:
+            try:
+                return zlib.decompress(self._data).decode("utf-8")
+            except zlib.error:
+                return "{}"
+        return self._legacy or "{}"
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "created_at":
+            return self.created_at
+        if key == "command":
+            return self.command
+        if key == "payload":
+            return self.payload
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def __repr__(self) -> str:
+        return f"RunRecord(created_at={self.created_at!r}, command={self.command!r})"
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from noxis.policies.loader import load_policies
+from noxis.storage.retention import _limit
+
+if TYPE_CHECKING:
+    from noxis.storage.memory import MemoryStore
+
+# Cache de respostas do modelo no memory.db (tabela ai_response_cache, migration 7).
+# Chave: sha256(model, endpoint, prompt_hash). O mesmo prompt em outro modelo ou
+# servidor é outra entrada.
+
+SQL_CACHE_GET = """
+    SELECT response, created_at FROM ai_response_cache WHERE key = ?
+"""
+SQL_CACHE_TOUCH = """
+    UPDATE ai_response_cache SET accessed_at = ?2, hits = hits + 1 WHERE key = ?1
+"""
+_SQL_CACHE_PUT = """
+    INSERT OR REPLACE INTO ai_response_cache
+        (key, model, endpoint, prompt_hash, response, size, created_at, accessed_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_SQL_CACHE_EXPIRE = """
+    DELETE FROM ai_response_cache WHERE created_at < ?
+"""
+# LRU: mantém as entradas usadas mais recentemente até max_entries e max_bytes
+_SQL_CACHE_EVICT = """
+    DELETE FROM ai_response_cache WHERE key IN (
+        SELECT key FROM (
+            SELECT key,
+                   ROW_NUMBER() OVER recent AS n,
+                   SUM(size) OVER (recent ROWS UNBOUNDED PRECEDING) AS total
+            FROM ai_response_cache
+            WINDOW recent AS (ORDER BY accessed_at DESC)
+        )
+        WHERE n > ?1 OR total > ?2
+    )
+"""
+_UNLIMITED = 2**63 - 1
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """
+    Cache de respostas da IA (seção `ai.cache` do policies.yml). None desativa o limite.
+    """
+
+    enabled: bool = True
+    ttl_seconds: int | None = 7 * 24 * 3600
+    max_entries: int | None = 500
+    max_bytes: int | None = 32 * 1024 * 1024
+
+    @staticmethod
+    def from_policies(policies: dict[str, Any]) -> "CachePolicy":
+        cache = (policies.get("ai") or {}).get("cache") or {}
+        defaults = CachePolicy()
+        return CachePolicy(
+            enabled=bool(cache.get("enabled", defaults.enabled)),
+            ttl_seconds=_limit(cache.get("ttl_seconds", defaults.ttl_seconds)),
+            max_entries=_limit(cache.get("max_entries", defaults.max_entries)),
+            max_bytes=_limit(cache.get("max_bytes", defaults.max_bytes)),
+        )
+
+    @staticmethod
+    def load(policies_file: Path) -> "CachePolicy":
+        return CachePolicy.from_policies(load_policies(policies_file))
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def cache_key(model: str, endpoint: str, prompt_digest: str) -> bytes:
+    return hashlib.sha256(f"{model}\0{endpoint}\0{prompt_digest}".encode()).digest()
+
+
+def store_response(
+    conn: sqlite3.Connection,
+    key: bytes,
+    model: str,
+    endpoint: str,
+    prompt_digest: str,
+    response: str,
+    policy: CachePolicy,
+) -> None:
+    # operação do writer: grava e já aplica TTL/LRU na mesma transação
+    now = time.time()
+    size = len(response.encode("utf-8"))
+    conn.execute(
+        _SQL_CACHE_PUT, (key, model, endpoint, prompt_digest, response, size, now, now)
+    )
+    if policy.ttl_seconds is not None:
+        conn.execute(_SQL_CACHE_EXPIRE, (now - policy.ttl_seconds,))
+    if policy.max_entries is not None or policy.max_bytes is not None:
+        conn.execute(
+            _SQL_CACHE_EVICT,
+            (
+                _UNLIMITED if policy.max_entries is None else policy.max_entries,
+                _UNLIMITED if policy.max_bytes is None else policy.max_bytes,
+            ),
+        )
+
+
+class ResponseCache:
+    """
+    Respostas do modelo por (model, endpoint, prompt hash), com TTL e despejo LRU.
+    """
+
+    def __init__(self, store: "MemoryStore", policy: CachePolicy | None = None) -> None:
+        self.store = store
+        self.policy = policy or CachePolicy()
+
+    @staticmethod
+    def open(db_path: Path, policies_file: Path) -> "ResponseCache | None":
+        # None quando desativado em ai.cache.enabled
+        from noxis.storage.memory import MemoryStore
+
+        policy = CachePolicy.load(policies_file)
+        if not policy.enabled:
+            return None
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        store = MemoryStore(db_path)
+        store.initialize()
+        return ResponseCache(store, policy)
+
+    def get(self, model: str, endpoint: str, prompt: str) -> str | None:
+        key = cache_key(model, endpoint, prompt_hash(prompt))
+        return self.store.get_cached_response(key, self.policy.ttl_seconds)
+
+    def put(self, model: str, endpoint: str, prompt: str, response: str) -> None:
+        digest = prompt_hash(prompt)
+        key = cache_key(model, endpoint, digest)
+        self.store.put_cached_response(key, model, endpoint, digest, response, self.policy)
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Iterable, TextIO
+
+from noxis.storage.memory import MemoryStore
+
+EXPORT_FORMATS = ("ndjson",)
+
+
+@dataclass(frozen=True)
+class TransferStats:
+    runs: int
+    explanations: int
+    skipped: int = 0
+    duplicates: int = 0
+
+
+def export_ndjson(
+    store: MemoryStore,
+    out: TextIO,
+    command: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    include_explanations: bool = True,
+    source: str | None = None,
+) -> TransferStats:
+    """
+    Uma linha JSON por run/explicação, em streaming: o payload comprimido é
+    copiado para a saída sem ser decodificado. Registros importados saem com a
+    origem e o id originais, então reagregar não duplica.
+    """
+    runs = 0
+    for run in store.iter_runs(command=command, since=since, until=until):
+        imported = run.source is not None
+        run_id = json.dumps(run.source_id if imported else run.run_id)
+        created_at = json.dumps(run.created_at)
+        cmd = json.dumps(run.command, ensure_ascii=False)
+        origin = json.dumps(run.source if imported else source, ensure_ascii=False)
+        out.write(
+            f'{{"type":"run","id":{run_id},"created_at":{created_at},"command":{cmd},'
+            f'"source":{origin},"payload":{run.payload_json()}}}\n'
+        )
+        runs += 1
+
+    explanations = 0
+    if include_explanations and command is None:
+        for item in store.iter_ai_explanations(since=since, until=until):
+            out.write(
+                json.dumps(
+                    {
+                        "type": "ai_explanation",
+                        "id": item.source_id if item.source is not None else item.id,
+                        "created_at": item.created_at,
+                        "source": item.source if item.source is not None else source,
+                        "prompt_hash": item.prompt_hash,
+                        "response": item.response,
+                    },
+                    ensure_ascii=False,
+                )
+                + "\n"
+            )
+            explanations += 1
+
+    return TransferStats(runs=runs, explanations=explanations)
+
+
+def import_ndjson(
+    store: MemoryStore, lines: Iterable[str], batch_size: int = 5000
+) -> TransferStats:
+    """
+    Lê o export em streaming e grava em lotes de `batch_size` (uma transação por lote).
+    Linhas inválidas ou de tipo desconhecido são contadas e ignoradas; registros já
+    importados da mesma origem (source, id) contam em `duplicates`.
+    """
+    runs: list[dict] = []
+    explanations: list[dict] = []
+    imported_runs = imported_explanations = skipped = offered = 0
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            skipped += 1
+            continue
+        kind = record.get("type") if isinstance(record, dict) else None
+        if kind == "run" and record.get("command"):
+            offered += 1
+            runs.append(record)
+            if len(runs) >= batch_size:
+                imported_runs += store.import_runs(runs, batch_size)
+                runs.clear()
+        elif kind == "ai_explanation" and record.get("prompt_hash"):
+            offered += 1
+            explanations.append(record)
+            if len(explanations) >= batch_size:
+                imported_explanations += store.import_ai_explanations(explanations, batch_size)
+                explanations.clear()
+        else:
+            skipped += 1
+
+    if runs:
+        imported_runs += store.import_runs(runs, batch_size)
+    if explanations:
+        imported_explanations += store.import_ai_explanations(explanations, batch_size)
+
+    return TransferStats(
+        runs=imported_runs,
+        explanations=imported_explanations,
+        skipped=skipped,
+        duplicates=offered - imported_runs - imported_explanations,
+    )
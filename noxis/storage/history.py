@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Iterable, Mapping
+
+from noxis.storage.blobs import payload_hash
+
+# Linhas normalizadas derivadas dos payloads dos runs (tabelas `findings` e
+# `scan_signals`): os diffs de histórico viram operações de conjunto em SQL.
+
+KIND_LANGUAGE = "language"
+KIND_REPO_TYPE = "repo_type"
+KIND_SIGNAL = "signal"
+
+_SQL_INSERT_FINDING = """
+    INSERT INTO findings (run_id, severity, message_hash, location) VALUES (?, ?, ?, ?)
+"""
+_SQL_INSERT_FINDING_MESSAGE = "INSERT OR IGNORE INTO finding_messages (hash, message) VALUES (?, ?)"
+_SQL_INSERT_SIGNAL = "INSERT INTO scan_signals (run_id, kind, grp, value) VALUES (?, ?, ?, ?)"
+
+
+@dataclass(frozen=True)
+class Finding:
+    severity: str
+    message: str
+    location: str = ""
+
+    def label(self) -> str:
+        return f"[{self.severity.upper()}] {self.message}"
+
+
+@dataclass(frozen=True)
+class Signal:
+    kind: str  # language | repo_type | signal
+    group: str  # grupo do sinal ("python", ...); vazio para language/repo_type
+    value: str
+
+
+@dataclass(frozen=True)
+class FindingChanges:
+    current_run_id: int
+    previous_run_id: int
+    added: list[Finding]
+    resolved: list[Finding]
+
+
+@dataclass(frozen=True)
+class SignalChanges:
+    current_run_id: int
+    previous_run_id: int
+    added: list[Signal]
+    removed: list[Signal]
+
+
+@dataclass(frozen=True)
+class FindingTrend:
+    finding: Finding
+    runs_present: int
+    total_runs: int
+    first_run_id: int
+    last_run_id: int
+
+    @property
+    def persistent(self) -> bool:
+        return self.runs_present == self.total_runs
+
+
+@dataclass(frozen=True)
+class RunCounts:
+    run_id: int
+    created_at: str
+    errors: int
+    warnings: int
+    infos: int
+
+
+def finding_rows(payload: Mapping[str, Any]) -> list[tuple[str, bytes, str, str]]:
+    """
+    (severity, message_hash, location, message) para cada resultado do payload do doctor.
+    """
+    rows: list[tuple[str, bytes, str, str]] = []
+    for r in payload.get("results") or []:
+        if not isinstance(r, dict):
+            continue
+        severity = str(r.get("severity") or "info")
+        message = str(r.get("message") or "")
+        location = str(r.get("location") or "")
+        rows.append((severity, message_hash(message), location, message))
+    return rows
+
+
+def signal_rows(payload: Mapping[str, Any]) -> list[tuple[str, str, str]]:
+    """
+    (kind, group, value) para linguagens, tipo de repo e sinais do payload do scan.
+    """
+    rows: list[tuple[str, str, str]] = []
+    for lang in payload.get("languages_detected") or []:
+        rows.append((KIND_LANGUAGE, "", str(lang)))
+    repo_type = payload.get("repo_type")
+    if repo_type:
+        rows.append((KIND_REPO_TYPE, "", str(repo_type)))
+    signals = payload.get("signals") or {}
+    if isinstance(signals, dict):
+        for group, items in signals.items():
+            for item in items or []:
+                rows.append((KIND_SIGNAL, str(group), str(item)))
+    return rows
+
+
+@lru_cache(maxsize=4096)
+def message_hash(message: str) -> bytes:
+    # as mesmas mensagens se repetem run após run
+    return payload_hash(message.encode("utf-8", "surrogateescape"))[:16]
+
+
+@dataclass
+class NormalizedRows:
+    """
+    Linhas de findings/sinais de uma sequência de payloads, indexadas pela
+    posição do payload: o run_id real só é somado na hora de gravar.
+    """
+
+    messages: dict[bytes, str] = field(default_factory=dict)
+    findings: list[tuple[int, str, bytes, str]] = field(default_factory=list)
+    signals: list[tuple[int, str, str, str]] = field(default_factory=list)
+
+
+def normalize(payloads: Iterable[Mapping[str, Any]]) -> NormalizedRows:
+    # roda fora da thread escritora: só o INSERT fica dentro da transação
+    rows = NormalizedRows()
+    for index, payload in enumerate(payloads):
+        for sev, h, loc, msg in finding_rows(payload):
+            rows.messages[h] = msg
+            rows.findings.append((index, sev, h, loc))
+        rows.signals.extend((index, *row) for row in signal_rows(payload))
+    return rows
+
+
+def insert_normalized_rows(
+    conn: sqlite3.Connection, rows: NormalizedRows, first_run_id: int
+) -> None:
+    """
+    Grava as linhas de `normalize()` para runs com ids consecutivos a partir
+    de `first_run_id` (dentro da transação do chamador).
+    """
+    if rows.findings:
+        conn.executemany(_SQL_INSERT_FINDING_MESSAGE, rows.messages.items())
+        conn.executemany(
+            _SQL_INSERT_FINDING,
+            ((first_run_id + i, sev, h, loc) for i, sev, h, loc in rows.findings),
+        )
+    if rows.signals:
+        conn.executemany(
+            _SQL_INSERT_SIGNAL,
+            ((first_run_id + i, kind, grp, value) for i, kind, grp, value in rows.signals),
+        )
+
+
+def insert_normalized(conn: sqlite3.Connection, run_id: int, payload: Mapping[str, Any]) -> None:
+    insert_normalized_rows(conn, normalize([payload]), run_id)
@@ -1,127 +1,979 @@
 from __future__ import annotations
 
+import atexit
+import os
 import sqlite3
 import json
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from functools import partial
+from itertools import islice
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator, Mapping, Self
+
+from noxis.storage.blobs import (
+    RunRecord,
+    canonical_json,
+    compress,
+    decode_payload,
+    payload_hash,
+)
+from noxis.storage.cache import SQL_CACHE_GET, SQL_CACHE_TOUCH, CachePolicy, store_response
+from noxis.storage.history import (
+    Finding,
+    FindingChanges,
+    FindingTrend,
+    NormalizedRows,
+    RunCounts,
+    Signal,
+    SignalChanges,
+    insert_normalized_rows,
+    normalize,
+)
+from noxis.storage.migrations import LATEST_VERSION, current_version, migrate
+from noxis.storage.retention import RetentionPolicy
+from noxis.storage.search import (
+    SQL_DELETE_ORPHAN_FINDING_FTS,
+    SearchHit,
+    has_search_index,
+    search,
+)
+from noxis.storage.writer import (
+    WritePolicy,
+    WriteBehindQueue,
+    WriteOp,
+    immediate_transaction,
+    with_retry,
+)
+
+# SQL em constantes: o cache de statements do sqlite3 é indexado pelo texto,
+# então cada escrita reaproveita o statement já preparado.
+_SQL_INSERT_RUN = "INSERT INTO runs (command, payload_hash) VALUES (?, ?)"
+_SQL_BLOB_EXISTS = "SELECT 1 FROM payload_blobs WHERE hash = ?"
+_SQL_INSERT_BLOB = "INSERT OR IGNORE INTO payload_blobs (hash, data, raw_size) VALUES (?, ?, ?)"
+_SQL_DELETE_ORPHAN_BLOBS = """
+    DELETE FROM payload_blobs
+    WHERE NOT EXISTS (SELECT 1 FROM runs WHERE runs.payload_hash = payload_blobs.hash)
+"""
+_SQL_INSERT_AI_EXPLANATION = """
+    INSERT INTO ai_explanations
+        (prompt_hash, response, scan_run_id, doctor_run_id, mode, model, server_context)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+# o contexto do servidor só serve para continuar a explicação mais recente
+_SQL_DROP_OLD_SERVER_CONTEXT = """
+    UPDATE ai_explanations SET server_context = NULL
+    WHERE server_context IS NOT NULL AND id < ?
+"""
+_SQL_LAST_EXPLANATION_ANCHOR = """
+    SELECT id, response, scan_run_id, doctor_run_id, mode, model, server_context
+    FROM ai_explanations
+    WHERE mode IS NOT NULL
+    ORDER BY id DESC
+    LIMIT 1
+"""
+_SQL_INSERT_AI_METRIC = """
+    INSERT INTO ai_metrics
+        (command, model, endpoint, streamed, ttft_ms, total_ms, tokens, tokens_per_sec,
+         mode, prompt_chars, prompt_tokens, prefill_ms)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+# médias móveis exponenciais: ?5 é o peso da chamada nova; latência só de sucessos
+_SQL_RECORD_MODEL_CALL = """
+    INSERT INTO ai_model_stats (model, endpoint, task, calls, latency_ms, success_rate)
+    VALUES (?1, ?2, ?3, 1, ?4, CASE WHEN ?4 IS NULL THEN 0.0 ELSE 1.0 END)
+    ON CONFLICT(model, endpoint, task) DO UPDATE SET
+        calls = calls + 1,
+        latency_ms = CASE
+            WHEN ?4 IS NULL THEN latency_ms
+            WHEN latency_ms IS NULL THEN ?4
+            ELSE latency_ms * (1 - ?5) + ?4 * ?5
+        END,
+        success_rate = success_rate * (1 - ?5) + (CASE WHEN ?4 IS NULL THEN 0 ELSE 1 END) * ?5,
+        updated_at = datetime('now')
+"""
+_SQL_MODEL_STATS = """
+    SELECT model, task, calls, latency_ms, success_rate
+    FROM ai_model_stats WHERE endpoint = ?
+"""
+_SQL_UPSERT_STATE = """
+    INSERT INTO project_state (key, value_json, updated_at)
+    VALUES (?, ?, datetime('now'))
+    ON CONFLICT(key) DO UPDATE SET
+        value_json = excluded.value_json,
+        updated_at = datetime('now')
+"""
+_SQL_GET_STATE = "SELECT value_json FROM project_state WHERE key = ?"
+_SQL_RECENT_RUNS = """
+    SELECT r.created_at, r.command, b.data, r.payload_json
+    FROM runs r
+    LEFT JOIN payload_blobs b ON b.hash = r.payload_hash
+    WHERE r.command = ? AND r.source IS NULL
+    ORDER BY r.id DESC
+    LIMIT ?
+"""
+# keyset por id: cada página é um seek no rowid, memória constante no export
+_SQL_ITER_RUNS = """
+    SELECT r.id, r.created_at, r.command, b.data, r.payload_json, r.source, r.source_id
+    FROM runs r
+    LEFT JOIN payload_blobs b ON b.hash = r.payload_hash
+    WHERE r.id > ?1
+      AND (?2 IS NULL OR r.command = ?2)
+      AND (?3 IS NULL OR r.created_at >= datetime(?3))
+      AND (?4 IS NULL OR r.created_at < datetime(?4))
+    ORDER BY r.id
+    LIMIT ?5
+"""
+_SQL_ITER_AI_EXPLANATIONS = """
+    SELECT id, created_at, prompt_hash, response, source, source_id
+    FROM ai_explanations
+    WHERE id > ?1
+      AND (?2 IS NULL OR created_at >= datetime(?2))
+      AND (?3 IS NULL OR created_at < datetime(?3))
+    ORDER BY id
+    LIMIT ?4
+"""
+_SQL_IMPORT_RUN = """
+    INSERT INTO runs (created_at, command, payload_hash, source, source_id)
+    VALUES (COALESCE(datetime(?), datetime('now')), ?, ?, ?, ?)
+"""
+_SQL_IMPORT_AI_EXPLANATION = """
+    INSERT INTO ai_explanations (created_at, prompt_hash, response, source, source_id)
+    VALUES (COALESCE(datetime(?), datetime('now')), ?, ?, ?, ?)
+"""
+# idx_runs_source / idx_ai_explanations_source
+_SQL_RUN_IMPORTED = "SELECT 1 FROM runs WHERE source = ? AND source_id = ?"
+_SQL_AI_EXPLANATION_IMPORTED = "SELECT 1 FROM ai_explanations WHERE source = ? AND source_id = ?"
+_SQL_AI_EXPLANATION_BY_HASH = """
+    SELECT response
+    FROM ai_explanations
+    WHERE prompt_hash = ?
+    ORDER BY id DESC
+    LIMIT 1
+"""
+# histórico do projeto: importados (source não nulo) ficam de fora
+_SQL_LAST_TWO_RUNS = """
+    SELECT id FROM runs WHERE command = ? AND source IS NULL ORDER BY id DESC LIMIT 2
+"""
+_SQL_RUN_EXISTS = "SELECT 1 FROM runs WHERE id = ? AND command = ?"
+# findings de ?1 que não estão em ?2 (idx_findings_run cobre os dois lados); a chave
+# é (severity, mensagem): o mesmo finding em outra linha não é novo nem resolvido
+_SQL_FINDINGS_EXCEPT = """
+    SELECT d.severity, m.message, (
+        SELECT MIN(f.location) FROM findings f
+        WHERE f.run_id = ?1 AND f.severity = d.severity AND f.message_hash = d.message_hash
+    )
+    FROM (
+        SELECT severity, message_hash FROM findings WHERE run_id = ?1
+        EXCEPT
+        SELECT severity, message_hash FROM findings WHERE run_id = ?2
+    ) d
+    JOIN finding_messages m ON m.hash = d.message_hash
+    ORDER BY d.severity, m.message
+"""
+_SQL_SIGNALS_EXCEPT = """
+    SELECT kind, grp, value FROM scan_signals WHERE run_id = ?1
+    EXCEPT
+    SELECT kind, grp, value FROM scan_signals WHERE run_id = ?2
+    ORDER BY 1, 2, 3
+"""
+_SQL_COUNT_RECENT_RUNS = """
+    SELECT COUNT(*) FROM (
+        SELECT id FROM runs WHERE command = ? AND source IS NULL ORDER BY id DESC LIMIT ?
+    )
+"""
+_SQL_FINDING_TRENDS = """
+    WITH recent AS (
+        SELECT id FROM runs WHERE command = ?1 AND source IS NULL ORDER BY id DESC LIMIT ?2
+    )
+    SELECT f.severity, m.message, f.location,
+           COUNT(DISTINCT f.run_id) AS present, MIN(f.run_id), MAX(f.run_id)
+    FROM recent r
+    JOIN findings f ON f.run_id = r.id
+    JOIN finding_messages m ON m.hash = f.message_hash
+    GROUP BY f.severity, f.message_hash, f.location
+    ORDER BY present DESC, MAX(f.run_id) DESC, f.severity, m.message
+    LIMIT ?3
+"""
+_SQL_RUN_COUNTS = """
+    WITH recent AS (
+        SELECT id, created_at FROM runs
+        WHERE command = ?1 AND source IS NULL
+        ORDER BY id DESC LIMIT ?2
+    )
+    SELECT r.id, r.created_at,
+           COALESCE(SUM(f.severity = 'error'), 0),
+           COALESCE(SUM(f.severity = 'warn'), 0),
+           COALESCE(SUM(f.severity = 'info'), 0)
+    FROM recent r
+    LEFT JOIN findings f ON f.run_id = r.id
+    GROUP BY r.id
+    ORDER BY r.id DESC
+"""
+_SQL_DELETE_ORPHAN_MESSAGES = """
+    DELETE FROM finding_messages
+    WHERE NOT EXISTS (SELECT 1 FROM findings WHERE findings.message_hash = finding_messages.hash)
+"""
+_SQL_RUN_COMMANDS = "SELECT DISTINCT command, source FROM runs"
+# id do N-ésimo run mais recente do comando (por origem): tudo abaixo dele sai
+_SQL_TRIM_RUNS_PER_COMMAND = """
+    DELETE FROM runs
+    WHERE command = ?1 AND source IS ?2 AND id <= (
+        SELECT id FROM runs
+        WHERE command = ?1 AND source IS ?2
+        ORDER BY id DESC LIMIT 1 OFFSET ?3
+    )
+"""
+# por data, não por id: importados trazem created_at antigo com id novo
+# (idx_runs_created_at / idx_ai_explanations_created_at)
+_SQL_TRIM_RUNS_BY_AGE = "DELETE FROM runs WHERE created_at < datetime('now', ?1)"
+_SQL_TRIM_EXPLANATIONS_BY_AGE = """
+    DELETE FROM ai_explanations WHERE created_at < datetime('now', ?1)
+"""
+# métricas nunca são importadas: ids crescem com created_at, varre só o prefixo antigo
+_SQL_TRIM_AI_METRICS_BY_AGE = """
+    DELETE FROM ai_metrics
+    WHERE id < COALESCE(
+        (SELECT id FROM ai_metrics WHERE created_at >= datetime('now', ?1) ORDER BY id LIMIT 1),
+        (SELECT MAX(id) + 1 FROM ai_metrics)
+    )
+"""
+_SQL_TRIM_EXPLANATIONS = """
+    DELETE FROM ai_explanations
+    WHERE id <= (SELECT id FROM ai_explanations ORDER BY id DESC LIMIT 1 OFFSET ?1)
+"""
+_MAINTENANCE_STATE_KEY = "storage_maintenance"
+_SQL_LOAD_FINGERPRINTS = """
+    SELECT path, mtime_ns, inode, files_json, subdirs_json
+    FROM dir_fingerprints
+"""
+_SQL_DELETE_FINGERPRINT = "DELETE FROM dir_fingerprints WHERE path = ?"
+_SQL_UPSERT_FINGERPRINT = """
+    INSERT OR REPLACE INTO dir_fingerprints
+        (path, mtime_ns, inode, files_json, subdirs_json)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+
+@dataclass(frozen=True)
+class CompactStats:
+    runs_deleted: int
+    explanations_deleted: int
+    blobs_deleted: int
+    bytes_before: int
+    bytes_after: int
+
+
+@dataclass(frozen=True)
+class AIExplanation:
+    id: int
+    created_at: str
+    prompt_hash: str
+    response: str
+    # origem e id original, para explicações importadas
+    source: str | None = None
+    source_id: int | None = None
+
+
+@dataclass(frozen=True)
+class ExplanationAnchor:
+    """
+    Última explicação com os runs de scan/doctor que ela cobriu; base do
+    ai-explain incremental. `server_context`: tokens do Ollama para continuar.
+    """
+
+    id: int
+    response: str
+    scan_run_id: int | None
+    doctor_run_id: int | None
+    mode: str
+    model: str | None
+    server_context: list[int] | None
+
+
+class _Connection:
+    """
+    Uma conexão por processo e por arquivo, compartilhada entre MemoryStores.
+    """
+
+    def __init__(self, db_path: Path, policy: WritePolicy) -> None:
+        self.pid = os.getpid()
+        self.lock = threading.RLock()
+        self.initialized = False
+        self.policy = policy
+        # id do último run na última manutenção (carregado do project_state)
+        self.maintained_at: int | None = None
+        self.conn = sqlite3.connect(
+            db_path,
+            timeout=policy.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=128,
+        )
+        # todas as escritas passam pela thread escritora (group commit)
+        self.writer = WriteBehindQueue(self.conn, self.lock, policy)
+
+    def close(self) -> None:
+        self.writer.close()
+        with self.lock:
+            self.conn.close()
+
+
+_CONNECTIONS: dict[str, _Connection] = {}
+_CONNECTIONS_LOCK = threading.Lock()
+
+
+def _get_connection(db_path: Path, policy: WritePolicy) -> _Connection:
+    key = str(db_path.resolve())
+    with _CONNECTIONS_LOCK:
+        shared = _CONNECTIONS.get(key)
+        if shared is None or shared.pid != os.getpid():
+            # após fork a conexão herdada não pode ser usada
+            shared = _CONNECTIONS[key] = _Connection(db_path, policy)
+        return shared
+
+
+def close_all() -> None:
+    # atexit: drena as escritas pendentes antes de fechar
+    with _CONNECTIONS_LOCK:
+        for shared in _CONNECTIONS.values():
+            if shared.pid == os.getpid():
+                shared.close()
+        _CONNECTIONS.clear()
+
+
+atexit.register(close_all)
+
+
+def _import_run_batch(
+    conn: sqlite3.Connection,
+    blobs: dict[bytes, tuple[bytes, bytes, int]],
+    rows: list[tuple[str | None, str, bytes, str, int | None]],
+    normalized: NormalizedRows,
+) -> int:
+    conn.executemany(_SQL_INSERT_BLOB, blobs.values())
+    conn.executemany(_SQL_IMPORT_RUN, rows)
+    # dentro da transação IMMEDIATE os ids do AUTOINCREMENT são contíguos
+    last_id = conn.execute("SELECT MAX(id) FROM runs").fetchone()[0]
+    insert_normalized_rows(conn, normalized, last_id - len(rows) + 1)
+    return len(rows)
+
 
 class MemoryStore:
-    def __init__(self, db_path: Path) -> None:
+    def __init__(
+        self,
+        db_path: Path,
+        retention: RetentionPolicy | None = None,
+        write_policy: WritePolicy | None = None,
+    ) -> None:
         self.db_path = db_path
+        self._retention = retention
+        self._write_policy = write_policy
+        self._shared: _Connection | None = None
+
+    def __enter__(self) -> Self:
+        self.initialize()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def _conn(self) -> _Connection:
+        if self._shared is None or self._shared.pid != os.getpid():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._shared = _get_connection(self.db_path, self.write_policy)
+        return self._shared
+
+    @property
+    def retention(self) -> RetentionPolicy:
+        if self._retention is None:
+            self._retention = RetentionPolicy.load(self._policies_file)
+        return self._retention
+
+    @property
+    def write_policy(self) -> WritePolicy:
+        if self._write_policy is None:
+            self._write_policy = WritePolicy.load(self._policies_file)
+        return self._write_policy
+
+    @property
+    def _policies_file(self) -> Path:
+        # memory.db e policies.yml vivem ambos em .noxis/
+        return self.db_path.parent / "policies.yml"
+
+    def close(self) -> None:
+        """
+        Fecha a conexão compartilhada deste arquivo (no processo atual).
+        """
+        if self._shared is None:
+            return
+        key = str(self.db_path.resolve())
+        with _CONNECTIONS_LOCK:
+            shared = _CONNECTIONS.get(key)
+            if shared is self._shared:
+                del _CONNECTIONS[key]
+        self._shared.close()
+        self._shared = None
+
+    def flush(self) -> None:
+        """
+        Espera as escritas enfileiradas com `wait=False` chegarem ao disco.
+        """
+        if self._shared is not None:
+            self._shared.writer.flush()
 
     def initialize(self) -> None:
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        shared = self._conn
+        if shared.initialized:
+            return
 
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("PRAGMA journal_mode=WAL;")
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS runs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    created_at TEXT NOT NULL DEFAULT (datetime('now')),
-                    command TEXT NOT NULL,
-                    payload_json TEXT
-                );
-                """
-            )
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS ai_explanations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                created_at TEXT NOT NULL DEFAULT (datetime('now')),
-                prompt_hash TEXT NOT NULL,
-                response TEXT NOT NULL
-                );
-                """
-            )
+        with shared.lock:
+            conn = shared.conn
+            if current_version(conn) < LATEST_VERSION:
+                # journal_mode=WAL é persistente no arquivo: só precisa rodar uma vez
+                with_retry(lambda: conn.execute("PRAGMA journal_mode=WAL;"), shared.policy)
+                with_retry(lambda: migrate(conn), shared.policy)
+            shared.initialized = True
 
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS project_state(
-                    key TEXT PRIMARY KEY,
-                    value_json TEXT NOT NULL,
-                    updated_at TEXT NOT NULL DEFAULT (datetime('now'))
-                );
-                """
-            )
-            conn.commit()
+    def record_run(
+        self,
+        command: str,
+        payload: dict | None = None,
+        state: dict[str, dict] | None = None,
+        wait: bool = True,
+    ) -> int | None:
+        """
+        Grava o run referenciando o payload por hash: payloads idênticos
+        (o caso normal do doctor em CI) são armazenados uma única vez.
+        `state` ({key: value}) é gravado em project_state na mesma transação.
+        Com `wait=False` a escrita fica na fila (write-behind) e retorna None.
+        """
+        body = payload or {}
+        raw = canonical_json(body)
+        digest = payload_hash(raw)
+        states = [
+            (key, json.dumps(value, ensure_ascii=False)) for key, value in (state or {}).items()
+        ]
+        normalized = normalize([body])
 
-    def record_run(self, command:str, payload: dict | None = None) -> None:
-        payload_json = json.dumps(payload or {}, ensure_ascii=False)
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
-                "INSERT INTO runs (command, payload_json) VALUES (?, ?)",
-                (command, payload_json),
-            )
+        def op(conn: sqlite3.Connection) -> int:
+            if conn.execute(_SQL_BLOB_EXISTS, (digest,)).fetchone() is None:
+                conn.execute(_SQL_INSERT_BLOB, (digest, compress(raw), len(raw)))
+            run_id = conn.execute(_SQL_INSERT_RUN, (command, digest)).lastrowid
+            insert_normalized_rows(conn, normalized, run_id)
+            if states:
+                conn.executemany(_SQL_UPSERT_STATE, states)
+            return run_id
 
-            conn.commit()
+        future = self._conn.writer.submit(op)
+        future.add_done_callback(self._after_run)
+        return future.result() if wait else None
 
-    def record_ai_explanation(self, prompt_hash: str, response: str) -> None:
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
-                """
-                INSERT INTO ai_explanations (prompt_hash, response)
-                VALUES (?, ?)
-                """,
-                (prompt_hash, response),
-            )
-            conn.commit()
+    def record_ai_explanation(
+        self,
+        prompt_hash: str,
+        response: str,
+        scan_run_id: int | None = None,
+        doctor_run_id: int | None = None,
+        mode: str | None = None,
+        model: str | None = None,
+        server_context: list[int] | None = None,
+    ) -> None:
+        """
+        Com `mode` ("full" | "incremental") a explicação vira a base do próximo
+        ai-explain incremental; sem ele (fallback, import) fica só no histórico.
+        """
+        context = None
+        if server_context:
+            context = compress(canonical_json({"tokens": list(server_context)}))
+        row = (prompt_hash, response, scan_run_id, doctor_run_id, mode, model, context)
 
-    def set_state(self, key:str, value: dict) -> None:
-        import json
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
-                """
-                INSERT INTO project_state (key, value_json, updated_at)
-                VALUES (?, ?, datetime('now'))
-                ON CONFLICT(key) DO UPDATE SET
-                    value_json = excluded.value_json,
-                    updated_at = datetime('now');
-                """,
-                (key, json.dumps(value, ensure_ascii=False)),
-            )
-            conn.commit()
+        def op(conn: sqlite3.Connection) -> None:
+            new_id = conn.execute(_SQL_INSERT_AI_EXPLANATION, row).lastrowid
+            conn.execute(_SQL_DROP_OLD_SERVER_CONTEXT, (new_id,))
+
+        self._write(op)
+
+    def last_ai_explanation(self) -> ExplanationAnchor | None:
+        shared = self._conn
+        with shared.lock:
+            row = shared.conn.execute(_SQL_LAST_EXPLANATION_ANCHOR).fetchone()
+        if row is None:
+            return None
+        *fields, context = row
+        tokens = decode_payload(context).get("tokens") if context is not None else None
+        return ExplanationAnchor(*fields, server_context=tokens or None)
+
+    def record_ai_metrics(
+        self,
+        command: str,
+        model: str,
+        endpoint: str,
+        streamed: bool,
+        ttft_ms: float | None,
+        total_ms: float,
+        tokens: int,
+        tokens_per_sec: float | None,
+        mode: str | None = None,
+        prompt_chars: int | None = None,
+        prompt_tokens: int | None = None,
+        prefill_ms: float | None = None,
+    ) -> None:
+        # não bloqueia: a resposta já está na tela
+        row = (
+            command,
+            model,
+            endpoint,
+            int(streamed),
+            ttft_ms,
+            total_ms,
+            tokens,
+            tokens_per_sec,
+            mode,
+            prompt_chars,
+            prompt_tokens,
+            prefill_ms,
+        )
+        self._write(lambda conn: conn.execute(_SQL_INSERT_AI_METRIC, row), wait=False)
+
+    def record_model_call(
+        self, model: str, endpoint: str, task: str, latency_ms: float | None, weight: float
+    ) -> None:
+        """
+        Atualiza latência e taxa de sucesso do modelo na tarefa (latency_ms None: falhou).
+        """
+        row = (model, endpoint, task, latency_ms, weight)
+        self._write(lambda conn: conn.execute(_SQL_RECORD_MODEL_CALL, row), wait=False)
+
+    def get_model_stats(self, endpoint: str) -> list[tuple]:
+        # (model, task, calls, latency_ms, success_rate)
+        shared = self._conn
+        with shared.lock:
+            return shared.conn.execute(_SQL_MODEL_STATS, (endpoint,)).fetchall()
+
+    def set_state(self, key:str, value: dict, wait: bool = True) -> None:
+        value_json = json.dumps(value, ensure_ascii=False)
+        self._write(lambda conn: conn.execute(_SQL_UPSERT_STATE, (key, value_json)), wait)
+
+    def _write(self, op: WriteOp, wait: bool = True) -> None:
+        future = self._conn.writer.submit(op)
+        if wait:
+            future.result()
 
     def get_state(self, key: str) -> dict | None:
-        import json
-        with sqlite3.connect(self.db_path) as conn:
-            row = conn.execute(
-                "SELECT value_json FROM project_state WHERE key = ?",
-                (key,),
-            ).fetchone()
+        shared = self._conn
+        with shared.lock:
+            row = shared.conn.execute(_SQL_GET_STATE, (key,)).fetchone()
 
         if not row:
             return None
 
         return json.loads(row[0])
 
-    def get_recent_runs(self, command: str, limit: int = 5) -> list[dict[str, Any]]:
+    def get_recent_runs(self, command: str, limit: int = 5) -> list[RunRecord]:
         """
         Retorna os últimos runs de um comando, mais recente primeiro.
+        O payload de cada run só é descomprimido quando acessado.
         """
-        with sqlite3.connect(self.db_path) as conn:
-            rows = conn.execute(
-                """
-                SELECT created_at, command, payload_json
-                FROM runs
-                WHERE command = ?
-                ORDER BY id DESC
-                LIMIT ?
-                """,
-                (command, limit),
-            ).fetchall()
-        out: list[dict[str, Any]] = []
-        for created_at, cmd, payload_json in rows:
-            try:
-                payload = json.loads(payload_json or "{}")
-            except Exception:
-                payload = {}
-            out.append(
-                {
-                    "created_at": created_at,
-                    "command": cmd,
-                    "payload": payload
-                }
+        shared = self._conn
+        with shared.lock:
+            rows = shared.conn.execute(_SQL_RECENT_RUNS, (command, limit)).fetchall()
+        return [RunRecord(created_at, cmd, data, legacy) for created_at, cmd, data, legacy in rows]
+
+    def last_run_id(self, command: str) -> int | None:
+        shared = self._conn
+        with shared.lock:
+            ids = [row[0] for row in shared.conn.execute(_SQL_LAST_TWO_RUNS, (command,))]
+        return ids[0] if ids else None
+
+    def _compared_runs(
+        self, conn: sqlite3.Connection, command: str, since_run_id: int | None
+    ) -> tuple[int, int] | None:
+        ids = [row[0] for row in conn.execute(_SQL_LAST_TWO_RUNS, (command,))]
+        if since_run_id is not None:
+            # run de base apagado pela retenção: não há com o que comparar
+            if not ids or conn.execute(_SQL_RUN_EXISTS, (since_run_id, command)).fetchone() is None:
+                return None
+            return ids[0], since_run_id
+        if len(ids) < 2:
+            return None
+        return ids[0], ids[1]
+
+    def finding_changes(
+        self, command: str = "doctor", since_run_id: int | None = None
+    ) -> FindingChanges | None:
+        """
+        Findings novos e resolvidos do último run em relação ao anterior, ou ao run
+        `since_run_id` (None se não há com o que comparar).
+        """
+        shared = self._conn
+        with shared.lock:
+            conn = shared.conn
+            pair = self._compared_runs(conn, command, since_run_id)
+            if pair is None:
+                return None
+            current, previous = pair
+            added = conn.execute(_SQL_FINDINGS_EXCEPT, (current, previous)).fetchall()
+            resolved = conn.execute(_SQL_FINDINGS_EXCEPT, (previous, current)).fetchall()
+        return FindingChanges(
+            current_run_id=current,
+            previous_run_id=previous,
+            added=[Finding(*row) for row in added],
+            resolved=[Finding(*row) for row in resolved],
+        )
+
+    def signal_changes(
+        self, command: str = "scan", since_run_id: int | None = None
+    ) -> SignalChanges | None:
+        """
+        Linguagens, tipo de repo e sinais que entraram/saíram entre os dois últimos scans
+        (ou entre o run `since_run_id` e o último).
+        """
+        shared = self._conn
+        with shared.lock:
+            conn = shared.conn
+            pair = self._compared_runs(conn, command, since_run_id)
+            if pair is None:
+                return None
+            current, previous = pair
+            added = conn.execute(_SQL_SIGNALS_EXCEPT, (current, previous)).fetchall()
+            removed = conn.execute(_SQL_SIGNALS_EXCEPT, (previous, current)).fetchall()
+        return SignalChanges(
+            current_run_id=current,
+            previous_run_id=previous,
+            added=[Signal(*row) for row in added],
+            removed=[Signal(*row) for row in removed],
+        )
+
+    def finding_trends(
+        self, runs: int = 20, command: str = "doctor", limit: int = 50
+    ) -> list[FindingTrend]:
+        """
+        Em quantos dos últimos `runs` cada finding apareceu, mais recorrentes primeiro.
+        """
+        shared = self._conn
+        with shared.lock:
+            conn = shared.conn
+            total = conn.execute(_SQL_COUNT_RECENT_RUNS, (command, runs)).fetchone()[0]
+            rows = conn.execute(_SQL_FINDING_TRENDS, (command, runs, limit)).fetchall()
+        return [
+            FindingTrend(
+                finding=Finding(severity, message, location),
+                runs_present=present,
+                total_runs=total,
+                first_run_id=first,
+                last_run_id=last,
             )
+            for severity, message, location, present, first, last in rows
+        ]
+
+    def run_counts(self, runs: int = 20, command: str = "doctor") -> list[RunCounts]:
+        """
+        Contagem de findings por severidade nos últimos `runs`, mais recente primeiro.
+        """
+        shared = self._conn
+        with shared.lock:
+            rows = shared.conn.execute(_SQL_RUN_COUNTS, (command, runs)).fetchall()
+        return [RunCounts(*row) for row in rows]
+
+    def iter_runs(
+        self,
+        command: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        after_id: int = 0,
+        batch_size: int = 1000,
+    ) -> Iterator[RunRecord]:
+        """
+        Percorre os runs em ordem de id, página a página (memória constante).
+        `since`/`until` são datas/horas ISO em UTC; `until` é exclusivo.
+        O lock só é mantido durante a leitura de cada página.
+        """
+        shared = self._conn
+        last_id = after_id
+        while True:
+            with shared.lock:
+                rows = shared.conn.execute(
+                    _SQL_ITER_RUNS, (last_id, command, since, until, batch_size)
+                ).fetchall()
+            for run_id, created_at, cmd, data, legacy, source, source_id in rows:
+                yield RunRecord(
+                    created_at,
+                    cmd,
+                    data,
+                    legacy,
+                    run_id=run_id,
+                    source=source,
+                    source_id=source_id,
+                )
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+
+    def iter_ai_explanations(
+        self,
+        since: str | None = None,
+        until: str | None = None,
+        after_id: int = 0,
+        batch_size: int = 1000,
+    ) -> Iterator[AIExplanation]:
+        shared = self._conn
+        last_id = after_id
+        while True:
+            with shared.lock:
+                rows = shared.conn.execute(
+                    _SQL_ITER_AI_EXPLANATIONS, (last_id, since, until, batch_size)
+                ).fetchall()
+            for row in rows:
+                yield AIExplanation(*row)
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+
+    def _new_imports(
+        self, batch: list[Mapping[str, Any]], sql_exists: str
+    ) -> list[tuple[Mapping[str, Any], str, int | None]]:
+        """
+        (registro, source, id de origem) dos registros ainda não importados. Sem
+        `source` no registro a origem é "" (continua marcado como importado).
+        """
+        fresh: list[tuple[Mapping[str, Any], str, int | None]] = []
+        seen: set[tuple[str, int]] = set()
+        shared = self._conn
+        with shared.lock:
+            for record in batch:
+                source = str(record.get("source") or "")
+                source_id = record.get("id")
+                if not isinstance(source_id, int) or isinstance(source_id, bool):
+                    fresh.append((record, source, None))  # sem id: não há como deduplicar
+                    continue
+                key = (source, source_id)
+                if key in seen or shared.conn.execute(sql_exists, key).fetchone():
+                    continue
+                seen.add(key)
+                fresh.append((record, source, source_id))
+        return fresh
+
+    def import_runs(self, records: Iterable[Mapping[str, Any]], batch_size: int = 5000) -> int:
+        """
+        Importa runs ({id, created_at, command, source, payload}) em transações de
+        `batch_size` linhas com executemany. Os ids são reatribuídos no banco de destino;
+        origem e id original ficam em source/source_id, e um run já importado da mesma
+        origem é ignorado. Importados não entram no histórico do projeto (último run,
+        diffs, tendências), só no export e na busca. Retorna quantos entraram.
+        """
+        total = 0
+        it = iter(records)
+        while batch := list(islice(it, batch_size)):
+            fresh = self._new_imports(batch, _SQL_RUN_IMPORTED)
+            if not fresh:
+                continue
+            blobs: dict[bytes, tuple[bytes, bytes, int]] = {}
+            rows: list[tuple[str | None, str, bytes, str, int | None]] = []
+            for record, source, source_id in fresh:
+                payload = record.get("payload") or {}
+                raw = canonical_json(payload)
+                digest = payload_hash(raw)
+                if digest not in blobs:
+                    blobs[digest] = (digest, compress(raw), len(raw))
+                rows.append(
+                    (
+                        record.get("created_at"),
+                        str(record.get("command") or ""),
+                        digest,
+                        source,
+                        source_id,
+                    )
+                )
+            normalized = normalize(record.get("payload") or {} for record, _, _ in fresh)
+
+            op = partial(_import_run_batch, blobs=blobs, rows=rows, normalized=normalized)
+            total += self._conn.writer.submit(op).result()
+        return total
+
+    def import_ai_explanations(
+        self, records: Iterable[Mapping[str, Any]], batch_size: int = 5000
+    ) -> int:
+        total = 0
+        it = iter(records)
+        while batch := list(islice(it, batch_size)):
+            rows = [
+                (
+                    r.get("created_at"),
+                    str(r.get("prompt_hash") or ""),
+                    str(r.get("response") or ""),
+                    source,
+                    source_id,
+                )
+                for r, source, source_id in self._new_imports(batch, _SQL_AI_EXPLANATION_IMPORTED)
+            ]
+            if not rows:
+                continue
+            self._write(lambda conn, rows=rows: conn.executemany(_SQL_IMPORT_AI_EXPLANATION, rows))
+            total += len(rows)
+        return total
+
+    def search(
+        self, text: str, kind: str = "all", limit: int = 10, raw: bool = False
+    ) -> list[SearchHit]:
+        """
+        Busca textual (FTS5, ranking bm25) nas explicações de IA e mensagens de findings.
+        `kind`: all | ai_explanation | finding. `raw=True` usa a sintaxe FTS5 direto.
+        """
+        shared = self._conn
+        with shared.lock:
+            return search(shared.conn, text, kind=kind, limit=limit, raw=raw)
+
+    def get_cached_response(self, key: bytes, ttl_seconds: int | None) -> str | None:
+        """
+        Resposta em cache do modelo (chave de `cache.cache_key`), ou None se ausente/expirada.
+        """
+        shared = self._conn
+        now = time.time()
+        with shared.lock:
+            row = shared.conn.execute(SQL_CACHE_GET, (key,)).fetchone()
+        if row is None:
+            return None
+        response, created_at = row
+        if ttl_seconds is not None and now - created_at > ttl_seconds:
+            return None
+        # LRU: marca o acesso sem esperar o commit
+        self._write(lambda conn: conn.execute(SQL_CACHE_TOUCH, (key, now)), wait=False)
+        return response
+
+    def put_cached_response(
+        self,
+        key: bytes,
+        model: str,
+        endpoint: str,
+        prompt_hash: str,
+        response: str,
+        policy: CachePolicy,
+    ) -> None:
+        self._write(
+            lambda conn: store_response(
+                conn, key, model, endpoint, prompt_hash, response, policy
+            )
+        )
+
+    def get_ai_explanation(self, prompt_hash: str) -> str | None:
+        """
+        Resposta mais recente gravada para o prompt (None se nunca explicado).
+        """
+        shared = self._conn
+        with shared.lock:
+            row = shared.conn.execute(_SQL_AI_EXPLANATION_BY_HASH, (prompt_hash,)).fetchone()
+        return row[0] if row else None
+
+    def compact(self, full: bool = False) -> CompactStats:
+        """
+        Aplica a retenção, devolve as páginas livres ao sistema (incremental_vacuum)
+        e trunca o WAL. `full=True` reescreve o arquivo inteiro com VACUUM.
+        """
+        return self._conn.writer.submit(
+            lambda conn: self._compact(conn, full), transactional=False
+        ).result()
+
+    def _compact(self, conn: sqlite3.Connection, full: bool) -> CompactStats:
+        # roda na thread escritora, fora do group commit
+        policy = self.retention
+        before = self._disk_usage()
+
+        with immediate_transaction(conn):
+            runs_deleted = 0
+            if policy.max_runs_per_command is not None:
+                groups = conn.execute(_SQL_RUN_COMMANDS).fetchall()
+                for command, source in groups:
+                    runs_deleted += conn.execute(
+                        _SQL_TRIM_RUNS_PER_COMMAND,
+                        (command, source, policy.max_runs_per_command),
+                    ).rowcount
+            explanations_deleted = 0
+            if policy.max_age_days is not None:
+                age = f"-{policy.max_age_days} days"
+                runs_deleted += conn.execute(_SQL_TRIM_RUNS_BY_AGE, (age,)).rowcount
+                explanations_deleted += conn.execute(
+                    _SQL_TRIM_EXPLANATIONS_BY_AGE, (age,)
+                ).rowcount
+                conn.execute(_SQL_TRIM_AI_METRICS_BY_AGE, (age,))
+            if policy.max_ai_explanations is not None:
+                explanations_deleted += conn.execute(
+                    _SQL_TRIM_EXPLANATIONS, (policy.max_ai_explanations,)
+                ).rowcount
+            blobs_deleted = 0
+            if runs_deleted:
+                # findings/sinais dos runs removidos já saíram pelo trigger
+                blobs_deleted = conn.execute(_SQL_DELETE_ORPHAN_BLOBS).rowcount
+                if conn.execute(_SQL_DELETE_ORPHAN_MESSAGES).rowcount and has_search_index(conn):
+                    conn.execute(SQL_DELETE_ORPHAN_FINDING_FTS)
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM runs").fetchone()[0]
+            conn.execute(
+                _SQL_UPSERT_STATE, (_MAINTENANCE_STATE_KEY, json.dumps({"last_run_id": last_id}))
+            )
+
+        if full:
+            conn.execute("VACUUM")
+        else:
+            conn.execute("PRAGMA incremental_vacuum").fetchall()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        conn.execute("PRAGMA optimize")
+        self._conn.maintained_at = last_id
+
+        return CompactStats(
+            runs_deleted=runs_deleted,
+            explanations_deleted=explanations_deleted,
+            blobs_deleted=blobs_deleted,
+            bytes_before=before,
+            bytes_after=self._disk_usage(),
+        )
+
+    def _after_run(self, future: Future) -> None:
+        # callback na thread escritora: só enfileira, nunca espera a própria fila
+        if future.cancelled() or future.exception() is not None:
+            return
+        run_id = future.result()
+        every = self.retention.vacuum_every_writes
+        if every <= 0:
+            return
+        shared = self._conn
+        if shared.maintained_at is None:
+            state = self.get_state(_MAINTENANCE_STATE_KEY) or {}
+            shared.maintained_at = int(state.get("last_run_id", 0))
+        if run_id - shared.maintained_at < every:
+            return
+        # manutenção é oportunista: se falhar (outro processo segurando o banco),
+        # tenta de novo só no próximo limiar
+        shared.maintained_at = run_id
+        shared.writer.submit(lambda conn: self._compact(conn, False), transactional=False)
+
+    def _disk_usage(self) -> int:
+        total = 0
+        for suffix in ("", "-wal"):
+            try:
+                total += os.stat(f"{self.db_path}{suffix}").st_size
+            except OSError:
+                pass
+        return total
+
+    def load_dir_fingerprints(self) -> list[tuple]:
+        """
+        Retorna (path, mtime_ns, inode, files_json, subdirs_json) por diretório.
+        """
+        shared = self._conn
+        with shared.lock:
+            return shared.conn.execute(_SQL_LOAD_FINGERPRINTS).fetchall()
+
+    def update_dir_fingerprints(
+        self, upserts: list[tuple], deletes: list[str], replace_all: bool = False
+    ) -> None:
+        def op(conn: sqlite3.Connection) -> None:
+            if replace_all:
+                conn.execute("DELETE FROM dir_fingerprints")
+            if deletes:
+                conn.executemany(_SQL_DELETE_FINGERPRINT, [(d,) for d in deletes])
+            if upserts:
+                conn.executemany(_SQL_UPSERT_FINGERPRINT, upserts)
 
-        return out
+        self._write(op)
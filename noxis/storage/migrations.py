@@ -0,0 +1,376 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from dataclasses import dataclass
+from typing import Callable
+
+from noxis.storage.blobs import canonical_json, compress, decode_payload, payload_hash
+from noxis.storage.history import insert_normalized
+from noxis.storage.search import create_search_index
+from noxis.storage.writer import immediate_transaction
+
+
+@dataclass(frozen=True)
+class Migration:
+    """
+    Passo de schema versionado. Migrations são somente para frente:
+    nunca edite uma já publicada, adicione uma nova versão.
+    """
+
+    version: int
+    description: str
+    statements: tuple[str, ...] = ()
+    apply: Callable[[sqlite3.Connection], None] | None = None
+    # PRAGMAs como auto_vacuum/VACUUM não podem rodar dentro de transação
+    transactional: bool = True
+
+
+_SQL_RECORD_VERSION = "INSERT INTO schema_version (version) VALUES (?)"
+
+
+def _move_payloads_to_blobs(conn: sqlite3.Connection) -> None:
+    seen: set[bytes] = set()
+    last_id = 0
+    while True:
+        # lotes por id: não materializa um memory.db grande inteiro na memória
+        rows = conn.execute(
+            """
+            SELECT id, payload_json FROM runs
+            WHERE id > ? AND payload_json IS NOT NULL
+            ORDER BY id LIMIT 1000
+            """,
+            (last_id,),
+        ).fetchall()
+        if not rows:
+            return
+        for run_id, payload_json in rows:
+            try:
+                raw = canonical_json(json.loads(payload_json))
+            except ValueError:
+                raw = canonical_json({})
+            digest = payload_hash(raw)
+            if digest not in seen:
+                seen.add(digest)
+                conn.execute(
+                    "INSERT OR IGNORE INTO payload_blobs (hash, data, raw_size) VALUES (?, ?, ?)",
+                    (digest, compress(raw), len(raw)),
+                )
+            conn.execute(
+                "UPDATE runs SET payload_hash = ?, payload_json = NULL WHERE id = ?",
+                (digest, run_id),
+            )
+        last_id = rows[-1][0]
+
+
+def _normalize_existing_runs(conn: sqlite3.Connection) -> None:
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            """
+            SELECT r.id, b.data, r.payload_json
+            FROM runs r LEFT JOIN payload_blobs b ON b.hash = r.payload_hash
+            WHERE r.id > ?
+            ORDER BY r.id LIMIT 1000
+            """,
+            (last_id,),
+        ).fetchall()
+        if not rows:
+            return
+        for run_id, data, legacy in rows:
+            insert_normalized(conn, run_id, decode_payload(data, legacy))
+        last_id = rows[-1][0]
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(
+        version=1,
+        description="base schema",
+        statements=(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at TEXT NOT NULL DEFAULT (datetime('now')),
+                command TEXT NOT NULL,
+                payload_json TEXT
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS ai_explanations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at TEXT NOT NULL DEFAULT (datetime('now')),
+                prompt_hash TEXT NOT NULL,
+                response TEXT NOT NULL
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS project_state(
+                key TEXT PRIMARY KEY,
+                value_json TEXT NOT NULL,
+                updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS dir_fingerprints(
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                files_json TEXT NOT NULL,
+                subdirs_json TEXT NOT NULL
+            )
+            """,
+        ),
+    ),
+    Migration(
+        version=2,
+        description="history indexes",
+        statements=(
+            # get_recent_runs: WHERE command = ? ORDER BY id DESC sem sort nem scan
+            "CREATE INDEX IF NOT EXISTS idx_runs_command_id ON runs(command, id DESC)",
+            """
+            CREATE INDEX IF NOT EXISTS idx_ai_explanations_prompt_hash
+            ON ai_explanations(prompt_hash, id DESC)
+            """,
+        ),
+    ),
+    Migration(
+        version=3,
+        description="incremental auto_vacuum",
+        # auto_vacuum só muda num banco existente após um VACUUM completo (uma vez)
+        statements=("PRAGMA auto_vacuum=INCREMENTAL", "VACUUM"),
+        transactional=False,
+    ),
+    Migration(
+        version=4,
+        description="content-addressed payload blobs",
+        statements=(
+            """
+            CREATE TABLE IF NOT EXISTS payload_blobs (
+                hash BLOB PRIMARY KEY,
+                data BLOB NOT NULL,
+                raw_size INTEGER NOT NULL
+            ) WITHOUT ROWID
+            """,
+            "ALTER TABLE runs ADD COLUMN payload_hash BLOB",
+            "CREATE INDEX IF NOT EXISTS idx_runs_payload_hash ON runs(payload_hash)",
+        ),
+        apply=_move_payloads_to_blobs,
+    ),
+    Migration(
+        version=5,
+        description="normalized findings and scan signals",
+        statements=(
+            """
+            CREATE TABLE IF NOT EXISTS finding_messages (
+                hash BLOB PRIMARY KEY,
+                message TEXT NOT NULL
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS findings (
+                run_id INTEGER NOT NULL,
+                severity TEXT NOT NULL,
+                message_hash BLOB NOT NULL,
+                location TEXT NOT NULL DEFAULT ''
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS scan_signals (
+                run_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                grp TEXT NOT NULL DEFAULT '',
+                value TEXT NOT NULL
+            )
+            """,
+            # cobrem os EXCEPT entre dois runs sem tocar na tabela
+            """
+            CREATE INDEX IF NOT EXISTS idx_findings_run
+            ON findings(run_id, severity, message_hash, location)
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_findings_message ON findings(message_hash)",
+            """
+            CREATE INDEX IF NOT EXISTS idx_scan_signals_run
+            ON scan_signals(run_id, kind, grp, value)
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_runs_delete_normalized
+            AFTER DELETE ON runs
+            BEGIN
+                DELETE FROM findings WHERE run_id = OLD.id;
+                DELETE FROM scan_signals WHERE run_id = OLD.id;
+            END
+            """,
+        ),
+        apply=_normalize_existing_runs,
+    ),
+    Migration(
+        version=6,
+        description="full-text search over AI explanations and findings",
+        # só cria o índice se o sqlite tiver FTS5; senão a busca usa LIKE
+        apply=create_search_index,
+    ),
+    Migration(
+        version=7,
+        description="AI response cache",
+        statements=(
+            """
+            CREATE TABLE IF NOT EXISTS ai_response_cache (
+                key BLOB PRIMARY KEY,
+                model TEXT NOT NULL,
+                endpoint TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+            """,
+            # despejo LRU
+            """
+            CREATE INDEX IF NOT EXISTS idx_ai_response_cache_accessed
+            ON ai_response_cache(accessed_at)
+            """,
+        ),
+    ),
+    Migration(
+        version=8,
+        description="AI call metrics",
+        statements=(
+            """
+            CREATE TABLE IF NOT EXISTS ai_metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at TEXT NOT NULL DEFAULT (datetime('now')),
+                command TEXT NOT NULL,
+                model TEXT NOT NULL,
+                endpoint TEXT NOT NULL,
+                streamed INTEGER NOT NULL,
+                ttft_ms REAL,
+                total_ms REAL NOT NULL,
+                tokens INTEGER NOT NULL,
+                tokens_per_sec REAL
+            )
+            """,
+        ),
+    ),
+    Migration(
+        version=9,
+        description="per-model latency and success rate for the model router",
+        statements=(
+            """
+            CREATE TABLE IF NOT EXISTS ai_model_stats (
+                model TEXT NOT NULL,
+                endpoint TEXT NOT NULL,
+                task TEXT NOT NULL,
+                calls INTEGER NOT NULL,
+                latency_ms REAL,
+                success_rate REAL NOT NULL,
+                updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+                PRIMARY KEY (model, endpoint, task)
+            )
+            """,
+        ),
+    ),
+    Migration(
+        version=10,
+        description="incremental ai-explain anchors and prompt/prefill metrics",
+        statements=(
+            # runs que a explicação cobriu: o próximo ai-explain --incremental manda só o diff
+            "ALTER TABLE ai_explanations ADD COLUMN scan_run_id INTEGER",
+            "ALTER TABLE ai_explanations ADD COLUMN doctor_run_id INTEGER",
+            "ALTER TABLE ai_explanations ADD COLUMN mode TEXT",
+            "ALTER TABLE ai_explanations ADD COLUMN model TEXT",
+            # contexto do servidor (tokens do Ollama) comprimido; só a última linha guarda
+            "ALTER TABLE ai_explanations ADD COLUMN server_context BLOB",
+            "ALTER TABLE ai_metrics ADD COLUMN mode TEXT",
+            "ALTER TABLE ai_metrics ADD COLUMN prompt_chars INTEGER",
+            "ALTER TABLE ai_metrics ADD COLUMN prompt_tokens INTEGER",
+            "ALTER TABLE ai_metrics ADD COLUMN prefill_ms REAL",
+        ),
+    ),
+    Migration(
+        version=11,
+        description="origin of imported history and created_at retention",
+        statements=(
+            # source NULL: registro deste projeto; importados guardam origem e id original
+            "ALTER TABLE runs ADD COLUMN source TEXT",
+            "ALTER TABLE runs ADD COLUMN source_id INTEGER",
+            "ALTER TABLE ai_explanations ADD COLUMN source TEXT",
+            "ALTER TABLE ai_explanations ADD COLUMN source_id INTEGER",
+            # importar o mesmo arquivo de novo não duplica
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_runs_source
+            ON runs(source, source_id) WHERE source IS NOT NULL
+            """,
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_ai_explanations_source
+            ON ai_explanations(source, source_id) WHERE source IS NOT NULL
+            """,
+            # histórico do projeto (último run, diffs, tendências): só os runs locais
+            """
+            CREATE INDEX IF NOT EXISTS idx_runs_local_command_id
+            ON runs(command, id DESC) WHERE source IS NULL
+            """,
+            # importados têm created_at antigo com id novo: retenção por idade usa a data
+            "CREATE INDEX IF NOT EXISTS idx_runs_created_at ON runs(created_at)",
+            """
+            CREATE INDEX IF NOT EXISTS idx_ai_explanations_created_at
+            ON ai_explanations(created_at)
+            """,
+        ),
+    ),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER NOT NULL
+        )
+        """
+    )
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate(conn: sqlite3.Connection, migrations: list[Migration] | None = None) -> list[int]:
+    """
+    Aplica, em ordem, as migrations com versão maior que a atual.
+    Cada uma roda na sua própria transação e registra a versão ao final.
+    Retorna as versões aplicadas.
+    """
+    migrations = sorted(migrations or MIGRATIONS, key=lambda m: m.version)
+    applied: list[int] = []
+
+    current = current_version(conn)
+    for migration in migrations:
+        if migration.version <= current:
+            continue
+
+        if migration.transactional:
+            with immediate_transaction(conn):
+                # outro processo pode ter migrado enquanto esperávamos o lock
+                if current_version(conn) >= migration.version:
+                    current = migration.version
+                    continue
+                _run(conn, migration)
+                conn.execute(_SQL_RECORD_VERSION, (migration.version,))
+        else:
+            _run(conn, migration)
+            with immediate_transaction(conn):
+                conn.execute(_SQL_RECORD_VERSION, (migration.version,))
+        applied.append(migration.version)
+        current = migration.version
+
+    return applied
+
+
+def _run(conn: sqlite3.Connection, migration: Migration) -> None:
+    for sql in migration.statements:
+        conn.execute(sql)
+    if migration.apply is not None:
+        migration.apply(conn)
+
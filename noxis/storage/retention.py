@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from noxis.policies.loader import load_policies
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """
+    Limites do memory.db (seção `storage` do policies.yml). None desativa a regra.
+    """
+
+    max_runs_per_command: int | None = 500
+    max_age_days: int | None = 90
+    max_ai_explanations: int | None = 1000
+    vacuum_every_writes: int = 200
+
+    @staticmethod
+    def from_policies(policies: dict[str, Any]) -> "RetentionPolicy":
+        storage = policies.get("storage") or {}
+        retention = storage.get("retention") or {}
+        vacuum = storage.get("vacuum") or {}
+        defaults = RetentionPolicy()
+        return RetentionPolicy(
+            max_runs_per_command=_limit(
+                retention.get("max_runs_per_command", defaults.max_runs_per_command)
+            ),
+            max_age_days=_limit(retention.get("max_age_days", defaults.max_age_days)),
+            max_ai_explanations=_limit(
+                retention.get("max_ai_explanations", defaults.max_ai_explanations)
+            ),
+            vacuum_every_writes=int(vacuum.get("every_writes", defaults.vacuum_every_writes) or 0),
+        )
+
+    @staticmethod
+    def load(policies_file: Path) -> "RetentionPolicy":
+        return RetentionPolicy.from_policies(load_policies(policies_file))
+
+
+def _limit(value: Any) -> int | None:
+    if value is None:
+        return None
+    value = int(value)
+    return value if value > 0 else None
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+from dataclasses import dataclass
+
+# Índices FTS5 sobre as respostas da IA e as mensagens de findings do doctor.
+# ai_explanations_fts é "external content" (o texto fica só em ai_explanations);
+# finding_messages é WITHOUT ROWID, então finding_messages_fts guarda uma cópia.
+
+KIND_AI_EXPLANATION = "ai_explanation"
+KIND_FINDING = "finding"
+
+_CREATE_STATEMENTS = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS ai_explanations_fts USING fts5(
+        response,
+        content='ai_explanations',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_ai_explanations_fts_insert
+    AFTER INSERT ON ai_explanations
+    BEGIN
+        INSERT INTO ai_explanations_fts (rowid, response) VALUES (NEW.id, NEW.response);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_ai_explanations_fts_delete
+    AFTER DELETE ON ai_explanations
+    BEGIN
+        INSERT INTO ai_explanations_fts (ai_explanations_fts, rowid, response)
+        VALUES ('delete', OLD.id, OLD.response);
+    END
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS finding_messages_fts USING fts5(
+        message,
+        hash UNINDEXED,
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    # INSERT OR IGNORE de mensagem repetida não dispara o trigger
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_finding_messages_fts_insert
+    AFTER INSERT ON finding_messages
+    BEGIN
+        INSERT INTO finding_messages_fts (message, hash) VALUES (NEW.message, NEW.hash);
+    END
+    """,
+    "INSERT INTO ai_explanations_fts (ai_explanations_fts) VALUES ('rebuild')",
+    "INSERT INTO finding_messages_fts (message, hash) SELECT message, hash FROM finding_messages",
+)
+
+# mensagens removidas pela retenção: um único passe, na transação da compactação
+SQL_DELETE_ORPHAN_FINDING_FTS = """
+    DELETE FROM finding_messages_fts
+    WHERE hash NOT IN (SELECT hash FROM finding_messages)
+"""
+
+_SQL_SEARCH = """
+    SELECT kind, ref, created_at, snippet, score, body FROM (
+        SELECT 'ai_explanation' AS kind,
+               e.id AS ref,
+               e.created_at AS created_at,
+               snippet(ai_explanations_fts, 0, '[', ']', '…', 16) AS snippet,
+               bm25(ai_explanations_fts) AS score,
+               e.response AS body
+        FROM ai_explanations_fts
+        JOIN ai_explanations e ON e.id = ai_explanations_fts.rowid
+        WHERE ?2 IN ('all', 'ai_explanation') AND ai_explanations_fts MATCH ?1
+        UNION ALL
+        SELECT 'finding', hit.last_run, r.created_at, hit.snippet, hit.score, hit.message
+        FROM (
+            SELECT (
+                       SELECT MAX(f.run_id) FROM findings f
+                       WHERE f.message_hash = finding_messages_fts.hash
+                   ) AS last_run,
+                   snippet(finding_messages_fts, 0, '[', ']', '…', 16) AS snippet,
+                   bm25(finding_messages_fts) AS score,
+                   finding_messages_fts.message AS message
+            FROM finding_messages_fts
+            WHERE ?2 IN ('all', 'finding') AND finding_messages_fts MATCH ?1
+        ) hit
+        LEFT JOIN runs r ON r.id = hit.last_run
+    )
+    ORDER BY score
+    LIMIT ?3
+"""
+
+# sem FTS5 compilado no sqlite: LIKE (varredura completa, sem ranking)
+_SQL_SEARCH_FALLBACK = """
+    SELECT kind, ref, created_at, snippet, score, body FROM (
+        SELECT 'ai_explanation' AS kind, id AS ref, created_at,
+               substr(response, 1, 160) AS snippet, 0.0 AS score, response AS body
+        FROM ai_explanations
+        WHERE ?2 IN ('all', 'ai_explanation') AND response LIKE ?1
+        UNION ALL
+        SELECT 'finding', NULL, NULL, substr(message, 1, 160), 0.0, message
+        FROM finding_messages
+        WHERE ?2 IN ('all', 'finding') AND message LIKE ?1
+    )
+    ORDER BY ref DESC
+    LIMIT ?3
+"""
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    kind: str  # ai_explanation | finding
+    ref: int | None  # id da explicação / último run em que o finding apareceu
+    created_at: str | None
+    snippet: str
+    score: float  # bm25: menor é mais relevante
+    text: str
+
+
+def fts5_available(conn: sqlite3.Connection) -> bool:
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp._noxis_fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp._noxis_fts5_probe")
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def create_search_index(conn: sqlite3.Connection) -> None:
+    # migration: sem FTS5 o banco segue sem índice e a busca cai no LIKE
+    if not fts5_available(conn):
+        return
+    for sql in _CREATE_STATEMENTS:
+        conn.execute(sql)
+
+
+def has_search_index(conn: sqlite3.Connection) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ai_explanations_fts'"
+    ).fetchone()
+    return row is not None
+
+
+def fts_query(text: str) -> str:
+    """
+    Converte texto livre numa consulta FTS5 segura: cada palavra vira um termo
+    entre aspas (AND implícito); a última também casa por prefixo.
+    """
+    tokens = _TOKEN.findall(text)
+    if not tokens:
+        return ""
+    terms = [f'"{t}"' for t in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search(
+    conn: sqlite3.Connection, text: str, kind: str = "all", limit: int = 10, raw: bool = False
+) -> list[SearchHit]:
+    if not has_search_index(conn):
+        pattern = f"%{text.strip()}%"
+        rows = conn.execute(_SQL_SEARCH_FALLBACK, (pattern, kind, limit)).fetchall()
+        return [SearchHit(*row) for row in rows]
+
+    query = text if raw else fts_query(text)
+    if not query:
+        return []
+    rows = conn.execute(_SQL_SEARCH, (query, kind, limit)).fetchall()
+    return [SearchHit(*row) for row in rows]
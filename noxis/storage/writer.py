@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import queue
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from noxis.policies.loader import load_policies
+
+WriteOp = Callable[[sqlite3.Connection], Any]
+
+
+@dataclass(frozen=True)
+class WritePolicy:
+    """
+    Escrita concorrente no memory.db (seção `storage.writer` do policies.yml).
+    """
+
+    busy_timeout_ms: int = 5000
+    retries: int = 5
+    backoff_ms: int = 25
+    max_batch: int = 64
+
+    @staticmethod
+    def from_policies(policies: dict[str, Any]) -> "WritePolicy":
+        writer = (policies.get("storage") or {}).get("writer") or {}
+        defaults = WritePolicy()
+        return WritePolicy(
+            busy_timeout_ms=int(writer.get("busy_timeout_ms", defaults.busy_timeout_ms)),
+            retries=int(writer.get("retries", defaults.retries)),
+            backoff_ms=int(writer.get("backoff_ms", defaults.backoff_ms)),
+            max_batch=max(1, int(writer.get("max_batch", defaults.max_batch))),
+        )
+
+    @staticmethod
+    def load(policies_file: Path) -> "WritePolicy":
+        return WritePolicy.from_policies(load_policies(policies_file))
+
+
+def is_busy(exc: BaseException) -> bool:
+    if not isinstance(exc, sqlite3.OperationalError):
+        return False
+    msg = str(exc).lower()
+    return "locked" in msg or "busy" in msg
+
+
+@contextmanager
+def immediate_transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """
+    BEGIN IMMEDIATE pega o lock de escrita já no início: sem o upgrade
+    leitura->escrita de uma transação DEFERRED, que falha com SQLITE_BUSY
+    sem passar pelo busy_timeout quando outro processo está escrevendo.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def with_retry(fn: Callable[[], Any], policy: WritePolicy) -> Any:
+    """
+    Repete `fn` em SQLITE_BUSY com backoff exponencial + jitter.
+    """
+    for attempt in range(policy.retries + 1):
+        try:
+            return fn()
+        except sqlite3.OperationalError as exc:
+            if not is_busy(exc) or attempt == policy.retries:
+                raise
+            delay = policy.backoff_ms * (2**attempt) / 1000
+            time.sleep(delay * random.uniform(0.5, 1.5))
+    raise AssertionError("unreachable")
+
+
+class _Stop:
+    pass
+
+
+class WriteBehindQueue:
+    """
+    Thread escritora com group commit: as escritas enfileiradas enquanto um
+    commit está em andamento entram juntas na transação seguinte (um fsync
+    para o lote inteiro). Cada escrita devolve um Future com o seu resultado.
+    """
+
+    def __init__(
+        self, conn: sqlite3.Connection, lock: threading.RLock, policy: WritePolicy
+    ) -> None:
+        self._conn = conn
+        self._lock = lock
+        self.policy = policy
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, op: WriteOp, transactional: bool = True) -> Future:
+        """
+        `transactional=False` roda a operação sozinha, fora de transação
+        (VACUUM, checkpoints): ela mesma controla seus commits.
+        """
+        future: Future = Future()
+        self._ensure_started()
+        self._queue.put((op, transactional, future))
+        return future
+
+    def flush(self) -> None:
+        # barreira: resolve quando tudo que foi enfileirado antes já foi gravado
+        if self._thread is None:
+            return
+        self.submit(lambda conn: None, transactional=False).result()
+
+    def close(self) -> None:
+        thread = self._thread
+        if thread is None:
+            return
+        self._queue.put(_Stop)
+        if thread is not threading.current_thread():
+            thread.join()
+        self._thread = None
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="noxis-memory-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        pending = None
+        while True:
+            item = pending if pending is not None else self._queue.get()
+            pending = None
+            if item is _Stop:
+                return
+
+            op, transactional, future = item
+            if not transactional:
+                self._execute_alone(op, future)
+                continue
+
+            batch = [(op, future)]
+            # group commit: junta o que já chegou, sem esperar por mais
+            while len(batch) < self.policy.max_batch:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is _Stop or not nxt[1]:
+                    pending = nxt
+                    break
+                batch.append((nxt[0], nxt[2]))
+            self._execute_batch(batch)
+
+    def _execute_alone(self, op: WriteOp, future: Future) -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            with self._lock:
+                result = with_retry(lambda: op(self._conn), self.policy)
+        except BaseException as exc:  # noqa: BLE001
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
+
+    def _execute_batch(self, batch: list[tuple[WriteOp, Future]]) -> None:
+        batch = [(op, f) for op, f in batch if f.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        def run_all() -> list[Any]:
+            with self._lock, immediate_transaction(self._conn) as conn:
+                return [op(conn) for op, _ in batch]
+
+        try:
+            results = with_retry(run_all, self.policy)
+        except BaseException as exc:  # noqa: BLE001
+            if len(batch) == 1 or is_busy(exc):
+                for _, future in batch:
+                    future.set_exception(exc)
+                return
+            # uma escrita inválida não derruba o lote: refaz uma a uma
+            for op, future in batch:
+                self._execute_single(op, future)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _execute_single(self, op: WriteOp, future: Future) -> None:
+        def run_one() -> Any:
+            with self._lock, immediate_transaction(self._conn) as conn:
+                return op(conn)
+
+        try:
+            future.set_result(with_retry(run_one, self.policy))
+        except BaseException as exc:  # noqa: BLE001
+            future.set_exception(exc)